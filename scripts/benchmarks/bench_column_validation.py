@@ -0,0 +1,69 @@
+"""
+Benchmark column-wise against row-wise validation of a synthetic table.
+
+Replicates tests/input/validation/measurements.tsv (one column per range the
+column checker compiles, with a mix of valid and invalid values) up to --rows
+rows and times:
+
+  rows     stream_validate: JSON Schema validation of each row (as `linkml validate`)
+  columns  column_validate: vectorized range/enum/pattern checks per column
+
+and checks that both report the same error groups.
+
+Usage:
+    uv run python scripts/benchmarks/bench_column_validation.py --rows 200000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from dm_bip.validation.columns import column_validate
+from dm_bip.validation.runner import SchemaValidator
+from dm_bip.validation.streaming import StreamOptions, stream_validate
+
+FIXTURES = Path(__file__).parents[2] / "tests" / "input" / "validation"
+
+
+def make_table(rows: int, path: Path) -> Path:
+    """Write a measurements table of the requested length, cycling the fixture's data rows."""
+    header, *data = (FIXTURES / "measurements.tsv").read_text().splitlines()
+    with open(path, "w") as f:
+        f.write(header + "\n")
+        for i in range(rows):
+            f.write(data[i % len(data)] + "\n")
+    return path
+
+
+def _timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<8} {elapsed:8.3f} s")
+    return result, elapsed
+
+
+def main() -> None:
+    """Run the benchmark and print timings."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    validator = SchemaValidator(FIXTURES / "types_schema.yaml")
+    with tempfile.TemporaryDirectory() as tmp:
+        table = make_table(args.rows, Path(tmp) / "measurements.tsv")
+        print(f"{args.rows} rows")
+        # Warm up pandas and the compiled checks so the timing covers validation only.
+        column_validate(validator, FIXTURES / "measurements.tsv", "measurements")
+
+        options = StreamOptions(chunk_size=args.chunk_size)
+        by_row, row_time = _timed("rows", lambda: stream_validate(validator, table, "measurements", options))
+        by_column, column_time = _timed("columns", lambda: column_validate(validator, table, "measurements", options))
+        assert by_column.groups == by_row.groups, "column and row validation disagree"
+        print(f"  speedup: {row_time / column_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
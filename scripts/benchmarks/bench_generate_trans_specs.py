@@ -0,0 +1,95 @@
+"""
+Benchmark trans-spec generation over a synthetic large metadata CSV.
+
+Replicates tests/input/make_yaml/shortdata_sample.csv up to --rows rows (spread
+over --cohorts cohorts, about five rows per bdchm_varname) and times:
+
+  legacy-iter   the former hot loop: DataFrame.apply(is_good, axis=1) + iterrows/to_dict
+  records-iter  the current hot loop: vectorized good mask + one to_dict("records")
+  generate      end-to-end generate_batch (plan + render + write) for every cohort
+
+Usage:
+    uv run python scripts/benchmarks/bench_generate_trans_specs.py --rows 100000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from dm_bip.trans_spec_gen.generate_trans_specs import (
+    ENTITY_REGISTRY,
+    _plan_files,
+    _safe_output_path,
+    generate_batch,
+    load_metadata,
+)
+
+SAMPLE_CSV = Path(__file__).parents[2] / "tests" / "input" / "make_yaml" / "shortdata_sample.csv"
+
+
+def make_metadata(rows: int, cohorts: int, path: Path) -> Path:
+    """Write a synthetic MeasurementObservation metadata CSV with the requested row count."""
+    sample = pd.read_csv(SAMPLE_CSV)
+    sample = sample[sample["bdchm_entity"] == "MeasurementObservation"].reset_index(drop=True)
+    df = sample.iloc[[i % len(sample) for i in range(rows)]].reset_index(drop=True)
+    df["cohort"] = [f"cohort{i % cohorts:02d}" for i in range(rows)]
+    df["bdchm_varname"] = [f"var{i // (5 * cohorts):06d}" for i in range(rows)]
+    df.to_csv(path, index=False)
+    return path
+
+
+def legacy_iter(df: pd.DataFrame, cohort: str, output_dir: Path) -> int:
+    """Per-row Series iteration as generate_yaml did before records-based planning."""
+    spec = ENTITY_REGISTRY["MeasurementObservation"]
+    df_filtered = df[(df["bdchm_entity"] == "MeasurementObservation") & (df["cohort"] == cohort)].copy()
+    good_mask = df_filtered.apply(spec.is_good, axis=1)
+    n = 0
+    for quality in ("good", "bad"):
+        subset = df_filtered[good_mask] if quality == "good" else df_filtered[~good_mask]
+        for varname, group in subset.groupby("bdchm_varname"):
+            _safe_output_path(output_dir, f"{cohort}/{quality}/{Path(varname).name}.yaml")
+            for _, row in group.iterrows():
+                n += len(row.to_dict())
+    return n
+
+
+def records_iter(df: pd.DataFrame, cohort: str, output_dir: Path) -> int:
+    """Current planning path: vectorized mask, one records conversion per row."""
+    planned = _plan_files(df, "MeasurementObservation", cohort, output_dir, "{cohort}/{quality}/{varname}.yaml")
+    return sum(len(record) for _, records in planned for record in records)
+
+
+def _timed(label: str, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<14} {elapsed:8.3f} s")
+    return elapsed
+
+
+def main() -> None:
+    """Run the benchmark and print timings."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--cohorts", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the generate step")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        csv_path = make_metadata(args.rows, args.cohorts, tmp_path / "metadata.csv")
+        df = load_metadata(csv_path)
+        cohorts = sorted(df["cohort"].unique())
+        print(f"{args.rows} rows, {len(cohorts)} cohorts, {df['bdchm_varname'].nunique()} variables")
+
+        legacy = _timed("legacy-iter", lambda: [legacy_iter(df, c, tmp_path / "out") for c in cohorts])
+        records = _timed("records-iter", lambda: [records_iter(df, c, tmp_path / "out") for c in cohorts])
+        _timed("generate", lambda: generate_batch(csv_path, tmp_path / "out", workers=args.workers))
+        print(f"  hot-loop speedup: {legacy / records:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
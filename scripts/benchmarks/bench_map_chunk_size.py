@@ -0,0 +1,120 @@
+"""
+Benchmark map throughput and memory against the chunk size.
+
+Maps one entity from each of three inputs of --rows rows:
+
+  toy     the toy study's subject table (9 columns) as Participant
+  narrow  a synthetic 4-column table
+  wide    a synthetic --wide-columns table of --wide-rows rows (every column
+          mapped; linkml-map derives each slot in turn, so this is slow)
+
+with fixed chunk sizes and with ``auto`` (dm_bip.map_data.chunking), each in
+a freshly forked process, and prints records per second and the process's
+peak memory above the loaded session (as the map scheduler records it).
+
+Usage:
+    uv run python scripts/benchmarks/bench_map_chunk_size.py --rows 20000 --wide-rows 2000 --wide-columns 500
+"""
+
+import argparse
+import dataclasses
+import random
+import string
+import tempfile
+from pathlib import Path
+
+from dm_bip.map_data.runner import MapOptions, MapSession
+from dm_bip.map_data.scheduler import MemoryHistory, format_memory, run_scheduled
+from dm_bip.schema_gen.infer import infer_schema, write_schema
+
+TOY = Path(__file__).parents[2] / "toy_data"
+FIXED_SIZES = [100, 1_000, 10_000, 100_000]
+
+
+def _replicate(source: Path, rows: int, path: Path) -> None:
+    header, *data = source.read_text().splitlines()
+    with open(path, "w") as f:
+        f.write(header + "\n")
+        for i in range(rows):
+            f.write(data[i % len(data)] + "\n")
+
+
+def _synthetic(columns: int, rows: int, path: Path) -> None:
+    rng = random.Random(0)
+    values = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12))) for _ in range(997)]
+    with open(path, "w") as f:
+        f.write("\t".join(["id", *(f"c{i}" for i in range(1, columns))]) + "\n")
+        for row in range(rows):
+            f.write("\t".join([str(row), *(values[(row * 31 + i) % len(values)] for i in range(1, columns))]) + "\n")
+
+
+def _spec(entity: str, table: str, columns: list[str]) -> str:
+    slots = "".join(f"        {column}:\n          populated_from: {column}\n" for column in columns)
+    return f"- class_derivations:\n    {entity}:\n      populated_from: {table}\n      slot_derivations:\n{slots}"
+
+
+def make_dataset(name: str, rows: int, wide_columns: int, root: Path) -> tuple[Path, Path, str]:
+    """Write one dataset's input table, inferred schema and spec; return (schema, spec dir, entity)."""
+    inputs, specs = root / "input", root / "specs"
+    inputs.mkdir(parents=True)
+    specs.mkdir()
+    if name == "toy":
+        _replicate(TOY / "data" / "pre_cleaned" / "subject.tsv", rows, inputs / "subject.tsv")
+        (specs / "participant.yaml").write_text((TOY / "pre_cleaned" / "specs" / "participant-spec.yaml").read_text())
+        entity = "Participant"
+    else:
+        columns = 4 if name == "narrow" else wide_columns
+        _synthetic(columns, rows, inputs / f"{name}.tsv")
+        header = (inputs / f"{name}.tsv").open().readline().rstrip("\n").split("\t")
+        entity = name.capitalize()
+        (specs / f"{name}.yaml").write_text(_spec(entity, name, header))
+    schema = root / "schema.yaml"
+    inferred = infer_schema(sorted(inputs.glob("*.tsv")), "Bench", enum_threshold=1.0, max_enum_size=0)
+    write_schema(inferred.schema, schema)
+    return schema, specs, entity
+
+
+def bench(name: str, rows: int, wide_columns: int) -> None:
+    """Map one dataset at every chunk size and print a row per size."""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        schema, specs, entity = make_dataset(name, rows, wide_columns, root)
+        session = MapSession(schema, [specs], root / "input")
+        session.warm_up([entity])
+        auto = session.chunk_size(entity)
+        base = MapOptions(output_dir=root / "out", formats=["tsv"])
+        print(f"{name}: {rows} rows, auto chunk size {auto}")
+        print(f"  {'chunk':>14} {'records/s':>10} {'peak':>8}")
+        for size in [*FIXED_SIZES, auto]:
+            options = dataclasses.replace(base, chunk_size=size)
+            results = []
+            run_scheduled(
+                [entity],
+                map_one=lambda entity, options=options: session.map_entity(entity, options),
+                on_killed=lambda entity, code, size=size: print(f"  {size:>14} killed (exit {code})"),
+                record=results.append,
+                workers=1,
+                budget=None,
+                history=MemoryHistory(root / "history.json"),
+            )
+            for result in results:
+                if result is not None:
+                    label = f"{size}" + (" (auto)" if size == auto else "")
+                    rate = result.rows / result.seconds if result.seconds else 0.0
+                    print(f"  {label:>14} {rate:>10.0f} {format_memory(result.memory):>8}")
+
+
+def main() -> None:
+    """Run the benchmark and print throughput and memory per chunk size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--wide-rows", type=int, default=1_000)
+    parser.add_argument("--wide-columns", type=int, default=300)
+    parser.add_argument("--dataset", action="append", choices=["toy", "narrow", "wide"])
+    args = parser.parse_args()
+    for name in args.dataset or ["toy", "narrow", "wide"]:
+        bench(name, args.wide_rows if name == "wide" else args.rows, args.wide_columns)
+
+
+if __name__ == "__main__":
+    main()
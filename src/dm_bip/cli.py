@@ -1,12 +1,16 @@
 """Command line interface for dm-bip."""
 
 import logging
+import sys
 from pathlib import Path
 from typing import Annotated, Optional
 
 import typer
 
-from dm_bip import __version__
+from dm_bip import __version__, trace
+
+# Commands import their (pandas/jinja2/yaml/httpx) dependencies inside the command
+# body so that `dm-bip --version` and `--help` stay cheap; see test_cli_startup.py.
 from dm_bip.seven_bridges.cli import app as seven_bridges_app
 
 __all__ = [
@@ -21,6 +25,16 @@ app = typer.Typer(
     epilog="For pipeline orchestration (schema generation, validation, mapping), use `make help`.",
 )
 app.add_typer(seven_bridges_app, name="seven-bridges")
+trace_app = typer.Typer(help="Read pipeline traces (DM_TRACE_FILE).")
+app.add_typer(trace_app, name="trace")
+
+# Pipeline stage of each command's trace span; other commands are their own stage.
+TRACE_STAGES = {
+    "infer-schema": "schema",
+    "validate": "validation",
+    "validation-stamps": "validation",
+    "map": "map",
+}
 
 
 def version_callback(value: bool):
@@ -30,8 +44,35 @@ def version_callback(value: bool):
         raise typer.Exit()
 
 
+def _exit_code(error: BaseException | None) -> int:
+    """Return the exit code a command's exception (or None) ends the process with."""
+    if error is None:
+        return 0
+    if isinstance(getattr(error, "exit_code", None), int):  # typer.Exit and click's usage errors
+        return error.exit_code
+    if isinstance(error, SystemExit):
+        return error.code if isinstance(error.code, int) else 1
+    return 1
+
+
+def _trace_command(ctx: typer.Context) -> None:
+    """Record the invoked command as a trace span, ended when the command finishes."""
+    command = ctx.invoked_subcommand
+    if command is None or command == "trace" or not trace.enabled():
+        return
+    span_id = trace.start_span(f"dm-bip {command}", TRACE_STAGES.get(command, command))
+    trace.activate(span_id)
+
+    def finish() -> None:
+        code = _exit_code(sys.exc_info()[1])
+        trace.end_span(span_id, "ok" if code == 0 else "error", exit_code=code)
+
+    ctx.call_on_close(finish)
+
+
 @app.callback()
 def main(
+    ctx: typer.Context,
     verbose: Annotated[int, typer.Option("-v", "--verbose", count=True, help="Increase verbosity")] = 0,
     quiet: Annotated[Optional[bool], typer.Option("-q", "--quiet", help="Suppress output")] = None,
     version: Annotated[
@@ -47,6 +88,7 @@ def main(
         logger.setLevel(level=logging.WARNING)
     if quiet:
         logger.setLevel(level=logging.ERROR)
+    _trace_command(ctx)
 
 
 @app.command()
@@ -56,35 +98,84 @@ def run():
     typer.echo("Run 'make help' to see available targets and usage information.")
 
 
+def _expand_choices(values: list[str]) -> list[str] | None:
+    """Flatten repeated and comma-separated option values; None when "all" is requested."""
+    expanded = [v.strip() for value in values for v in value.split(",") if v.strip()]
+    return None if "all" in expanded else expanded
+
+
 @app.command()
 def generate_trans_specs(
     input_csv: Annotated[Path, typer.Option("--input", "-i", help="Path to the metadata CSV")],
     output_dir: Annotated[Path, typer.Option("--output", "-o", help="Directory for YAML output files")],
-    cohort: Annotated[str, typer.Option("--cohort", "-c", help="Cohort to filter on (e.g. aric, jhs, whi)")],
-    entity: Annotated[str, typer.Option("--entity", "-e", help="Entity type to filter on")] = "MeasurementObservation",
+    cohort: Annotated[
+        list[str],
+        typer.Option("--cohort", "-c", help="Cohort(s) to filter on (e.g. aric, jhs, whi); repeatable, or 'all'"),
+    ],
+    entity: Annotated[
+        Optional[list[str]],
+        typer.Option("--entity", "-e", help="Entity type(s) to filter on; repeatable, or 'all'"),
+    ] = None,
+    workers: Annotated[int, typer.Option("--workers", "-j", help="Worker processes for template rendering")] = 1,
+    template_cache_dir: Annotated[
+        Optional[Path],
+        typer.Option("--template-cache-dir", help="Persist compiled Jinja2 templates here across runs and workers"),
+    ] = None,
+    merged: Annotated[
+        Optional[str],
+        typer.Option("--merged", help="Write one validated spec per entity in this format (yaml or json) instead"),
+    ] = None,
 ):
     """Generate trans-spec YAML files from a metadata CSV."""
-    from dm_bip.trans_spec_gen.generate_trans_specs import ENTITY_REGISTRY, generate_yaml
+    from dm_bip.trans_spec_gen.generate_trans_specs import ENTITY_REGISTRY, generate_batch
 
-    if entity not in ENTITY_REGISTRY:
-        raise typer.BadParameter(
-            f"{entity!r} is not a registered entity; choose from {sorted(ENTITY_REGISTRY)}",
-            param_hint="--entity",
+    cohorts = _expand_choices(cohort)
+    entities = _expand_choices(entity or ["MeasurementObservation"])
+    for name in entities or ():
+        if name not in ENTITY_REGISTRY:
+            raise typer.BadParameter(
+                f"{name!r} is not a registered entity; choose from {sorted(ENTITY_REGISTRY)}",
+                param_hint="--entity",
+            )
+
+    if merged is not None:
+        from dm_bip.trans_spec_gen.spec_builders import SPEC_FORMATS, generate_merged_specs
+
+        if merged not in SPEC_FORMATS:
+            raise typer.BadParameter(
+                f"{merged!r} is not a spec format; choose from {SPEC_FORMATS}", param_hint="--merged"
+            )
+        written = generate_merged_specs(
+            input_csv=input_csv, output_dir=output_dir, entities=entities, cohorts=cohorts, fmt=merged
         )
+        if not written:
+            typer.echo("No matching rows in the metadata CSV")
+            raise typer.Exit(code=1)
+        typer.echo(f"Wrote {len(written)} merged spec(s) to {output_dir}")
+        for path in written.values():
+            typer.echo(f"  {path}")
+        return
 
-    results = generate_yaml(
+    results = generate_batch(
         input_csv=input_csv,
         output_dir=output_dir,
-        entity=entity,
-        cohort=cohort,
+        entities=entities,
+        cohorts=cohorts,
+        workers=workers,
+        bytecode_cache_dir=template_cache_dir,
     )
-    if results:
-        typer.echo(f"Generated {len(results)} YAML files in {output_dir}")
-        for path in results:
-            typer.echo(f"  {path}")
-    else:
-        typer.echo(f"No matching rows for entity={entity}, cohort={cohort}")
+    generated = [path for paths in results.files.values() for path in paths]
+    for (name, cohort_name), paths in results.files.items():
+        if not paths:
+            typer.echo(f"No matching rows for entity={name}, cohort={cohort_name}")
+    if not generated:
+        if not results.files:
+            typer.echo("No matching rows in the metadata CSV")
         raise typer.Exit(code=1)
+    typer.echo(f"Generated {len(generated)} YAML files in {output_dir} ({len(results.changed)} changed)")
+    for path in generated:
+        if path in results.changed:
+            typer.echo(f"  {path}")
 
 
 @app.command()
@@ -95,8 +186,33 @@ def prepare_metadata(
     unit_key: Annotated[Path, typer.Option("--unit-key", help="Path to unit_key.xlsx")],
     output: Annotated[Path, typer.Option("--output", "-o", help="Output CSV path")],
     cleanup_rules: Annotated[Optional[Path], typer.Option("--cleanup-rules", help="Curator cleanup rules CSV")] = None,
+    cache_dir: Annotated[
+        Optional[Path],
+        typer.Option("--cache-dir", help="Cache per-workbook frames here and rebuild only changed partitions"),
+    ] = None,
 ):
     """Prepare metadata for trans-spec generation from raw dbGaP exports."""
+    if cache_dir is not None:
+        from dm_bip.trans_spec_gen.incremental import prepare_metadata_incremental
+
+        incremental = prepare_metadata_incremental(
+            raw_files=raw_files,
+            bdchv_defs_path=bdchv_defs,
+            contextual_vars_path=contextual_vars,
+            unit_key_path=unit_key,
+            output_path=output,
+            cache_dir=cache_dir,
+            cleanup_rules_path=cleanup_rules,
+        )
+        if incremental.output_path is None:
+            typer.echo("No data loaded from raw files")
+            raise typer.Exit(code=1)
+        typer.echo(f"Rebuilt {len(incremental.rebuilt)} of {len(incremental.partitions)} partition(s)")
+        for status in incremental.rebuilt:
+            typer.echo(f"  {status.name}: {', '.join(status.rebuilt)}")
+        typer.echo(f"Output written to {incremental.output_path}")
+        return
+
     from dm_bip.trans_spec_gen.prepare_metadata import prepare_metadata as _prepare
 
     result = _prepare(
@@ -163,5 +279,324 @@ def apply_overrides(
     typer.echo(f"Corrected output written to {result}")
 
 
+@app.command()
+def validate(
+    input_files: Annotated[list[Path], typer.Argument(help="Data files to validate (TSV/CSV)")],
+    schema: Annotated[Path, typer.Option("--schema", "-s", help="Generated LinkML schema")],
+    output_dir: Annotated[Path, typer.Option("--output-dir", "-o", help="Validation log directory")],
+    input_dir: Annotated[
+        Optional[Path], typer.Option("--input-dir", help="Base input directory, stripped from log names")
+    ] = None,
+    workers: Annotated[int, typer.Option("--workers", "-j", help="Worker processes")] = 1,
+    strict: Annotated[bool, typer.Option("--strict", help="Exit 1 (and skip the sentinel) on any failure")] = False,
+    force: Annotated[bool, typer.Option("--force", help="Revalidate files that already passed")] = False,
+    summary: Annotated[
+        bool, typer.Option("--summary", help="Stream rows in chunks and log errors grouped by column and type")
+    ] = False,
+    chunk_size: Annotated[int, typer.Option("--chunk-size", help="Rows per chunk with --summary")] = 10_000,
+    max_errors: Annotated[
+        Optional[int], typer.Option("--max-errors", help="Stop a file after this many errors (implies --summary)")
+    ] = None,
+    max_column_errors: Annotated[
+        Optional[int],
+        typer.Option(
+            "--max-column-errors", help="Stop a file once one column has this many errors (implies --summary)"
+        ),
+    ] = None,
+    sample: Annotated[
+        Optional[str],
+        typer.Option(
+            "--sample", help="Validate a seeded sample of rows: a rate (0.05, 5%) or a count (1000); implies --summary"
+        ),
+    ] = None,
+    sample_seed: Annotated[int, typer.Option("--sample-seed", help="Seed for --sample row selection")] = 0,
+    columns: Annotated[
+        bool,
+        typer.Option("--columns", help="Check slot ranges and enums column-wise (vectorized); implies --summary"),
+    ] = False,
+):
+    """Validate data files against the generated schema in one process (same logs as `make validate-data`)."""
+    from dm_bip.validation.runner import DATA_VALIDATION_ERRORS_DIR, validate_inputs
+
+    stream = None
+    if columns and sample is not None:
+        raise typer.BadParameter("--columns checks every row; drop --sample", param_hint="--columns")
+    if summary or columns or max_errors is not None or max_column_errors is not None or sample is not None:
+        from dm_bip.validation.sampling import RowSample
+        from dm_bip.validation.streaming import StreamOptions
+
+        try:
+            row_sample = RowSample.parse(sample, seed=sample_seed) if sample is not None else None
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="--sample") from e
+        stream = StreamOptions(
+            chunk_size=chunk_size,
+            max_errors=max_errors,
+            max_column_errors=max_column_errors,
+            sample=row_sample,
+            columns=columns,
+        )
+
+    def report(result):
+        if result.status == "up-to-date":
+            typer.echo(f"  - {result.input_file} already validated.")
+        elif result.ok:
+            typer.echo(f"  ✓ {result.input_file} passed.")
+        else:
+            error_log = output_dir / DATA_VALIDATION_ERRORS_DIR / result.key / "latest-error.log"
+            typer.echo(f"  ✗ {result.input_file} failed. See {error_log}")
+
+    sampled = f" (sample: {stream.sample.describe()})" if stream and stream.sample else ""
+    typer.echo(f"Validating {len(input_files)} file(s) against {schema}{sampled}...")
+    run = validate_inputs(
+        schema_path=schema,
+        input_files=input_files,
+        output_dir=output_dir,
+        input_dir=input_dir,
+        workers=workers,
+        strict=strict,
+        force=force,
+        stream=stream,
+        on_result=report,
+    )
+
+    typer.echo("\n=== Data Validation Summary ===\n")
+    typer.echo("Validation complete.")
+    typer.echo(f"Number of input files: {len(run.results)}")
+    if run.failures:
+        typer.echo(f"Number of files with validation errors: {len(run.failures)}\n")
+        typer.echo("Failing files:")
+        for result in run.failures:
+            typer.echo(f"    {result.key}")
+        typer.echo(f"\nSee {output_dir / DATA_VALIDATION_ERRORS_DIR} for error logs.")
+        if strict:
+            raise typer.Exit(code=1)
+        typer.echo("WARNING: Validation errors found but --strict is not set — continuing.")
+    else:
+        typer.echo("All files validated successfully.")
+
+
+@app.command()
+def schema_fingerprints(
+    schema: Annotated[Path, typer.Argument(help="LinkML schema")],
+    classes: Annotated[
+        Optional[list[str]], typer.Option("--class", "-c", help="Class(es) to fingerprint; repeatable (default: all)")
+    ] = None,
+):
+    """Print a digest per class of everything validating against it depends on."""
+    from linkml_runtime import SchemaView
+
+    from dm_bip.validation.fingerprints import class_fingerprints
+
+    for name, digest in class_fingerprints(SchemaView(str(schema)), classes).items():
+        typer.echo(f"{name}\t{digest}")
+
+
+@app.command()
+def validation_stamps(
+    input_files: Annotated[list[Path], typer.Argument(help="Data files to stamp (TSV/CSV)")],
+    schema: Annotated[Path, typer.Option("--schema", "-s", help="Generated LinkML schema")],
+    stamp_dir: Annotated[Path, typer.Option("--stamp-dir", help="Directory for <key>.sha256 stamps")],
+    input_dir: Annotated[
+        Optional[Path], typer.Option("--input-dir", help="Base input directory, stripped from stamp names")
+    ] = None,
+):
+    """Rewrite the validation stamps of files whose content or schema class changed."""
+    from linkml_runtime import SchemaView
+
+    from dm_bip.validation.fingerprints import write_validation_stamps
+
+    changed = write_validation_stamps(SchemaView(str(schema)), schema, input_files, stamp_dir, input_dir)
+    stale = [key for key, was_changed in changed.items() if was_changed]
+    typer.echo(f"{len(stale)} of {len(changed)} validation stamp(s) changed.")
+    for key in stale:
+        typer.echo(f"    {key}")
+
+
+@app.command()
+def infer_schema(
+    input_files: Annotated[list[Path], typer.Argument(help="Data files; each becomes a class named after the file")],
+    output: Annotated[Path, typer.Option("--output", "-o", help="Schema YAML to write")],
+    schema_name: Annotated[str, typer.Option("--schema-name", "-n", help="Schema name")] = "example",
+    enum_threshold: Annotated[
+        float, typer.Option("--enum-threshold", help="Make an enum if distinct values / values is below this")
+    ] = 0.1,
+    max_enum_size: Annotated[
+        int, typer.Option("--max-enum-size", help="Do not make an enum with more than this many values")
+    ] = 50,
+    cache_dir: Annotated[
+        Optional[Path], typer.Option("--cache-dir", help="Cache per-file column profiles here, keyed by file content")
+    ] = None,
+    workers: Annotated[int, typer.Option("--workers", "-j", help="Worker processes for profiling files")] = 1,
+):
+    """Infer a source schema like `schemauto generalize-tsvs`, from cached per-file column profiles."""
+    from dm_bip.schema_gen.infer import infer_schema as _infer
+    from dm_bip.schema_gen.infer import write_schema
+
+    try:
+        result = _infer(
+            input_files,
+            schema_name=schema_name,
+            enum_threshold=enum_threshold,
+            max_enum_size=max_enum_size,
+            cache_dir=cache_dir,
+            workers=workers,
+        )
+    except ValueError as e:
+        typer.echo(f"Error: {e}")
+        raise typer.Exit(code=1) from e
+    write_schema(result.schema, output)
+    typer.echo(f"Profiled {len(result.profiled)} of {len(input_files)} file(s); others came from the cache.")
+    for path in result.skipped:
+        typer.echo(f"  Skipped {path}: no data rows.")
+    typer.echo(f"Schema written to {output}")
+
+
+@app.command(name="map")
+def map_data(
+    input_dir: Annotated[Path, typer.Argument(help="Directory of input tables, one file per source class")],
+    trans_specs: Annotated[
+        list[Path], typer.Option("--transformer-specification", "-T", help="Trans-spec file or directory; repeatable")
+    ],
+    schema: Annotated[Path, typer.Option("--schema", "-s", help="Source schema")],
+    output_dir: Annotated[Path, typer.Option("--output-dir", "-o", help="Directory for mapped entity files")],
+    target_schema: Annotated[Optional[Path], typer.Option("--target-schema", help="Target schema")] = None,
+    entities: Annotated[
+        Optional[list[str]], typer.Option("--entity", "-e", help="Entity to map; repeatable (default: all)")
+    ] = None,
+    output_formats: Annotated[
+        Optional[list[str]], typer.Option("--format", "-f", help="Output format; repeatable, first is primary")
+    ] = None,
+    log_dir: Annotated[
+        Optional[Path], typer.Option("--log-dir", help="Per-entity log directory (default: OUTPUT_DIR/logs)")
+    ] = None,
+    prefix: Annotated[str, typer.Option("--prefix", help="Output file name prefix")] = "",
+    postfix: Annotated[str, typer.Option("--postfix", help="Output file name postfix")] = "",
+    chunk_size: Annotated[
+        str, typer.Option("--chunk-size", help="Records per output chunk, or auto to size each entity's chunks")
+    ] = "1000",
+    continue_on_error: Annotated[
+        bool, typer.Option("--continue-on-error", help="Log row errors and keep going; only killed workers fail")
+    ] = False,
+    stream: Annotated[bool, typer.Option("--stream", help="Map to JSON Lines, then write the formats from it")] = False,
+    workers: Annotated[int, typer.Option("--workers", "-j", help="Worker processes, forked after loading")] = 1,
+    memory_budget: Annotated[
+        Optional[str],
+        typer.Option(
+            "--memory-budget", help="Start entities only while their recorded peak memory fits: 8G, 512M, ... or auto"
+        ),
+    ] = None,
+    force: Annotated[bool, typer.Option("--force", help="Map entities that are already up to date")] = False,
+):
+    """Map entities like `linkml-map map-data --entity`, loading schemas, specs and shared tables once."""
+    from dm_bip.map_data.chunking import parse_chunk_size
+    from dm_bip.map_data.runner import MapOptions, map_entities
+    from dm_bip.map_data.scheduler import format_memory, parse_memory
+
+    try:
+        budget = parse_memory(memory_budget)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--memory-budget") from e
+    try:
+        records_per_chunk = parse_chunk_size(chunk_size)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--chunk-size") from e
+
+    options = MapOptions(
+        output_dir=output_dir,
+        formats=output_formats or ["yaml"],
+        log_dir=log_dir,
+        prefix=prefix,
+        postfix=postfix,
+        chunk_size=records_per_chunk,
+        continue_on_error=continue_on_error,
+        stream=stream,
+    )
+
+    def report(result):
+        if result.status == "up-to-date":
+            typer.echo(f"  - {result.entity} already mapped.")
+        elif result.status == "mapped":
+            memory = f", {format_memory(result.memory)} peak" if result.memory is not None else ""
+            typer.echo(f"  ✓ {result.entity}: {result.rows} record(s) in {result.seconds:.1f}s{memory}.")
+        else:
+            typer.echo(f"  ✗ {result.entity} {result.status} (exit {result.returncode}). See {result.log_path}")
+
+    run = map_entities(
+        source_schema=schema,
+        trans_specs=trans_specs,
+        input_dir=input_dir,
+        options=options,
+        target_schema=target_schema,
+        entities=entities,
+        workers=workers,
+        memory_budget=budget,
+        force=force,
+        on_result=report,
+    )
+    if run.failures:
+        typer.echo(f"{len(run.failures)} entity(ies) did not complete: {', '.join(r.entity for r in run.failures)}")
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def read_parquet(
+    parquet_file: Annotated[Path, typer.Argument(help="Mapped entity Parquet file", exists=True)],
+    compare: Annotated[
+        Optional[Path], typer.Option("--compare", help="JSON Lines the file was written from, to check it against")
+    ] = None,
+    limit: Annotated[Optional[int], typer.Option("--limit", "-n", help="Records to print (default: all)")] = None,
+):
+    """Print a mapped Parquet file's records as JSON Lines, or check it round-trips its JSON Lines."""
+    import json
+    from itertools import islice
+
+    from dm_bip.map_data.convert import read_records
+    from dm_bip.map_data.parquet import read_parquet as read_records_parquet
+    from dm_bip.map_data.parquet import round_trip_differences
+
+    try:
+        if compare is None:
+            for record in islice(read_records_parquet(parquet_file), limit):
+                typer.echo(json.dumps(record, ensure_ascii=False))
+            return
+        count, differences = round_trip_differences(parquet_file, read_records(compare))
+    except ImportError as e:
+        typer.echo(f"Error: {e}")
+        raise typer.Exit(code=1) from e
+    for difference in differences:
+        typer.echo(f"  ✗ {difference}")
+    if differences:
+        raise typer.Exit(code=1)
+    typer.echo(f"✓ {count} record(s) in {parquet_file} match {compare}.")
+
+
+@trace_app.command("report")
+def trace_report(
+    trace_file: Annotated[
+        Path, typer.Argument(help="Trace JSONL file, or a directory of them (the newest is read)", exists=True)
+    ],
+    chrome: Annotated[
+        Optional[Path], typer.Option("--chrome", help="Also write Chrome trace-event JSON (chrome://tracing, Perfetto)")
+    ] = None,
+):
+    """Summarize a pipeline trace: time per stage and the critical path."""
+    import json
+
+    if trace_file.is_dir():
+        traces = sorted(trace_file.glob("*.jsonl"), key=lambda path: path.stat().st_mtime)
+        if not traces:
+            typer.echo(f"No trace files in {trace_file}")
+            raise typer.Exit(code=1)
+        trace_file = traces[-1]
+    spans = trace.load_spans(trace_file)
+    typer.echo(f"Trace {trace_file}")
+    typer.echo(trace.format_report(spans))
+    if chrome is not None:
+        chrome.parent.mkdir(parents=True, exist_ok=True)
+        chrome.write_text(json.dumps(trace.chrome_trace(spans)))
+        typer.echo(f"Chrome trace written to {chrome}")
+
+
 if __name__ == "__main__":
     app()
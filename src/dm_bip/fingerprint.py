@@ -0,0 +1,19 @@
+"""Content fingerprints used to key on-disk caches."""
+
+import hashlib
+from pathlib import Path
+
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's bytes."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def combine_digests(*parts: str) -> str:
+    """Return a SHA-256 hex digest over an ordered sequence of strings (digests, paths, options)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
@@ -0,0 +1,155 @@
+"""
+Choose a map chunk size per entity from the shape of its input tables.
+
+linkml-map buffers ``--chunk-size`` transformed records before writing them,
+so the chunk's memory grows with the size of a record: a narrow table wastes
+throughput on many tiny writes at a small chunk size, while a table with
+thousands of columns can run out of memory at the default of 10000. With
+``DM_MAP_CHUNK_SIZE=auto`` each entity's chunk size is instead the number of
+records that fit in a fixed amount of memory (:data:`CHUNK_MEMORY`, or a
+quarter of the entity's share of ``DM_MAP_MEMORY_BUDGET`` if that is less).
+
+A record's memory is estimated from the widest input table the entity's class
+derivations are populated from, sampling its first megabyte: its column count
+(a Python dict entry and value object per column) and its average row length
+(the values' text, decoded and then serialized again). The constants were
+measured on the toy study's mapped objects and round up.
+
+``scripts/benchmarks/bench_map_chunk_size.py`` shows the throughput and
+memory of fixed and automatic chunk sizes on narrow and wide tables.
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from dm_bip.map_data.resources import entity_tables, input_table
+
+AUTO = "auto"
+DEFAULT_CHUNK_SIZE = 10_000  # when no input table can be measured
+CHUNK_MEMORY = 32 * 1024**2  # bytes of buffered records per entity
+BUDGET_FRACTION = 0.25  # share of an entity's memory its chunk may take
+MIN_CHUNK_SIZE = 100
+MAX_CHUNK_SIZE = 100_000
+
+# Estimated bytes of one buffered record: fixed, per column, and per byte of the input row.
+RECORD_BYTES = 200
+COLUMN_BYTES = 80
+ROW_BYTE_FACTOR = 4
+
+SAMPLE_BYTES = 1 << 20
+
+
+@dataclass(frozen=True)
+class TableShape:
+    """Column count and average row length of an input table."""
+
+    columns: int
+    row_bytes: float
+
+    @property
+    def record_bytes(self) -> int:
+        """Estimated memory of one transformed record from this table."""
+        return int(RECORD_BYTES + COLUMN_BYTES * self.columns + ROW_BYTE_FACTOR * self.row_bytes)
+
+
+def table_shape(path: Path) -> TableShape | None:
+    """Measure a TSV or CSV table from its header and the rows in its first megabyte; None if it has no rows."""
+    with open(path, "rb") as f:
+        sample = f.read(SAMPLE_BYTES)
+    lines = sample.split(b"\n")
+    if len(lines) > 1 and len(sample) == SAMPLE_BYTES:
+        lines.pop()  # the last line may be cut off
+    header, *rows = lines
+    rows = [row for row in rows if row.strip()]
+    if not rows:
+        return None
+    separator = b"," if Path(path).suffix == ".csv" else b"\t"
+    return TableShape(columns=header.count(separator) + 1, row_bytes=sum(map(len, rows)) / len(rows))
+
+
+def _round_down(size: int) -> int:
+    """Round to two significant digits, so chunk sizes read as 30000 rather than 30174."""
+    scale = 10 ** max(len(str(size)) - 2, 0)
+    return size // scale * scale
+
+
+def auto_chunk_size(shapes: list[TableShape], memory: int | None = None) -> int:
+    """
+    Return a chunk size whose buffered records fit in memory.
+
+    Args:
+        shapes: The entity's input tables; the widest records decide.
+        memory: Memory the entity may use, if budgeted; its chunk gets
+            :data:`BUDGET_FRACTION` of it, at most :data:`CHUNK_MEMORY`.
+
+    Returns:
+        Records per chunk, between MIN_CHUNK_SIZE and MAX_CHUNK_SIZE, or
+        DEFAULT_CHUNK_SIZE with no table to measure.
+
+    """
+    if not shapes:
+        return DEFAULT_CHUNK_SIZE
+    target = CHUNK_MEMORY if memory is None else min(CHUNK_MEMORY, int(memory * BUDGET_FRACTION))
+    size = target // max(shape.record_bytes for shape in shapes)
+    return _round_down(min(max(size, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE))
+
+
+def table_shapes(input_dir: Path, tables: list[str]) -> list[TableShape]:
+    """Return the shapes of the named input tables that exist and have rows."""
+    shapes = []
+    for table in tables:
+        path = input_table(input_dir, table)
+        shape = table_shape(path) if path is not None else None
+        if shape is not None:
+            shapes.append(shape)
+    return shapes
+
+
+def entity_chunk_size(input_dir: Path, tables: list[str], memory: int | None = None) -> int:
+    """Return the automatic chunk size for an entity reading the named input tables."""
+    return auto_chunk_size(table_shapes(input_dir, tables), memory)
+
+
+def parse_chunk_size(text: str | int) -> int | None:
+    """Parse a chunk size: a positive record count, or ``auto`` (returned as None)."""
+    if str(text).strip().lower() == AUTO:
+        return None
+    try:
+        size = int(text)
+    except ValueError:
+        size = 0
+    if size < 1:
+        raise ValueError(f"Not a chunk size: {text!r} (use a positive number of records or auto)")
+    return size
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI entry point: print the automatic chunk size of one entity (used by ``pipeline.Makefile``)."""
+    from dm_bip.map_data.scheduler import parse_memory
+
+    parser = argparse.ArgumentParser(description="Print the automatic map chunk size of an entity.")
+    parser.add_argument("--entity", required=True, help="Entity to size")
+    parser.add_argument("-T", "--trans-spec", action="append", required=True, type=Path, help="Spec file or directory")
+    parser.add_argument("--input-dir", required=True, type=Path, help="Directory of input tables")
+    parser.add_argument("--memory-budget", help="Memory the entity may use: bytes, 512M, 8G, ... or auto")
+    args = parser.parse_args(argv)
+    try:
+        memory = parse_memory(args.memory_budget)
+    except ValueError as e:
+        parser.error(str(e))
+    tables = entity_tables(args.trans_spec, args.entity)
+    shapes = table_shapes(args.input_dir, tables)
+    if not shapes:
+        print(
+            f"No input table of {args.entity} to measure in {args.input_dir} (tables: {', '.join(tables) or 'none'});"
+            f" using the default chunk size {DEFAULT_CHUNK_SIZE}",
+            file=sys.stderr,
+        )
+    print(auto_chunk_size(shapes, memory))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
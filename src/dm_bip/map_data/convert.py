@@ -0,0 +1,198 @@
+"""
+Write an entity's mapped records in its output formats after mapping.
+
+With ``DM_MAP_STREAM=true`` an entity is mapped to one JSON Lines file only.
+linkml-map formats every record in each ``-f`` / ``-O`` format inside the map
+process, and its YAML writer runs PyYAML's pure-Python emitter over each
+record, which for a large entity costs more than the transformation. The
+requested formats are then written from the JSON Lines file by
+:func:`convert`, a chunk of records at a time, so neither step holds more than
+a chunk in memory and the map process keeps to transforming records. Each
+format is written by a process of its own (a make target per format, or
+:func:`convert_in_parallel` in ``dm-bip map``), so they run side by side.
+
+The JSON Lines file is not a jsonl output: it lives under :data:`STREAM_DIR`
+and, unlike linkml-map's JSON and JSONL writers, keeps null-valued slots
+(:func:`stream_writer`; :mod:`dm_bip.map_data.stream` for ``linkml-map
+map-data``). Every requested format, jsonl included, is written from it by
+linkml-map's own writers, so the files are byte for byte those linkml-map
+writes directly: YAML keeps its ``slot: null`` entries, and a TSV/CSV header
+lists the same columns in the same order. YAML is emitted with libyaml where
+PyYAML has it. Parquet, which linkml-map cannot write, is only ever written
+here (see :mod:`dm_bip.map_data.parquet`); it needs the target schema and the
+entity.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from collections.abc import Iterator
+from contextlib import ExitStack
+from pathlib import Path
+
+import yaml
+
+from dm_bip.map_data.parquet import ParquetWriter, parquet_columns
+
+# The format entities are mapped to before conversion, and where its file is
+# kept (under the mapped-data directory) until every format is written.
+STREAM_FORMAT = "jsonl"
+STREAM_DIR = ".stream"
+PARQUET_SUFFIX = ".parquet"
+
+_Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def stream_path(outputs: list[Path], stream_dir: Path) -> Path:
+    """Return the JSON Lines file an entity with these outputs is mapped to, under stream_dir."""
+    return Path(stream_dir) / f"{Path(outputs[0]).stem}.{STREAM_FORMAT}"
+
+
+def stream_writer():
+    """Return a linkml-map JSONL stream writer that keeps null-valued slots, for the file entities are mapped to."""
+    from linkml_map.writers.output_streams import JSONLStreamWriter
+
+    class _StreamWriter(JSONLStreamWriter):
+        """linkml-map's JSON Lines, null-valued slots included."""
+
+        def write_chunk(self, chunk: list[dict]) -> Iterator[str]:
+            for obj in chunk:
+                yield json.dumps(obj, ensure_ascii=False) + "\n"
+
+    return _StreamWriter()
+
+
+def read_records(path: Path) -> Iterator[dict]:
+    """Yield the records of a JSON Lines file one at a time."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _writer(path: Path):
+    """Return the linkml-map stream writer for an output file, by its extension."""
+    from linkml_map.writers import OutputFormat, make_stream_writer
+    from linkml_map.writers.output_streams import YAMLStreamWriter
+
+    class _YAMLWriter(YAMLStreamWriter):
+        """linkml-map's YAML document stream, emitted by libyaml."""
+
+        def write_chunk(self, chunk: list[dict]) -> Iterator[str]:
+            for obj in chunk:
+                yield yaml.dump(obj, Dumper=_Dumper, default_flow_style=False, allow_unicode=True)
+                yield "---\n"
+
+    try:
+        fmt = OutputFormat(Path(path).suffix.lstrip(".").lower())
+    except ValueError:
+        raise ValueError(f"Cannot write {path}: unknown output format {Path(path).suffix!r}") from None
+    return _YAMLWriter() if fmt == OutputFormat.YAML else make_stream_writer(fmt)
+
+
+def convert(
+    source: Path,
+    outputs: list[Path],
+    chunk_size: int = 1000,
+    target_schema: Path | None = None,
+    entity: str | None = None,
+) -> int:
+    """
+    Write the records of a JSON Lines file to output files in other formats.
+
+    Args:
+        source: The mapped entity, as JSON Lines.
+        outputs: Files to write, each in the format of its extension (yaml,
+            json, jsonl, tsv, csv or parquet); the source itself is skipped.
+            JSON and JSONL leave out null-valued slots, as linkml-map's do.
+        chunk_size: Records read and formatted at a time (a Parquet record batch).
+        target_schema: The target schema, for Parquet's column types.
+        entity: The entity's target class, for Parquet's columns.
+
+    Returns:
+        The number of records converted.
+
+    """
+    from linkml_map.writers import MultiStreamWriter
+    from more_itertools import chunked
+
+    source = Path(source)
+    targets = [Path(p) for p in outputs if Path(p).resolve() != source.resolve()]
+    tables = [path for path in targets if path.suffix.lower() == PARQUET_SUFFIX]
+    writers = [(_writer(path), path) for path in targets if path not in tables]
+    if tables and not (target_schema and entity):
+        raise ValueError(f"Cannot write {tables[0]}: Parquet needs the target schema and the entity")
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    with ExitStack() as stack:
+        columns = parquet_columns(target_schema, entity) if tables else []
+        parquet_writers = [stack.enter_context(ParquetWriter(path, columns)) for path in tables]
+
+        def written(chunks):
+            for chunk in chunks:
+                for writer in parquet_writers:
+                    writer.write_chunk(chunk)
+                yield chunk
+
+        MultiStreamWriter(writers).write_all(written(chunked(counted(read_records(source)), chunk_size)))
+    return count
+
+
+def convert_in_parallel(
+    source: Path,
+    outputs: list[Path],
+    chunk_size: int = 1000,
+    target_schema: Path | None = None,
+    entity: str | None = None,
+) -> None:
+    """
+    Write each output from a JSON Lines file in a process of its own, all at once (see :func:`convert`).
+
+    Raises:
+        RuntimeError: If any conversion fails; its message holds the failed
+            processes' error output.
+
+    """
+    source = Path(source)
+    targets = [Path(p) for p in outputs if Path(p).resolve() != source.resolve()]
+    command = [sys.executable, "-m", "dm_bip.map_data.convert", str(source), "--chunk-size", str(chunk_size)]
+    if target_schema and entity:
+        command += ["--target-schema", str(target_schema), "--entity", entity]
+    procs = {
+        path: subprocess.Popen(  # noqa: S603 - this module, on the caller's files
+            [*command, "--output", str(path)], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        for path in targets
+    }
+    errors = {path: proc.communicate()[1] for path, proc in procs.items()}
+    failed = [f"{path}: {errors[path].strip()}" for path, proc in procs.items() if proc.returncode != 0]
+    if failed:
+        raise RuntimeError("Conversion failed:\n" + "\n".join(failed))
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI entry point: convert one mapped JSON Lines file to the other output formats."""
+    parser = argparse.ArgumentParser(description="Write a mapped JSON Lines file in other output formats.")
+    parser.add_argument("source", type=Path, help="Mapped entity records, as JSON Lines")
+    parser.add_argument("--output", action="append", default=[], type=Path, help="File to write; repeatable")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Records formatted at a time")
+    parser.add_argument("--target-schema", type=Path, help="Target schema, for Parquet columns")
+    parser.add_argument("--entity", help="Entity (target class) the records are, for Parquet columns")
+    args = parser.parse_args(argv)
+    try:
+        count = convert(args.source, args.output, args.chunk_size, args.target_schema, args.entity)
+    except (ImportError, ValueError) as e:
+        parser.error(str(e))
+    print(f"Converted {count} record(s) from {args.source}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
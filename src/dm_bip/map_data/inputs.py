@@ -0,0 +1,134 @@
+"""
+Give each entity's map only the input tables its specs read.
+
+``linkml-map map-data`` is handed a whole input directory per entity, although
+an entity's class derivations name only a few of its tables. This module works
+out which, from the entity's class derivations in every spec file:
+
+- the table each class derivation (and each nested one) is populated from;
+- every ``joins:`` entry, by its ``class_named`` table or its alias;
+- any table named as the root of a dotted reference, as linkml-map synthesizes
+  joins for them: ``populated_from: table.column`` or ``{table.column}`` in an
+  expression.
+
+and links just those files into ``<link_dir>/<Entity>/``, which the per-entity
+Makefile rule passes to linkml-map instead of the input directory. A dotted
+``populated_from`` whose root is neither a table nor a join alias may be a
+foreign-key path through the source schema, whose table cannot be known from
+the specs alone; such an entity keeps the whole input directory.
+"""
+
+import argparse
+import os
+import re
+import sys
+from pathlib import Path
+
+from dm_bip.map_data.resources import entity_derivations
+
+# File types linkml-map's DataLoader finds a table in, in its order of preference.
+DATA_SUFFIXES = (".tsv", ".csv", ".yaml", ".yml", ".json")
+
+# The root of a dotted name, e.g. "subject" in "subject.age" or "{subject.age} * 2".
+_DOTTED_ROOT = re.compile(r"(?<![\w.])([A-Za-z_]\w*)\s*\.\s*[A-Za-z_]")
+
+
+def available_tables(input_dir: Path) -> set[str]:
+    """Return the names of the tables in an input directory (file stems of the supported types)."""
+    return {p.stem for p in Path(input_dir).iterdir() if p.suffix.lower() in DATA_SUFFIXES}
+
+
+def _walk(node, key: str | None = None):
+    """Yield every (key, value) pair below a parsed spec node, keyed by the mapping key it sits under."""
+    if isinstance(node, dict):
+        for k, v in node.items():
+            yield k, v
+            yield from _walk(v, k)
+    elif isinstance(node, list):
+        for item in node:
+            yield key, item
+            yield from _walk(item, key)
+
+
+def needed_tables(derivations: list[dict], tables: set[str]) -> set[str] | None:
+    """
+    Return the tables some class derivations read.
+
+    Args:
+        derivations: The entity's class derivations, as parsed from the specs.
+        tables: The tables in the input directory; names that are not tables
+            (columns, functions, a missing table) are left out.
+
+    Returns:
+        The names of the tables to keep, or None if a reference cannot be
+        resolved without the source schema and every table must be kept.
+
+    """
+    pairs = [pair for cd in derivations for pair in _walk(cd)]
+    aliases = set()
+    needed = {cd.get("populated_from") or cd.get("name") for cd in derivations}
+    for key, value in pairs:
+        if key == "joins" and isinstance(value, dict):
+            for alias, join in value.items():
+                aliases.add(alias)
+                needed.add((join.get("class_named") if isinstance(join, dict) else None) or alias)
+    for key, value in pairs:
+        if not isinstance(value, str):
+            continue
+        roots = set(_DOTTED_ROOT.findall(value))
+        if key == "populated_from":
+            root = value.split(".", 1)[0].strip()
+            if "." in value and root not in tables and root not in aliases:
+                return None
+            needed.add(root)
+        needed |= roots & tables
+    return needed & tables
+
+
+def entity_input_tables(spec_paths: list[Path], entity: str, input_dir: Path) -> set[str] | None:
+    """Return the input tables an entity's class derivations read, or None if they may read any."""
+    return needed_tables(entity_derivations(spec_paths, entity), available_tables(input_dir))
+
+
+def link_inputs(input_dir: Path, tables: set[str], link_dir: Path) -> Path:
+    """
+    Make link_dir hold symlinks to the named tables' files in input_dir, and nothing else.
+
+    Links from an earlier run that are no longer needed are removed, so the
+    directory always matches the current specs.
+    """
+    input_dir = Path(input_dir).resolve()
+    link_dir = Path(link_dir)
+    link_dir.mkdir(parents=True, exist_ok=True)
+    wanted = {p.name: p for p in input_dir.iterdir() if p.suffix.lower() in DATA_SUFFIXES and p.stem in tables}
+    for link in link_dir.iterdir():
+        if link.name not in wanted or not link.is_symlink() or Path(os.readlink(link)) != wanted[link.name]:
+            link.unlink()
+    for name, target in wanted.items():
+        if not (link_dir / name).is_symlink():
+            (link_dir / name).symlink_to(target)
+    return link_dir
+
+
+def entity_input_dir(spec_paths: list[Path], entity: str, input_dir: Path, link_dir: Path) -> Path:
+    """Return the directory to map an entity from: its linked tables, or input_dir when they cannot be pruned."""
+    tables = entity_input_tables(spec_paths, entity, input_dir)
+    if tables is None:
+        return Path(input_dir)
+    return link_inputs(input_dir, tables, Path(link_dir) / entity)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI entry point: link an entity's input tables and print the directory to map it from."""
+    parser = argparse.ArgumentParser(description="Link the input tables an entity reads and print their directory.")
+    parser.add_argument("--entity", required=True, help="Entity to map")
+    parser.add_argument("-T", "--trans-spec", action="append", required=True, type=Path, help="Spec file or directory")
+    parser.add_argument("--input-dir", required=True, type=Path, help="Directory of input tables")
+    parser.add_argument("--link-dir", required=True, type=Path, help="Directory to create <Entity>/ links under")
+    args = parser.parse_args(argv)
+    print(entity_input_dir(args.trans_spec, args.entity, args.input_dir, args.link_dir))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
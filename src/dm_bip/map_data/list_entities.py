@@ -2,25 +2,188 @@
 List class_derivations entity names from a TransformationSpecification dir/files.
 
 Used by `pipeline.Makefile` to discover entities for per-entity `make -j`
-parallelism without first materializing composed spec files. Reuses
-``linkml_map.utils.spec_merge`` so the merge semantics match exactly what
-``linkml-map map-data -T <dir>/`` does at run time.
-
-Upstream candidate: this is a thin wrapper around ``load_and_merge_specs``
-and should move into ``linkml-map`` as a ``list-entities`` CLI subcommand.
-Once that lands, this file can be deleted and the Makefile shelled out to
-``linkml-map list-entities -T <dir>/`` directly.
+parallelism without first materializing composed spec files. Spec paths are
+resolved the way ``linkml-map map-data -T <dir>/`` resolves them (recursive
+``*.yaml`` / ``*.yml``, sorted per directory), and names are collected with the
+same semantics as ``linkml_map.utils.spec_merge.load_and_merge_specs`` — but
+without importing ``linkml_map`` or merging the specs:
+
+- Each file is first read with a line scanner that only picks out the keys
+  directly under a top-level ``class_derivations:`` (both the standard
+  mapping form and the compact ``- class_derivations:`` list-of-blocks form).
+- Anything the scanner does not recognise (flow style, JSON, expanded
+  ``- name:`` lists, quoted keys, multiple documents) falls back to parsing
+  that one file with PyYAML.
+- With ``cache_path``, the result is stored alongside a fingerprint of every
+  spec file's path, size and mtime, and returned without reading any spec
+  while that fingerprint is unchanged.
+
+Upstream candidate: this should move into ``linkml-map`` as a
+``list-entities`` CLI subcommand. Once that lands, this file can be deleted
+and the Makefile shelled out to ``linkml-map list-entities -T <dir>/`` directly.
 """
 
 from __future__ import annotations
 
+import argparse
+import json
+import os
+import re
 import sys
 from pathlib import Path
 
-from linkml_map.utils.spec_merge import load_and_merge_specs
+CACHE_VERSION = 1
 
+# A top-level class_derivations key: "class_derivations:" or "- class_derivations:" at column 0.
+_CD_KEY = re.compile(r"^(-[ ]+)?class_derivations:[ ]*(#.*)?$")
+# A plain block-mapping key line, e.g. "    Person:" or "  Person: {}".
+_PLAIN_KEY = re.compile(r"^([ ]*)([A-Za-z_][\w.-]*):(?:[ ].*)?$")
 
-def list_entities(paths: list[str | Path]) -> list[str]:
+
+def _resolve_spec_paths(paths: list[str | Path]) -> list[Path]:
+    """Mirror ``linkml_map.utils.spec_merge.resolve_spec_paths``; raise FileNotFoundError for a missing path."""
+    resolved: list[Path] = []
+    for p in paths:
+        path = Path(p)
+        if not path.exists():
+            raise FileNotFoundError(path)
+        if path.is_dir():
+            resolved.extend(sorted([*path.rglob("*.yaml"), *path.rglob("*.yml")]))
+        else:
+            resolved.append(path)
+    return resolved
+
+
+def _scan_class_derivation_names(text: str) -> list[str] | None:
+    """
+    Return the keys under each top-level ``class_derivations:`` in a block-style YAML spec.
+
+    Returns:
+        The names in file order, or None if the text uses YAML this scanner does
+        not handle, in which case the caller should parse the file properly.
+
+    """
+    names: list[str] = []
+    key_indent: int | None = None  # column of the class_derivations key we are inside, if any
+    name_indent: int | None = None  # column of its child keys, fixed by the first one
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if "\t" in line[: len(line) - len(line.lstrip())] or stripped.startswith(("---", "...", "%", "&", "*", "!")):
+            return None
+        indent = len(line) - len(line.lstrip(" "))
+
+        if key_indent is not None:
+            if indent > key_indent:
+                if name_indent is None:
+                    name_indent = indent
+                if indent == name_indent:
+                    match = _PLAIN_KEY.match(line)
+                    if match is None:
+                        return None
+                    names.append(match.group(2))
+                continue
+            if name_indent is None and stripped.startswith("-"):
+                # A sequence value at the key's own indentation: expanded "- name:" form.
+                return None
+            key_indent = name_indent = None
+
+        if indent == 0:
+            match = _CD_KEY.match(line)
+            if match is not None:
+                key_indent = len(match.group(1) or "")
+            elif stripped.startswith(("{", "[")) or "class_derivations" in stripped:
+                return None
+        elif stripped.startswith("class_derivations"):
+            # A top-level key laid out in a way the scanner does not follow (e.g. "-" on its own line).
+            return None
+    return names
+
+
+def class_derivations(data: object) -> list[dict]:
+    """
+    Return the class derivations of a parsed spec document, in file order, each as ``{"name": ..., **body}``.
+
+    A document is one block or a list of blocks, and each block's
+    ``class_derivations`` may be a mapping ``{Entity: body}``, a list of
+    expanded ``{"name": Entity, ...}`` entries, or a list of compact
+    ``{Entity: body}`` entries (what ``load_and_merge_specs`` and the
+    trans-spec builders produce).
+    """
+    if isinstance(data, dict):
+        blocks = [data]
+    elif isinstance(data, list):
+        blocks = [item for item in data if isinstance(item, dict)]
+    else:
+        blocks = []
+
+    derivations: list[dict] = []
+    for block in blocks:
+        cds = block.get("class_derivations")
+        if isinstance(cds, dict):
+            cds = [cds]
+        elif not isinstance(cds, list):
+            continue
+        for cd in cds:
+            if not isinstance(cd, dict):
+                continue
+            if "name" in cd:
+                derivations.append(cd)
+            else:
+                derivations.extend(
+                    {"name": name, **(body if isinstance(body, dict) else {})} for name, body in cd.items()
+                )
+    return derivations
+
+
+def load_spec(path: Path) -> object:
+    """Parse one spec file, JSON or YAML (with libyaml where PyYAML has it)."""
+    if path.suffix == ".json":
+        with open(path) as f:
+            return json.load(f)
+    import yaml
+
+    with open(path) as f:
+        return yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))  # noqa: S506 - a safe loader
+
+
+def _parse_class_derivation_names(path: Path) -> list[str]:
+    """Fully parse one spec file and return its class_derivations names, as load_and_merge_specs would see them."""
+    return [cd["name"] for cd in class_derivations(load_spec(path))]
+
+
+def _spec_names(path: Path) -> list[str]:
+    names = _scan_class_derivation_names(path.read_text())
+    return names if names is not None else _parse_class_derivation_names(path)
+
+
+def _fingerprint(spec_files: list[Path]) -> list[list]:
+    fingerprint = []
+    for path in spec_files:
+        st = path.stat()
+        fingerprint.append([str(path), st.st_size, st.st_mtime_ns])
+    return fingerprint
+
+
+def _read_cache(cache_path: Path, fingerprint: list[list]) -> list[str] | None:
+    try:
+        cached = json.loads(cache_path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if cached.get("version") != CACHE_VERSION or cached.get("fingerprint") != fingerprint:
+        return None
+    return cached.get("entities")
+
+
+def _write_cache(cache_path: Path, fingerprint: list[list], entities: list[str]) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"version": CACHE_VERSION, "fingerprint": fingerprint, "entities": entities}))
+    os.replace(tmp, cache_path)
+
+
+def list_entities(paths: list[str | Path], cache_path: Path | None = None) -> list[str]:
     """
     Return sorted unique class_derivations entity names from spec paths.
 
@@ -29,41 +192,39 @@ def list_entities(paths: list[str | Path]) -> list[str]:
 
     Args:
         paths: One or more spec file or directory paths.
+        cache_path: Optional JSON file caching the result against the spec
+            files' paths, sizes and mtimes.
 
     Returns:
         Sorted list of unique class_derivations names.
 
     """
     try:
-        merged = load_and_merge_specs(tuple(paths))
-    except (FileNotFoundError, ValueError):
+        spec_files = _resolve_spec_paths(paths)
+    except FileNotFoundError:
         return []
 
-    cds = merged.get("class_derivations") or []
-    # When a single spec is loaded, ``load_and_merge_specs`` returns its
-    # ``class_derivations`` unchanged — which may be a dict ``{ClassName: body}``
-    # rather than the list form produced by the multi-spec merge path.
-    if isinstance(cds, dict):
-        return sorted(cds.keys())
+    if cache_path is None:
+        return sorted({name for path in spec_files for name in _spec_names(path)})
 
-    names: set[str] = set()
-    for cd in cds:
-        if not isinstance(cd, dict):
-            continue
-        if "name" in cd:
-            names.add(cd["name"])
-        else:
-            names.update(cd.keys())
-    return sorted(names)
+    fingerprint = _fingerprint(spec_files)
+    entities = _read_cache(cache_path, fingerprint)
+    if entities is None:
+        entities = sorted({name for path in spec_files for name in _spec_names(path)})
+        _write_cache(cache_path, fingerprint, entities)
+    return entities
 
 
 def main(argv: list[str] | None = None) -> int:
-    """CLI entry point: print one entity name per line."""
-    args = sys.argv[1:] if argv is None else argv
-    if not args:
-        print(f"Usage: {sys.argv[0]} <spec-path> [<spec-path>...]", file=sys.stderr)
+    """CLI entry point: print one entity name per line; exit 1 with a usage line when given no spec paths."""
+    parser = argparse.ArgumentParser(description="List class_derivations entity names from trans-spec paths.")
+    parser.add_argument("paths", nargs="*", type=Path, help="Spec files or directories")
+    parser.add_argument("--cache", type=Path, help="Reuse the result while spec file sizes and mtimes are unchanged")
+    args = parser.parse_args(argv)
+    if not args.paths:
+        print(f"Usage: {sys.argv[0]} [--cache <file>] <spec-path> [<spec-path>...]", file=sys.stderr)
         return 1
-    for name in list_entities(args):
+    for name in list_entities(args.paths, cache_path=args.cache):
         print(name)
     return 0
 
@@ -0,0 +1,319 @@
+"""
+Write mapped entities as Parquet, with columns typed from the target schema.
+
+A mapped record is a nested dict, while Parquet needs a fixed, typed column
+layout before the first row is written. :func:`parquet_columns` derives one
+from the entity's class in the target schema:
+
+- each slot is a column typed from its range: integer slots are int64;
+  float, double and decimal slots float64; boolean slots bool; strings,
+  dates, URIs, enums and references to other objects are strings;
+- an inlined single-valued object (``value_quantity: Quantity``) is flattened
+  into a column per slot of its class, named as linkml-map's TSV writer names
+  them (``value_quantity__value_decimal``);
+- a multivalued slot of a type or a reference is a list column; a multivalued
+  inlined object, or one whose class is already being flattened, is JSON text.
+
+Values are converted to their column's type only where nothing is lost
+(``1001`` in a string slot is written as ``"1001"``, ``2.0`` in an integer
+slot as ``2``); a value its column cannot hold exactly (``2.7`` in an integer
+slot, ``"12 mg"`` where an object is flattened) or a record slot the class does
+not have is an error rather than a changed or dropped value. :class:`ParquetWriter` writes one record batch
+per chunk of records, so memory stays that of a chunk. :func:`read_parquet`
+yields the records back as nested dicts without null-valued slots, as JSON
+Lines has them, for round-trip checks (``dm-bip read-parquet``).
+
+pyarrow comes with dm-bip's optional ``parquet`` extra
+(``pip install 'dm-bip[parquet]'``); the pipeline converts to Parquet under
+``uv run --extra parquet``.
+"""
+
+import json
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+SEPARATOR = "__"  # joins nested slot names in column names, as in linkml-map's TSV output
+
+# Field metadata: the slot path a column holds, and whether its values are JSON text.
+_PATH_KEY = b"dm_bip.path"
+_JSON_KEY = b"dm_bip.json"
+
+# LinkML type bases (SchemaView.induced_type(...).base) stored as other than strings.
+_VALUE_TYPES = {"int": "int64", "float": "float64", "Decimal": "float64", "Bool": "bool_"}
+
+
+def _pyarrow():
+    """Import pyarrow and pyarrow.parquet, or explain how to get them."""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401 - makes pyarrow.parquet available
+    except ImportError as e:
+        raise ImportError(
+            "Parquet output needs pyarrow, from the dm-bip[parquet] extra: "
+            "run under `uv run --extra parquet` or `pip install 'dm-bip[parquet]'`"
+        ) from e
+    return pyarrow
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        if value.strip().lower() in ("true", "1", "yes"):
+            return True
+        if value.strip().lower() in ("false", "0", "no"):
+            return False
+        raise ValueError(f"not a boolean: {value!r}")
+    return bool(value)
+
+
+def _to_int(value) -> int:
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"not a whole number: {value!r}")
+    return int(value)
+
+
+def _to_str(value) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, list | dict) else str(value)
+
+
+_CONVERTERS: dict[str, Callable] = {"int64": _to_int, "float64": float, "bool_": _to_bool, "string": _to_str}
+
+
+@dataclass(frozen=True)
+class Column:
+    """One Parquet column: the slot path it holds and how its values are stored."""
+
+    path: tuple[str, ...]
+    value_type: str = "string"  # a pyarrow type factory name: int64, float64, bool_ or string
+    multivalued: bool = False
+    as_json: bool = False  # the slot's value, whatever its shape, as JSON text
+
+    @property
+    def name(self) -> str:
+        """Column name: the slot path joined by SEPARATOR."""
+        return SEPARATOR.join(self.path)
+
+    def field(self, pa):
+        """Return the column as a pyarrow field, with its path in the field metadata."""
+        value_type = getattr(pa, self.value_type)()
+        metadata = {_PATH_KEY: json.dumps(self.path).encode()}
+        if self.as_json:
+            metadata[_JSON_KEY] = b"true"
+        return pa.field(self.name, pa.list_(value_type) if self.multivalued else value_type, metadata=metadata)
+
+    @classmethod
+    def from_field(cls, pa, field) -> "Column":
+        """Return the column a field written by :meth:`field` holds."""
+        metadata = field.metadata or {}
+        path = tuple(json.loads(metadata[_PATH_KEY])) if _PATH_KEY in metadata else (field.name,)
+        multivalued = pa.types.is_list(field.type)
+        value_type = field.type.value_type if multivalued else field.type
+        name = next((n for n in _CONVERTERS if getattr(pa, n)() == value_type), "string")
+        return cls(path, name, multivalued, metadata.get(_JSON_KEY) == b"true")
+
+    def value(self, record: dict):
+        """Return this column's value in a record, converted to its type, or None."""
+        value = record
+        for key in self.path[:-1]:
+            value = value.get(key)
+            if value is None:
+                return None
+            if not isinstance(value, dict):
+                raise ValueError(f"{key} is not an object: {value!r}")
+        value = value.get(self.path[-1])
+        if value is None:
+            return None
+        if self.as_json:
+            return json.dumps(value, ensure_ascii=False)
+        convert = _CONVERTERS[self.value_type]
+        if self.multivalued:
+            return [convert(v) for v in (value if isinstance(value, list) else [value]) if v is not None]
+        return convert(value)
+
+
+def parquet_columns(target_schema, class_name: str) -> list[Column]:
+    """
+    Return the Parquet columns for records of a target schema class.
+
+    Args:
+        target_schema: The target schema, as a path or a SchemaView.
+        class_name: The class the records are (the mapped entity).
+
+    Returns:
+        The columns, in the class's slot order, nested objects flattened in place.
+
+    """
+    from linkml_runtime import SchemaView
+
+    sv = target_schema if isinstance(target_schema, SchemaView) else SchemaView(str(target_schema))
+    if class_name not in sv.all_classes():
+        raise ValueError(f"Target schema has no class {class_name!r}")
+    return _class_columns(sv, class_name, (), (class_name,))
+
+
+def _class_columns(sv, class_name: str, prefix: tuple[str, ...], flattening: tuple[str, ...]) -> list[Column]:
+    columns = []
+    for slot in sv.class_induced_slots(class_name):
+        path = (*prefix, slot.name)
+        range_ = slot.range or sv.schema.default_range or "string"
+        if range_ in sv.all_classes() and sv.is_inlined(slot):
+            if slot.multivalued or range_ in flattening:
+                columns.append(Column(path, as_json=True))
+            else:
+                columns.extend(_class_columns(sv, range_, path, (*flattening, range_)))
+            continue
+        value_type = "string"
+        if range_ in sv.all_types():
+            value_type = _VALUE_TYPES.get(sv.induced_type(range_).base, "string")
+        columns.append(Column(path, value_type, multivalued=bool(slot.multivalued)))
+    return columns
+
+
+def _slot_tree(columns: list[Column]) -> dict:
+    """Return the slot paths as nested dicts; a column's leaf is None."""
+    tree: dict = {}
+    for column in columns:
+        node = tree
+        for key in column.path[:-1]:
+            node = node.setdefault(key, {})
+        node[column.path[-1]] = None
+    return tree
+
+
+def _unknown_slot(record: dict, tree: dict, prefix: str = "") -> str | None:
+    """Return the first slot of a record that has no column, if any."""
+    for key, value in record.items():
+        if key not in tree:
+            return prefix + key
+        if isinstance(tree[key], dict) and isinstance(value, dict):
+            found = _unknown_slot(value, tree[key], f"{prefix}{key}.")
+            if found:
+                return found
+    return None
+
+
+class ParquetWriter:
+    """Write records to a Parquet file one record batch per chunk."""
+
+    def __init__(self, path: Path, columns: list[Column]):
+        """Open path for records laid out as columns."""
+        self._pa = _pyarrow()
+        self.path = Path(path)
+        self.columns = columns
+        self.schema = self._pa.schema([column.field(self._pa) for column in columns])
+        self._tree = _slot_tree(columns)
+        self._writer = self._pa.parquet.ParquetWriter(str(self.path), self.schema)
+
+    def write_chunk(self, records: list[dict]) -> None:
+        """Write a chunk of records as one record batch."""
+        if not records:
+            return
+        for record in records:
+            unknown = _unknown_slot(record, self._tree)
+            if unknown:
+                raise ValueError(f"Cannot write {self.path}: the target class has no slot {unknown!r}")
+        arrays = []
+        for column, field in zip(self.columns, self.schema, strict=True):
+            try:
+                values = [column.value(record) for record in records]
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Cannot write {self.path}: column {column.name}: {e}") from e
+            arrays.append(self._pa.array(values, type=field.type))
+        self._writer.write_batch(self._pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        """Finish the file (an entity without records still gets its columns)."""
+        self._writer.close()
+
+    def __enter__(self) -> "ParquetWriter":
+        """Return the open writer."""
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Close the file."""
+        self.close()
+
+
+def _unflatten(row: dict, columns: dict[str, Column]) -> dict:
+    """Return a flat Parquet row as a nested record, leaving out null values."""
+    record: dict = {}
+    for name, value in row.items():
+        if value is None:
+            continue
+        column = columns[name]
+        node = record
+        for key in column.path[:-1]:
+            node = node.setdefault(key, {})
+        node[column.path[-1]] = json.loads(value) if column.as_json else value
+    return record
+
+
+def read_parquet(path: Path) -> Iterator[dict]:
+    """Yield the records of a Parquet file written by :class:`ParquetWriter`, a record batch at a time."""
+    pa = _pyarrow()
+    parquet = pa.parquet.ParquetFile(str(path))
+    columns = {field.name: Column.from_field(pa, field) for field in parquet.schema_arrow}
+    for batch in parquet.iter_batches():
+        for row in batch.to_pylist():
+            yield _unflatten(row, columns)
+
+
+def _is_null(value) -> bool:
+    """Return whether a value is null, or an object all of whose slots are (both read back as absent)."""
+    return value is None or (isinstance(value, dict) and all(map(_is_null, value.values())))
+
+
+def _same(actual, expected) -> bool:
+    """Return whether a value read back from Parquet is a record's value, allowing only lossless type changes."""
+    if isinstance(actual, str) and not isinstance(expected, str):
+        return actual == _to_str(expected)
+    if isinstance(actual, list) and not isinstance(expected, list):
+        expected = [expected]  # a single value in a multivalued slot
+    if isinstance(expected, dict):
+        present = {k for k, v in expected.items() if not _is_null(v)}
+        return (
+            isinstance(actual, dict)
+            and {k for k, v in actual.items() if not _is_null(v)} == present
+            and all(_same(actual[k], expected[k]) for k in present)
+        )
+    if isinstance(expected, list):
+        expected = [v for v in expected if v is not None]
+        return isinstance(actual, list) and len(actual) == len(expected) and all(map(_same, actual, expected))
+    if isinstance(expected, str) and not isinstance(actual, str):
+        try:
+            return (_to_bool(expected) if isinstance(actual, bool) else float(expected)) == actual
+        except ValueError:
+            return False
+    return actual == expected
+
+
+def round_trip_differences(path: Path, records: Iterator[dict], limit: int = 10) -> tuple[int, list[str]]:
+    """
+    Compare a Parquet file with the records it was written from.
+
+    Args:
+        path: A Parquet file written by :class:`ParquetWriter`.
+        records: The records written to it, e.g. from the entity's JSON Lines. Values read back
+            must equal these up to lossless type changes (``1`` read as ``"1"`` or ``1.0``).
+        limit: Differences to describe at most.
+
+    Returns:
+        The number of records read, and descriptions of the first differences.
+
+    """
+    read = iter(read_parquet(path))
+    differences: list[str] = []
+    count = 0
+    for count, expected in enumerate(records, 1):
+        actual = next(read, None)
+        if actual is None:
+            differences.append(f"record {count}: missing from {path}")
+            break
+        if not _same(actual, expected) and len(differences) < limit:
+            differences.append(f"record {count}: {json.dumps(actual)} != {json.dumps(expected)}")
+    extra = sum(1 for _ in read)
+    if extra:
+        differences.append(f"{extra} record(s) in {path} beyond the {count} expected")
+    return count, differences
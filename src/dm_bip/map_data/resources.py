@@ -0,0 +1,254 @@
+"""
+Per-entity resource usage of the map step.
+
+Each mapped entity leaves ``<log_dir>/<E>.resources.json`` next to its log:
+wall time, CPU user and system time, peak RSS of the process that mapped it,
+rows read from its input tables, records written and output bytes.
+``python -m dm_bip.provenance --map-resources-dir <log_dir>`` rolls them into
+``provenance.yaml``, so runs can be compared across releases and instances
+sized from data rather than from ``memory.peak`` of the whole container.
+
+``dm-bip map`` records these itself. For the per-entity ``linkml-map``
+Makefile rule, this module wraps the command::
+
+    python -m dm_bip.map_data.resources --entity E --log-dir logs -T specs/ --input-dir input/
+        --output out/E.yaml -- linkml-map map-data ...
+
+and measures it from outside: CPU time and peak RSS are those of the waited-for
+child processes, records written are counted in the primary output file, and
+rows read are the data rows of the tables the entity's class derivations are
+populated from.
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+
+from dm_bip import trace
+
+RESOURCES_SUFFIX = ".resources.json"
+TABLE_SUFFIXES = (".tsv", ".csv")
+
+
+def resources_path(log_dir: Path, entity: str) -> Path:
+    """Return the file holding an entity's resource usage."""
+    return Path(log_dir) / f"{entity}{RESOURCES_SUFFIX}"
+
+
+def _maxrss_bytes(maxrss: int) -> int:
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+@dataclass
+class EntityResources:
+    """Resources one entity's map run used; measurements are None when the run could not report them."""
+
+    entity: str
+    runner: str  # "dm-bip" or "linkml-map"
+    exit_code: int = 0
+    wall_seconds: float | None = None
+    cpu_user_seconds: float | None = None
+    cpu_system_seconds: float | None = None
+    peak_rss_bytes: int | None = None
+    rows_read: int | None = None
+    rows_written: int | None = None
+    output_bytes: int | None = None
+    chunk_size: int | None = None
+    shards: int | None = None  # set when the entity was mapped in shards and merged
+
+    def write(self, log_dir: Path) -> Path:
+        """Write the record as ``<log_dir>/<entity>.resources.json`` and return its path."""
+        path = resources_path(log_dir, self.entity)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(asdict(self), indent=2) + "\n")
+        os.replace(tmp, path)
+        return path
+
+
+class Usage:
+    """Wall clock and CPU time elapsed since construction, for this process or its waited-for children."""
+
+    def __init__(self, who: int = resource.RUSAGE_SELF):
+        """Start measuring now (who is ``resource.RUSAGE_SELF`` or ``resource.RUSAGE_CHILDREN``)."""
+        self.who = who
+        self._start = time.perf_counter()
+        self._usage = resource.getrusage(who)
+
+    def measure(self, resources: EntityResources) -> EntityResources:
+        """Fill in the wall time, CPU time and peak RSS used so far, and return resources."""
+        usage = resource.getrusage(self.who)
+        resources.wall_seconds = round(time.perf_counter() - self._start, 3)
+        resources.cpu_user_seconds = round(usage.ru_utime - self._usage.ru_utime, 3)
+        resources.cpu_system_seconds = round(usage.ru_stime - self._usage.ru_stime, 3)
+        resources.peak_rss_bytes = _maxrss_bytes(usage.ru_maxrss)
+        return resources
+
+
+def _count_lines(path: Path, line: bytes | None = None) -> int:
+    """Count the lines of a file, or only those equal to line (without its newline)."""
+    with open(path, "rb") as f:
+        if line is not None:
+            return sum(1 for text in f if text.rstrip(b"\r\n") == line)
+        count, last = 0, b"\n"
+        while block := f.read(1 << 20):
+            count += block.count(b"\n")
+            last = block[-1:]
+    return count + (last != b"\n")
+
+
+def count_table_rows(path: Path) -> int:
+    """Return the number of data rows (lines after the header) in a TSV or CSV file."""
+    return max(_count_lines(path) - 1, 0)
+
+
+def count_records(path: Path) -> int | None:
+    """
+    Return the number of records in a file linkml-map wrote, judged by its extension.
+
+    Returns:
+        Rows of a TSV/CSV, lines of a JSONL, documents of a YAML stream, or
+        None for formats not counted without parsing (JSON) or a missing file.
+
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    if path.suffix in TABLE_SUFFIXES:
+        return count_table_rows(path)
+    if path.suffix == ".jsonl":
+        return _count_lines(path)
+    if path.suffix in (".yaml", ".yml"):
+        # The YAML stream writer ends every document with a "---" line.
+        return _count_lines(path, line=b"---")
+    return None
+
+
+def output_bytes(paths: list[Path]) -> int:
+    """Return the total size of the output files that exist."""
+    return sum(Path(path).stat().st_size for path in paths if Path(path).exists())
+
+
+def entity_derivations(spec_paths: list[Path], entity: str) -> list[dict]:
+    """Return an entity's class derivations, as parsed from the spec files, in the order linkml-map merges them."""
+    from dm_bip.map_data.list_entities import _resolve_spec_paths, class_derivations, load_spec
+
+    return [
+        cd
+        for path in _resolve_spec_paths(spec_paths)
+        for cd in class_derivations(load_spec(path))
+        if cd["name"] == entity
+    ]
+
+
+def entity_tables(spec_paths: list[Path], entity: str) -> list[str]:
+    """
+    Return the tables an entity's class derivations are populated from, read from the spec files.
+
+    A class derivation without ``populated_from`` reads the table named after it.
+    """
+    derivations = entity_derivations(spec_paths, entity)
+    return list(dict.fromkeys(cd.get("populated_from") or entity for cd in derivations))
+
+
+def input_table(input_dir: Path, table: str) -> Path | None:
+    """Return the TSV or CSV file of an input table, or None if there is none."""
+    return next((p for p in (Path(input_dir) / f"{table}{s}" for s in TABLE_SUFFIXES) if p.exists()), None)
+
+
+def rows_read(input_dir: Path, tables: list[str]) -> int | None:
+    """Return the data rows of the named input tables, or None if any is missing or not tabular."""
+    total = 0
+    for table in tables:
+        path = input_table(input_dir, table)
+        if path is None:
+            return None
+        total += count_table_rows(path)
+    return total
+
+
+def load_resources(log_dir: Path) -> dict[str, dict]:
+    """Return every entity's resource record in a log directory, by entity name."""
+    records = {}
+    names = {f.name for f in fields(EntityResources)}
+    for path in sorted(Path(log_dir).glob(f"*{RESOURCES_SUFFIX}")):
+        try:
+            record = json.loads(path.read_text())
+        except (OSError, json.JSONDecodeError):
+            continue
+        if isinstance(record, dict) and "entity" in record:
+            records[record["entity"]] = {k: v for k, v in record.items() if k in names and k != "entity"}
+    return records
+
+
+def measure_command(
+    command: list[str],
+    entity: str,
+    log_dir: Path,
+    outputs: list[Path],
+    input_dir: Path | None = None,
+    trans_specs: list[Path] | None = None,
+) -> int:
+    """
+    Run a map command for one entity and record what it used.
+
+    Args:
+        command: The command, e.g. ``linkml-map map-data ... --entity E``.
+        entity: The entity it maps.
+        log_dir: Where ``<entity>.resources.json`` is written.
+        outputs: The command's output files, primary first.
+        input_dir: Input tables, for rows read.
+        trans_specs: Spec files or directories, for the entity's input tables.
+
+    Returns:
+        The command's exit code, as the shell reports it (128 + N for signal N).
+
+    """
+    usage = Usage(resource.RUSAGE_CHILDREN)
+    returncode = trace.run_command(command, "map-data", "map", entity=entity)
+    resources = usage.measure(EntityResources(entity, "linkml-map", exit_code=returncode))
+    resources.rows_written = count_records(outputs[0]) if outputs else None
+    resources.output_bytes = output_bytes(outputs)
+    if "--chunk-size" in command[:-1]:
+        chunk_size = command[command.index("--chunk-size") + 1]
+        resources.chunk_size = int(chunk_size) if chunk_size.isdigit() else None
+    if input_dir is not None and trans_specs:
+        try:
+            resources.rows_read = rows_read(input_dir, entity_tables(trans_specs, entity))
+        except (OSError, ValueError) as e:
+            print(f"Could not count rows read for {entity}: {e}", file=sys.stderr)
+    resources.write(log_dir)
+    return returncode
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI entry point: run the command after ``--`` and record its resource usage."""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--" not in argv:
+        print("usage: python -m dm_bip.map_data.resources [options] -- command ...", file=sys.stderr)
+        return 2
+    split = argv.index("--")
+    parser = argparse.ArgumentParser(description="Run a map command and record its resource usage.")
+    parser.add_argument("--entity", required=True, help="Entity the command maps")
+    parser.add_argument("--log-dir", required=True, type=Path, help="Directory for <entity>.resources.json")
+    parser.add_argument("--output", action="append", default=[], type=Path, help="Output file (primary first)")
+    parser.add_argument("--input-dir", type=Path, help="Input tables, for rows read")
+    parser.add_argument("-T", "--trans-spec", action="append", default=[], type=Path, help="Spec file or directory")
+    args = parser.parse_args(argv[:split])
+    return measure_command(
+        argv[split + 1 :],
+        entity=args.entity,
+        log_dir=args.log_dir,
+        outputs=args.output,
+        input_dir=args.input_dir,
+        trans_specs=args.trans_spec,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
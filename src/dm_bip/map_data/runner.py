@@ -0,0 +1,455 @@
+"""
+Map many entities in one process, loading what they share once.
+
+``pipeline.Makefile`` maps each entity with its own ``linkml-map map-data``
+process. Every one of them rebuilds the source and target SchemaViews, loads
+and normalizes the whole trans-spec directory, and re-parses the input tables
+it reads. :class:`MapSession` does that work once:
+
+- the schemas are loaded and the specs merged and checked (pre-flight
+  messages are printed once, not once per entity), and each entity's derived
+  specification is built before any entity is mapped;
+- an input table that more than one entity streams row by row is parsed once
+  and its rows are served to each of them (blocks run by linkml-map's DuckDB
+  join engine read their files directly and are left alone);
+- with ``workers > 1`` (or a memory budget) each entity is mapped in a
+  process forked only after this warm-up, so the processes share the loaded
+  schemas, specs and parsed tables copy-on-write, and they are admitted
+  within a memory budget by :mod:`dm_bip.map_data.scheduler`.
+
+Each entity is mapped as ``linkml-map map-data -T <specs>/ --entity <E>``
+maps it, and the runner writes the files the Makefile's per-entity rule
+writes, so the map summary reads either::
+
+    <output_dir>/<prefix>-<E>-<postfix>.<format>   (one per output format)
+    <log_dir>/<E>.log                              (row errors and the exit line)
+    <log_dir>/<E>.resources.json                   (time, memory and rows, see resources)
+    <output_dir>/.<E>_complete                     (entity finished)
+    <output_dir>/.entity-memory.json               (memory per entity, from forked runs)
+
+With ``MapOptions.stream`` an entity is mapped to JSON Lines and its other
+formats are written from that file, each by a process of its own (see
+:mod:`dm_bip.map_data.convert`).
+
+Like make, an entity is skipped while its ``.<E>_complete`` sentinel is newer
+than the spec files and both schemas.
+"""
+
+import copy
+import dataclasses
+import logging
+import time
+import traceback
+from collections import Counter
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dm_bip import trace
+from dm_bip.map_data.chunking import DEFAULT_CHUNK_SIZE, entity_chunk_size
+from dm_bip.map_data.convert import STREAM_DIR, STREAM_FORMAT, convert_in_parallel, stream_path, stream_writer
+from dm_bip.map_data.list_entities import _resolve_spec_paths, list_entities
+from dm_bip.map_data.resources import EntityResources, Usage, output_bytes, rows_read
+from dm_bip.map_data.scheduler import HISTORY_NAME, MemoryHistory, run_scheduled
+
+LOGS_DIR = "logs"
+
+
+def output_basename(entity: str, prefix: str = "", postfix: str = "") -> str:
+    """Return an entity's output file name without extension: ``{prefix}-{entity}-{postfix}``, omitting empty parts."""
+    return "-".join(part for part in (prefix, entity, postfix) if part)
+
+
+def sentinel_path(output_dir: Path, entity: str) -> Path:
+    """Return the file marking an entity as mapped."""
+    return Path(output_dir) / f".{entity}_complete"
+
+
+@dataclass
+class MapOptions:
+    """Where and how entities are written (the ``DM_MAP_*`` settings)."""
+
+    output_dir: Path
+    formats: list[str] = field(default_factory=lambda: ["yaml"])  # the first is the primary format
+    log_dir: Path | None = None  # defaults to <output_dir>/logs
+    prefix: str = ""
+    postfix: str = ""
+    chunk_size: int | None = 1000  # None picks one per entity (see dm_bip.map_data.chunking)
+    continue_on_error: bool = False
+    stream: bool = False  # map to JSON Lines, then convert to the formats (see dm_bip.map_data.convert)
+
+    @property
+    def logs(self) -> Path:
+        """Directory of the per-entity logs."""
+        return Path(self.log_dir) if self.log_dir is not None else Path(self.output_dir) / LOGS_DIR
+
+    def outputs(self, entity: str) -> list[Path]:
+        """Return an entity's output files, primary format first."""
+        base = output_basename(entity, self.prefix, self.postfix)
+        return [Path(self.output_dir) / f"{base}.{fmt}" for fmt in self.formats]
+
+    def mapped_outputs(self, entity: str) -> list[Path]:
+        """Return the files an entity is mapped to: its outputs, or with ``stream`` (or Parquet) its stream file."""
+        if not (self.stream or "parquet" in self.formats) or self.formats == [STREAM_FORMAT]:
+            return self.outputs(entity)
+        return [stream_path(self.outputs(entity), Path(self.output_dir) / STREAM_DIR)]
+
+
+@dataclass
+class EntityResult:
+    """Mapping outcome for one entity."""
+
+    entity: str
+    status: str  # "mapped", "row-errors", "failed", "killed" or "up-to-date"
+    returncode: int = 0
+    rows: int = 0  # objects written
+    errors: int = 0  # rows that failed to transform (with continue_on_error)
+    seconds: float = 0.0
+    log_path: Path | None = None
+    memory: int | None = None  # peak RSS above the session's, in bytes (forked runs only)
+
+    def complete(self, continue_on_error: bool) -> bool:
+        """Return whether the entity counts as done, as the Makefile's per-entity rule decides it."""
+        if self.status in ("mapped", "up-to-date"):
+            return True
+        # Without strict mode any ordinary failure is tolerated; a killed worker never is.
+        return continue_on_error and self.status != "killed"
+
+
+@dataclass
+class MapRun:
+    """Outcome of mapping a set of entities."""
+
+    options: MapOptions
+    results: list[EntityResult] = field(default_factory=list)
+
+    @property
+    def failures(self) -> list[EntityResult]:
+        """Entities left without a completion sentinel, in entity order."""
+        return [r for r in self.results if not r.complete(self.options.continue_on_error)]
+
+
+def _data_loader_class():
+    from linkml_map.loaders import DataLoader
+
+    class SharedDataLoader(DataLoader):
+        """A DataLoader serving the rows of shared tables from memory, parsed once."""
+
+        def __init__(self, base_path: Path, schemaview):
+            """Load tables from base_path, coercing TSV/CSV values by the source schema."""
+            super().__init__(base_path, schemaview=schemaview)
+            self.tables: dict[str, list[dict]] = {}
+            self._files: dict[str, Path | None] = {}
+
+        def _find_file(self, identifier: str) -> Path | None:
+            if identifier not in self._files:
+                self._files[identifier] = super()._find_file(identifier)
+            return self._files[identifier]
+
+        def share(self, identifier: str) -> None:
+            """Parse a table now and serve its rows from memory from here on."""
+            if identifier not in self.tables:
+                self.tables[identifier] = list(super().__getitem__(identifier))
+
+        def release(self, identifier: str) -> None:
+            """Drop a shared table's rows."""
+            self.tables.pop(identifier, None)
+
+        def __getitem__(self, identifier: str) -> Iterator[dict]:
+            """Iterate over a table's rows; shared rows are copied so no entity sees another's changes."""
+            rows = self.tables.get(identifier)
+            if rows is None:
+                return super().__getitem__(identifier)
+            return (dict(row) for row in rows)
+
+    return SharedDataLoader
+
+
+class MapSession:
+    """Schemas, trans specs and input tables loaded once, mapping any number of entities."""
+
+    def __init__(
+        self,
+        source_schema: Path,
+        trans_specs: list[Path],
+        input_dir: Path,
+        target_schema: Path | None = None,
+    ):
+        """Load the schemas and specs, and print linkml-map's pre-flight spec checks."""
+        from linkml_map.cli.cli import _pre_flight_validate
+        from linkml_map.transformer.object_transformer import ObjectTransformer
+        from linkml_runtime import SchemaView
+
+        transformer = ObjectTransformer()
+        transformer.source_schemaview = SchemaView(str(source_schema))
+        transformer.load_transformer_specifications(tuple(str(path) for path in trans_specs))
+        if target_schema:
+            transformer.target_schemaview = SchemaView(str(target_schema))
+        _pre_flight_validate(
+            transformer, source_schema=str(source_schema), target_schema=str(target_schema) if target_schema else None
+        )
+        self.transformer = transformer
+        self.input_dir = Path(input_dir)
+        self.target_schema = target_schema
+        self.loader = _data_loader_class()(input_dir, transformer.source_schemaview)
+        self._transformers = {}
+        self._table_users: Counter[str] = Counter()
+
+    @property
+    def entities(self) -> list[str]:
+        """Names of the class derivations in the merged specs."""
+        return [cd.name for cd in self.transformer.specification.class_derivations]
+
+    def transformer_for(self, entity: str):
+        """
+        Return a transformer restricted to one entity, as ``map-data --entity`` restricts it.
+
+        The transformer shares the session's schemas; its derived specification
+        is built on the first call.
+        """
+        if entity not in self._transformers:
+            spec = self.transformer.specification
+            matched = [cd for cd in spec.class_derivations if cd.name == entity]
+            if not matched:
+                names = ", ".join(self.entities) or "(none)"
+                raise ValueError(f"Entity {entity!r} did not match any class_derivation. Available: {names}")
+            transformer = copy.copy(self.transformer)
+            transformer.specification = spec.model_copy(update={"class_derivations": matched})
+            transformer._derived_specification = None
+            transformer._warned_unbound_names = set()
+            transformer.lookup_index = None
+            transformer.derived_specification  # noqa: B018 - build it now, before any fork
+            self._transformers[entity] = transformer
+        return self._transformers[entity]
+
+    def streamed_tables(self, entity: str) -> set[str]:
+        """Return the input tables an entity reads row by row (not through the DuckDB join engine)."""
+        from linkml_map.transformer.join_engine import can_use_join_engine
+
+        transformer = self.transformer_for(entity)
+        tables = set()
+        for cd in transformer.derived_specification.class_derivations:
+            table = cd.populated_from or cd.name
+            if table in self.loader and not can_use_join_engine(cd, self.loader, transformer.source_schemaview):
+                tables.add(table)
+        return tables
+
+    def input_tables(self, entity: str) -> list[str]:
+        """Return the tables an entity's class derivations are populated from."""
+        derivations = self.transformer_for(entity).specification.class_derivations
+        return list(dict.fromkeys(cd.populated_from or cd.name for cd in derivations))
+
+    def chunk_size(self, entity: str, memory: int | None = None) -> int:
+        """Return the automatic chunk size for an entity, from its input tables and the memory it may use."""
+        try:
+            tables = self.input_tables(entity)
+        except Exception:  # map_entity logs why the entity cannot be derived
+            return DEFAULT_CHUNK_SIZE
+        return entity_chunk_size(self.input_dir, tables, memory)
+
+    def _tables_or_none(self, entity: str) -> set[str]:
+        # An entity whose specification cannot be derived shares nothing; map_entity logs why.
+        try:
+            return self.streamed_tables(entity)
+        except Exception:
+            return set()
+
+    def warm_up(self, entities: list[str]) -> None:
+        """Build the entities' specifications and parse the tables more than one of them streams."""
+        for entity in entities:
+            self._table_users.update(self._tables_or_none(entity))
+        for table, users in self._table_users.items():
+            if users > 1:
+                self.loader.share(table)
+
+    def done_with(self, entity: str) -> None:
+        """Release the shared tables no other pending entity reads (serial runs only)."""
+        for table in self._tables_or_none(entity):
+            self._table_users[table] -= 1
+            if self._table_users[table] <= 0:
+                self.loader.release(table)
+
+    def map_entity(self, entity: str, options: MapOptions) -> EntityResult:
+        """
+        Map one entity to its output files and log, and write its completion sentinel.
+
+        Args:
+            entity: Class derivation to map.
+            options: Output and error-handling settings.
+
+        Returns:
+            The entity's outcome; failures are logged, not raised.
+
+        """
+        start = time.perf_counter()
+        usage = Usage()
+        span_id = trace.start_span("map entity", "map", entity=entity)
+        options.logs.mkdir(parents=True, exist_ok=True)
+        Path(options.output_dir).mkdir(parents=True, exist_ok=True)
+        sentinel = sentinel_path(options.output_dir, entity)
+        sentinel.unlink(missing_ok=True)
+        result = EntityResult(entity, "mapped", log_path=options.logs / f"{entity}.log")
+
+        with open(result.log_path, "w", encoding="utf-8") as log:
+            handler = logging.StreamHandler(log)
+            logging.getLogger().addHandler(handler)
+            try:
+                self._write_outputs(entity, options, log, result)
+            except Exception:  # one entity's failure is logged, like a failed map-data process
+                traceback.print_exc(file=log)
+                result.status, result.returncode = "failed", 1
+            finally:
+                logging.getLogger().removeHandler(handler)
+            if result.errors and result.status == "mapped":
+                log.write(f"\n{result.errors} transformation error(s)\n")
+                result.status, result.returncode = "row-errors", 1
+            log.write(f"map-data '{entity}' exited with code {result.returncode}\n")
+
+        result.seconds = time.perf_counter() - start
+        self._record_resources(entity, options, result, usage)
+        if result.complete(options.continue_on_error):
+            sentinel.touch()
+        status = "ok" if result.status == "mapped" else "error"
+        trace.end_span(span_id, status, exit_code=result.returncode, rows=result.rows, errors=result.errors)
+        return result
+
+    def _record_resources(self, entity: str, options: MapOptions, result: EntityResult, usage: Usage) -> None:
+        """Write the entity's resource record; peak RSS is this process's, the session included."""
+        resources = usage.measure(EntityResources(entity, "dm-bip", exit_code=result.returncode))
+        resources.rows_written = result.rows
+        resources.output_bytes = output_bytes(options.outputs(entity))
+        resources.chunk_size = options.chunk_size
+        try:
+            resources.rows_read = rows_read(self.input_dir, self.input_tables(entity))
+        except (OSError, ValueError):
+            pass  # an entity that failed to load reports no rows read
+        resources.write(options.logs)
+
+    def _write_outputs(self, entity: str, options: MapOptions, log, result: EntityResult) -> None:
+        from linkml_map.transformer.engine import transform_spec
+        from linkml_map.writers import MultiStreamWriter, OutputFormat, make_stream_writer
+        from more_itertools import chunked
+
+        def report_error(err) -> None:
+            result.errors += 1
+            log.write(f"  - {err}\n")
+
+        def counted(objects):
+            for obj in objects:
+                result.rows += 1
+                yield obj
+
+        transformer = self.transformer_for(entity)
+        objects = transform_spec(transformer, self.loader, on_error=report_error if options.continue_on_error else None)
+        paths, mapped = options.outputs(entity), options.mapped_outputs(entity)
+        mapped[0].parent.mkdir(parents=True, exist_ok=True)
+        if mapped == paths:
+            outputs = [(make_stream_writer(OutputFormat(path.suffix[1:])), path) for path in mapped]
+        else:
+            outputs = [(stream_writer(), mapped[0])]
+        MultiStreamWriter(outputs).write_all(chunked(counted(objects), options.chunk_size))
+        if mapped != paths:
+            convert_in_parallel(mapped[0], paths, options.chunk_size, self.target_schema, entity)
+            mapped[0].unlink()
+
+
+def _is_up_to_date(sentinel: Path, dependencies: list[Path]) -> bool:
+    """Apply make's rule: sentinel exists and is no older than any dependency."""
+    try:
+        built = sentinel.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    return all(dep.stat().st_mtime <= built for dep in dependencies)
+
+
+def map_entities(
+    source_schema: Path,
+    trans_specs: list[Path],
+    input_dir: Path,
+    options: MapOptions,
+    target_schema: Path | None = None,
+    entities: list[str] | None = None,
+    workers: int = 1,
+    memory_budget: int | None = None,
+    force: bool = False,
+    on_result: Callable[[EntityResult], None] | None = None,
+) -> MapRun:
+    """
+    Map entities from input tables to the target schema, writing the pipeline's mapped-data layout.
+
+    Args:
+        source_schema: The generated source schema (``SCHEMA_FILE``).
+        trans_specs: Trans-spec files or directories (``-T`` of ``linkml-map map-data``).
+        input_dir: Directory of input tables, one file per source class.
+        options: Output files, chunk size and error handling.
+        target_schema: The target schema (``DM_MAP_TARGET_SCHEMA``).
+        entities: Entities to map; all class derivations in the specs by default.
+        workers: Entities mapped at once, each in a process forked after the session is
+            loaded. 1 (without a memory budget) maps in-process.
+        memory_budget: Start entities only while their recorded memory (see
+            :mod:`dm_bip.map_data.scheduler`) fits in this many bytes. With an
+            automatic chunk size, each entity's chunk fits in its share of it.
+        force: Map entities whose completion sentinel is already up to date.
+        on_result: Called with each entity's result as it completes.
+
+    Returns:
+        Per-entity results, in entity order.
+
+    """
+    if entities is None:
+        entities = list_entities(trans_specs)
+    dependencies = [*_resolve_spec_paths(trans_specs), Path(source_schema)]
+    if target_schema:
+        dependencies.append(Path(target_schema))
+
+    results: dict[str, EntityResult] = {}
+
+    def record(result: EntityResult) -> None:
+        results[result.entity] = result
+        if on_result:
+            on_result(result)
+
+    pending = []
+    for entity in entities:
+        if not force and _is_up_to_date(sentinel_path(options.output_dir, entity), dependencies):
+            record(EntityResult(entity, "up-to-date"))
+        else:
+            pending.append(entity)
+
+    if pending:
+        session = MapSession(source_schema, trans_specs, input_dir, target_schema)
+        session.warm_up(pending)
+        share = memory_budget // max(workers, 1) if memory_budget is not None else None
+
+        def options_for(entity: str) -> MapOptions:
+            if options.chunk_size is not None:
+                return options
+            return dataclasses.replace(options, chunk_size=session.chunk_size(entity, share))
+
+        if workers <= 1 and memory_budget is None:
+            for entity in pending:
+                record(session.map_entity(entity, options_for(entity)))
+                session.done_with(entity)
+        else:
+            run_scheduled(
+                pending,
+                map_one=lambda entity: session.map_entity(entity, options_for(entity)),
+                on_killed=lambda entity, returncode: _killed(entity, returncode, options),
+                record=record,
+                workers=workers,
+                budget=memory_budget,
+                history=MemoryHistory(Path(options.output_dir) / HISTORY_NAME),
+            )
+
+    return MapRun(options=options, results=[results[entity] for entity in entities])
+
+
+def _killed(entity: str, returncode: int, options: MapOptions) -> EntityResult:
+    """Record an entity whose process died before reporting (e.g. killed when out of memory)."""
+    log_path = options.logs / f"{entity}.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "a", encoding="utf-8") as log:
+        log.write(f"map-data '{entity}' exited with code {returncode}\n")
+        log.write(f"✗ FATAL: map-data '{entity}' was killed (exit {returncode}); output is INCOMPLETE.\n")
+    EntityResources(entity, "dm-bip", exit_code=returncode).write(options.logs)
+    return EntityResult(entity, "killed", returncode=returncode, log_path=log_path)
@@ -0,0 +1,216 @@
+"""
+Memory-aware scheduling of map entities over forked processes.
+
+A worker pool (or ``make -j``) starts entities blindly, so several heavy ones
+(MeasurementObservation, say) can run at once and push the container past its
+cgroup limit, ending in exit 137. Here each entity is mapped in its own
+process, forked from the loaded :class:`~dm_bip.map_data.runner.MapSession`,
+and its peak memory is kept in a small JSON history. On the next run entities
+are admitted largest first while the predicted total stays within a memory
+budget, and smaller entities are started in the gaps a large one leaves.
+
+An entity's memory is its process's peak RSS (``ru_maxrss``) minus its RSS
+when it was forked, so pages it shares with the session copy-on-write are not
+counted once per entity; the budget is for this memory, on top of the
+session's own. Entities without history are predicted to need as much as the
+largest recorded entity (nothing, on a first run). An entity predicted to
+exceed the budget on its own still runs, alone.
+"""
+
+import json
+import multiprocessing
+import os
+import re
+import resource
+import sys
+from collections.abc import Callable
+from multiprocessing.connection import wait
+from pathlib import Path
+
+HISTORY_NAME = ".entity-memory.json"
+# With --memory-budget auto, the share of the container's memory limit entities may use.
+AUTO_BUDGET_FRACTION = 0.8
+
+_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*$", re.IGNORECASE)
+
+
+def memory_limit() -> int | None:
+    """Return the container's memory limit (cgroup ``memory.max``), else total RAM, in bytes."""
+    try:
+        text = Path("/sys/fs/cgroup/memory.max").read_text().strip()
+        if text != "max":
+            return int(text)
+    except (OSError, ValueError):
+        pass
+    try:
+        for line in Path("/proc/meminfo").read_text().splitlines():
+            if line.startswith("MemTotal:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def current_rss() -> int:
+    """Return this process's resident set size in bytes."""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """Return this process's peak resident set size in bytes."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def parse_memory(text: str | None) -> int | None:
+    """
+    Parse a memory budget.
+
+    Args:
+        text: Bytes, or a size with a K/M/G/T suffix (``8G``, ``512MiB``), or
+            ``auto`` for a share of the container's memory limit less this
+            process's memory. None or empty means no budget.
+
+    Returns:
+        The budget in bytes, or None for no budget.
+
+    """
+    if text is None or not text.strip():
+        return None
+    if text.strip().lower() == "auto":
+        limit = memory_limit()
+        return None if limit is None else max(int(limit * AUTO_BUDGET_FRACTION) - current_rss(), 0)
+    match = _SIZE.match(text)
+    if match is None:
+        raise ValueError(f"Not a memory size: {text!r} (use bytes, 512M, 8G, ... or auto)")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def format_memory(size: int) -> str:
+    """Return a byte count for humans, e.g. ``1.5G``."""
+    value = float(size)
+    for unit in ("", "K", "M", "G"):
+        if value < 1024:
+            return f"{value:.0f}{unit}" if not unit else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}T"
+
+
+class MemoryHistory:
+    """Each entity's memory from its last mapped run, stored as JSON."""
+
+    def __init__(self, path: Path):
+        """Read the history at path (empty if missing or unreadable)."""
+        self.path = Path(path)
+        try:
+            self.memory: dict[str, int] = json.loads(self.path.read_text())["memory"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            self.memory = {}
+
+    def estimates(self, entities: list[str]) -> dict[str, int]:
+        """Return each entity's predicted memory; unknown entities get the largest recorded value."""
+        default = max(self.memory.values(), default=0)
+        return {entity: self.memory.get(entity, default) for entity in entities}
+
+    def save(self) -> None:
+        """Write the history."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"memory": dict(sorted(self.memory.items()))}, indent=2) + "\n")
+        os.replace(tmp, self.path)
+
+
+def next_entity(
+    pending: list[str], estimates: dict[str, int], in_use: int, budget: int | None, idle: bool
+) -> str | None:
+    """
+    Take the next entity to start from pending (ordered largest first).
+
+    Args:
+        pending: Entities not yet started, largest predicted memory first; the chosen one is removed.
+        estimates: Predicted memory per entity.
+        in_use: Predicted memory of the entities running now.
+        budget: Memory budget, or None for no budget.
+        idle: Whether nothing is running.
+
+    Returns:
+        The largest entity that fits in what is left of the budget; if none
+        fits and nothing is running, the largest entity; otherwise None (wait).
+
+    """
+    for index, entity in enumerate(pending):
+        if budget is None or in_use + estimates[entity] <= budget:
+            return pending.pop(index)
+    if idle and pending:
+        return pending.pop(0)
+    return None
+
+
+def _run_child(map_one: Callable, entity: str, conn) -> None:
+    baseline = current_rss()
+    result = map_one(entity)
+    result.memory = max(peak_rss() - baseline, 0)
+    conn.send(result)
+    conn.close()
+
+
+def run_scheduled(
+    entities: list[str],
+    map_one: Callable,
+    on_killed: Callable,
+    record: Callable,
+    workers: int,
+    budget: int | None,
+    history: MemoryHistory,
+) -> None:
+    """
+    Map entities in forked processes, at most workers at a time and within budget.
+
+    Args:
+        entities: Entities to map.
+        map_one: Maps one entity and returns its EntityResult (run in the child).
+        on_killed: Called with (entity, returncode) for a child that died without a result.
+        record: Called with each entity's result as it completes.
+        workers: Maximum concurrent processes.
+        budget: Memory budget in bytes, or None for none.
+        history: Recorded memory; updated with each mapped entity and saved.
+
+    """
+    context = multiprocessing.get_context("fork")
+    estimates = history.estimates(entities)
+    pending = sorted(entities, key=lambda entity: estimates[entity], reverse=True)
+    running = {}
+    while pending or running:
+        in_use = sum(estimates[entity] for entity, _, _ in running.values())
+        while len(running) < max(workers, 1):
+            entity = next_entity(pending, estimates, in_use, budget, idle=not running)
+            if entity is None:
+                break
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_run_child, args=(map_one, entity, sender), name=f"map-{entity}")
+            process.start()
+            sender.close()
+            running[process.sentinel] = (entity, process, receiver)
+            in_use += estimates[entity]
+
+        for sentinel in wait(list(running)):
+            entity, process, receiver = running.pop(sentinel)
+            try:
+                result = receiver.recv() if receiver.poll() else None
+            except EOFError:  # poll() also reports a pipe closed by a killed child
+                result = None
+            process.join()
+            receiver.close()
+            if result is None:
+                # A negative exit code is a signal; report it as the shell would (137 = SIGKILL).
+                code = process.exitcode
+                result = on_killed(entity, 128 - code if code < 0 else code)
+            else:
+                history.memory[entity] = result.memory
+            record(result)
+    history.save()
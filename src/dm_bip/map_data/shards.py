@@ -0,0 +1,395 @@
+"""
+Map one entity as several shards in parallel and merge their outputs.
+
+An entity such as MeasurementObservation can take most of the map step's wall
+clock in a single ``linkml-map map-data`` process while other ``make -j`` slots
+sit idle. With ``DM_MAP_SHARDS=MeasurementObservation:4`` the Makefile maps it
+as four shards, each a make target of its own, and then merges them. Each
+shard maps the whole entity spec from its own input directory, which
+``split`` makes:
+
+- ``--by hash`` (default): every table a class derivation streams is cut
+  into N row subsets by the CRC-32 of a key column (``--key``, by default the
+  table's first column, dbGaP_Subject_ID in dbGaP tables), and a shard gets its
+  subset. Tables that are only joined are linked whole, so lookups still see
+  every row. A table that is both streamed and joined cannot be cut.
+- ``--by table``: the entity's class derivation blocks are grouped so that no
+  streamed table is in two groups, and the groups are dealt to shards largest
+  first. A shard gets the tables of its groups, linked, and linkml-map skips the
+  blocks whose tables it does not have.
+
+``merge`` then concatenates the shards' outputs in shard order: TSV/CSV under
+the union of their headers, JSONL lines, YAML documents, and the elements of
+JSON arrays. The merged records are those of an unsharded run, in a different
+order; TSV/CSV columns are in the order the shards first wrote them, which can
+differ from an unsharded run's when the shards meet the blocks in another order
+(``--by table``). A shard that wrote no file of an output fails the merge. The
+shards' logs are combined into ``<E>.log``, ending with the worst exit code,
+and their resource records into ``<E>.resources.json``.
+"""
+
+import argparse
+import csv
+import json
+import shutil
+import sys
+import zlib
+from pathlib import Path
+
+from dm_bip.map_data.inputs import available_tables, link_inputs, needed_tables
+from dm_bip.map_data.resources import (
+    EntityResources,
+    count_records,
+    entity_derivations,
+    entity_tables,
+    input_table,
+    load_resources,
+    output_bytes,
+    rows_read,
+)
+
+BY_HASH = "hash"
+BY_TABLE = "table"
+SHARD_LOG = "map.log"
+
+
+class ShardError(ValueError):
+    """An entity cannot be sharded as asked."""
+
+
+def _streamed(derivation: dict) -> str:
+    return derivation.get("populated_from") or derivation.get("name")
+
+
+def _derivation_tables(derivations: list[dict], tables: set[str]) -> list[set[str]]:
+    """Return the tables each class derivation reads, or raise ShardError when they need the source schema."""
+    needed = []
+    for derivation in derivations:
+        found = needed_tables([derivation], tables)
+        if found is None:
+            raise ShardError(
+                f"The tables class derivation {derivation.get('name')!r} reads cannot be known from the specs"
+            )
+        needed.append(found)
+    return needed
+
+
+def table_groups(derivations: list[dict], tables: set[str]) -> list[tuple[list[int], set[str]]]:
+    """
+    Group class derivation blocks so that each streamed table belongs to one group.
+
+    Blocks streaming the same table share a group, as does a block joining a
+    table another block streams. Tables that are only joined tie nothing, as
+    every shard can have them.
+
+    Returns:
+        (block indexes, tables read) per group, in order of their first block.
+
+    """
+    needed = _derivation_tables(derivations, tables)
+    parent = list(range(len(derivations)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    streamers: dict[str, int] = {}
+    for i, derivation in enumerate(derivations):
+        streamers.setdefault(_streamed(derivation), i)
+    for i, derivation in enumerate(derivations):
+        for table in needed[i] | {_streamed(derivation)}:
+            if table in streamers:
+                parent[root(i)] = root(streamers[table])
+    groups: dict[int, tuple[list[int], set[str]]] = {}
+    for i in range(len(derivations)):
+        blocks, read = groups.setdefault(root(i), ([], set()))
+        blocks.append(i)
+        read |= needed[i]
+    return list(groups.values())
+
+
+def _table_bytes(input_dir: Path, table_names: set[str]) -> int:
+    return sum(path.stat().st_size for t in table_names if (path := input_table(input_dir, t)) is not None)
+
+
+def assign_groups(groups: list[tuple[list[int], set[str]]], shards: int, input_dir: Path) -> list[set[str]]:
+    """
+    Deal table groups to shards and return each shard's tables.
+
+    Groups go largest input first to the shard with the least input so far.
+    Shards are then ordered by their first spec block, so the merged output
+    keeps the spec's block order where it can.
+    """
+    load = [0] * shards
+    assigned: list[tuple[list[int], set[str]]] = [([], set()) for _ in range(shards)]
+    sized = [(_table_bytes(input_dir, read), order, blocks, read) for order, (blocks, read) in enumerate(groups)]
+    for size, _, blocks, read in sorted(sized, key=lambda item: (-item[0], item[1])):
+        shard = load.index(min(load))
+        load[shard] += size
+        assigned[shard][0].extend(blocks)
+        assigned[shard][1].update(read)
+    assigned.sort(key=lambda shard: min(shard[0], default=len(groups)))
+    return [read for _, read in assigned]
+
+
+def shard_of(value: str, shards: int) -> int:
+    """Return the shard (0-based) a key value belongs to; stable across processes and runs."""
+    return zlib.crc32(value.encode()) % shards
+
+
+def _write_rows(source: Path, target: Path, index: int, shards: int, key: str | None) -> None:
+    """Write the header and the rows of source whose key column falls in shard index."""
+    # Quoted fields may hold separators or newlines, as linkml's TSV and CSV loaders allow.
+    dialect = csv.excel if source.suffix.lower() == ".csv" else csv.excel_tab
+    with open(source, newline="") as src, open(target, "w", newline="") as dst:
+        reader, writer = csv.reader(src, dialect), csv.writer(dst, dialect, lineterminator="\n")
+        columns = next(reader, [])
+        column = _key_column(columns, key, source)
+        writer.writerow(columns)
+        for fields in reader:
+            if shard_of(fields[column] if column < len(fields) else "", shards) == index:
+                writer.writerow(fields)
+
+
+def _key_column(columns: list[str], key: str | None, source: Path) -> int:
+    if key is None:
+        return 0
+    if key not in columns:
+        raise ShardError(f"{source.name} has no shard key column {key!r}")
+    return columns.index(key)
+
+
+def split(
+    spec_paths: list[Path],
+    entity: str,
+    input_dir: Path,
+    work_dir: Path,
+    shard: int,
+    shards: int,
+    by: str = BY_HASH,
+    key: str | None = None,
+) -> Path:
+    """
+    Make the input directory of one shard of an entity.
+
+    Args:
+        spec_paths: Trans spec files or directories.
+        entity: The entity being sharded.
+        input_dir: Directory of input tables.
+        work_dir: Directory to (re)create as the shard's input directory.
+        shard: The shard, from 1 to shards.
+        shards: Number of shards.
+        by: ``hash`` to cut streamed tables by key, ``table`` to deal blocks out.
+        key: Column to hash (``hash`` only); the first column of each table by default.
+
+    Returns:
+        work_dir.
+
+    Raises:
+        ShardError: If the entity cannot be sharded this way, or none of the
+            tables it reads is in input_dir.
+
+    """
+    if not 1 <= shard <= shards:
+        raise ShardError(f"Shard {shard} is not between 1 and {shards}")
+    derivations = entity_derivations(spec_paths, entity)
+    tables = available_tables(input_dir)
+    if not derivations:
+        raise ShardError(f"The specs have no class derivation of {entity}")
+    needed = _derivation_tables(derivations, tables)
+    if not set().union(*needed):
+        read = ", ".join(dict.fromkeys(_streamed(d) for d in derivations))
+        raise ShardError(f"No input table of {entity} ({read}) is in {input_dir}")
+    work_dir = Path(work_dir)
+    if work_dir.exists():
+        shutil.rmtree(work_dir)
+    if by == BY_TABLE:
+        assigned = assign_groups(table_groups(derivations, tables), shards, input_dir)
+        return link_inputs(input_dir, assigned[shard - 1], work_dir)
+    if by != BY_HASH:
+        raise ShardError(f"Unknown shard mode {by!r} (use {BY_HASH} or {BY_TABLE})")
+    streamed = {_streamed(d) for d in derivations} & tables
+    joined = set().union(*(read - {_streamed(d)} for d, read in zip(derivations, needed, strict=True)))
+    if streamed & joined:
+        both = ", ".join(sorted(streamed & joined))
+        raise ShardError(f"{entity} cannot be sharded by hash: {both} is both streamed and joined; shard by table")
+    cut = {table: path for table in sorted(streamed) if (path := input_table(input_dir, table)) is not None}
+    # A YAML or JSON table cannot be cut; the first shard maps it whole.
+    whole = joined | (streamed - set(cut) if shard == 1 else set())
+    link_inputs(input_dir, whole, work_dir)
+    for source in cut.values():
+        _write_rows(source, work_dir / source.name, shard - 1, shards, key)
+    return work_dir
+
+
+def _merge_tables(parts: list[Path], output: Path) -> None:
+    """Write the rows of tabular parts under the union of their headers, in order of first appearance."""
+    parts = [p for p in parts if p.stat().st_size]
+    dialect = csv.excel if output.suffix.lower() == ".csv" else csv.excel_tab
+    headers = []
+    for part in parts:
+        with open(part, newline="") as f:
+            headers.append(next(csv.reader(f, dialect), []))
+    columns = list(dict.fromkeys(column for header in headers for column in header))
+    with open(output, "w", newline="") as dst:
+        if not parts:
+            return
+        if all(header == columns for header in headers):
+            # The common case: every shard wrote the same columns, so copy the rows as they are.
+            for i, part in enumerate(parts):
+                with open(part, newline="") as src:
+                    if i:
+                        src.readline()
+                    shutil.copyfileobj(src, dst)
+            return
+        writer = csv.writer(dst, dialect, lineterminator="\n")
+        writer.writerow(columns)
+        for part, header in zip(parts, headers, strict=True):
+            with open(part, newline="") as src:
+                reader = csv.reader(src, dialect)
+                next(reader, None)
+                for fields in reader:
+                    row = dict(zip(header, fields, strict=False))
+                    writer.writerow([row.get(column, "") for column in columns])
+
+
+def _merge_json(parts: list[Path], output: Path) -> None:
+    """Join the elements of JSON arrays as linkml-map's JSON writer would have written them."""
+    items = []
+    for part in parts:
+        data = json.loads(part.read_text() or "[]")
+        items.extend(data if isinstance(data, list) else [data])
+    with open(output, "w") as f:
+        f.write("[\n" + ",\n".join(json.dumps(item, ensure_ascii=False, indent=2) for item in items) + "\n]\n")
+
+
+def merge_outputs(parts: list[Path], output: Path) -> None:
+    """Merge the shards' files of one output format into output."""
+    parts = [Path(p) for p in parts if Path(p).exists()]
+    output = Path(output)
+    suffix = output.suffix.lower()
+    if suffix in (".tsv", ".csv"):
+        _merge_tables(parts, output)
+    elif suffix == ".json":
+        _merge_json(parts, output)
+    else:
+        # JSONL lines and YAML documents (each ended by "---") concatenate as they are.
+        with open(output, "wb") as dst:
+            for part in parts:
+                with open(part, "rb") as src:
+                    shutil.copyfileobj(src, dst)
+
+
+def _exit_code(log: str) -> int:
+    """Return the exit code on a shard log's last exit line, or 1 if it has none."""
+    for line in reversed(log.splitlines()):
+        if " exited with code " in line:
+            return int(line.rsplit(" ", 1)[1])
+    return 1
+
+
+def merge(
+    entity: str,
+    shard_dirs: list[Path],
+    outputs: list[Path],
+    log_dir: Path,
+    input_dir: Path | None = None,
+    spec_paths: list[Path] | None = None,
+) -> int:
+    """
+    Merge an entity's shards into its outputs, log and resource record.
+
+    Args:
+        entity: The sharded entity.
+        shard_dirs: Each shard's directory, in shard order, holding its
+            outputs (named as outputs are), ``map.log`` and resource record.
+        outputs: The entity's output files, primary first.
+        log_dir: Directory for ``<E>.log`` and ``<E>.resources.json``.
+        input_dir: Input tables, to count the rows read across shards.
+        spec_paths: Trans specs, to know which tables those are.
+
+    Returns:
+        The worst shard exit code: a signal kill (128 + N) over a failure (1).
+
+    Raises:
+        ShardError: If a shard did not write one of the outputs; nothing is merged.
+
+    """
+    missing = [
+        f"shard {number} wrote no {Path(output).name}"
+        for output in outputs
+        for number, shard_dir in enumerate(shard_dirs, 1)
+        if not (Path(shard_dir) / Path(output).name).exists()
+    ]
+    if missing:
+        raise ShardError(f"Cannot merge {entity}: " + "; ".join(missing))
+    for output in outputs:
+        merge_outputs([Path(d) / Path(output).name for d in shard_dirs], output)
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    codes = []
+    with open(log_dir / f"{entity}.log", "w") as log:
+        for number, shard_dir in enumerate(shard_dirs, 1):
+            path = Path(shard_dir) / SHARD_LOG
+            text = path.read_text() if path.exists() else ""
+            codes.append(_exit_code(text))
+            log.write(f"=== shard {number} of {len(shard_dirs)} ===\n{text}")
+        code = max(codes, default=0)
+        log.write(f"map-data '{entity}' exited with code {code}\n")
+    records = [load_resources(d).get(entity, {}) for d in shard_dirs]
+    resources = EntityResources(entity, "linkml-map", exit_code=code, shards=len(shard_dirs))
+    for name in ("cpu_user_seconds", "cpu_system_seconds"):
+        values = [r[name] for r in records if r.get(name) is not None]
+        setattr(resources, name, round(sum(values), 3) if values else None)
+    for name in ("wall_seconds", "peak_rss_bytes", "chunk_size"):
+        values = [r[name] for r in records if r.get(name) is not None]
+        setattr(resources, name, max(values) if values else None)
+    resources.rows_written = count_records(outputs[0]) if outputs else None
+    resources.output_bytes = output_bytes(outputs)
+    if input_dir is not None and spec_paths:
+        resources.rows_read = rows_read(input_dir, entity_tables(spec_paths, entity))
+    resources.write(log_dir)
+    return code
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI entry point: ``split`` prints one shard's input directory; ``merge`` combines the shards."""
+    parser = argparse.ArgumentParser(description="Map one entity as parallel shards.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("split", "merge"):
+        sub = commands.add_parser(name)
+        sub.add_argument("--entity", required=True, help="Entity being sharded")
+        sub.add_argument("-T", "--trans-spec", action="append", required=True, type=Path, help="Spec file or dir")
+        sub.add_argument("--input-dir", required=True, type=Path, help="Directory of input tables")
+    split_parser, merge_parser = commands.choices["split"], commands.choices["merge"]
+    split_parser.add_argument("--shard", required=True, type=int, help="This shard, from 1 to --shards")
+    split_parser.add_argument("--shards", required=True, type=int, help="Number of shards")
+    split_parser.add_argument("--by", choices=[BY_HASH, BY_TABLE], default=BY_HASH, help="How to shard")
+    split_parser.add_argument("--key", help="Column to hash rows by (default: each table's first column)")
+    split_parser.add_argument("--work-dir", required=True, type=Path, help="Shard input directory to create")
+    merge_parser.add_argument("--shard-dir", action="append", required=True, type=Path, help="Shard, in order")
+    merge_parser.add_argument("--output", action="append", required=True, type=Path, help="Output (primary first)")
+    merge_parser.add_argument("--log-dir", required=True, type=Path, help="Directory for <E>.log")
+    args = parser.parse_args(argv)
+    if args.command == "merge":
+        try:
+            code = merge(args.entity, args.shard_dir, args.output, args.log_dir, args.input_dir, args.trans_spec)
+        except ShardError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"Merged {len(args.shard_dir)} shard(s) of {args.entity} (exit code {code})")
+        return 0
+    try:
+        work_dir = split(
+            args.trans_spec, args.entity, args.input_dir, args.work_dir, args.shard, args.shards, args.by, args.key
+        )
+    except ShardError as e:
+        parser.error(str(e))
+    print(work_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
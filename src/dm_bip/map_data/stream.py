@@ -0,0 +1,34 @@
+"""
+Run ``linkml-map`` so that its JSON Lines output keeps null-valued slots.
+
+With ``DM_MAP_STREAM=true`` the per-entity Makefile rule maps an entity to
+the JSON Lines file :mod:`dm_bip.map_data.convert` writes its formats from::
+
+    python -m dm_bip.map_data.stream map-data ... -o mapped-data/.stream/E.jsonl -f jsonl input/
+
+which is ``linkml-map map-data`` with its JSON writers no longer dropping
+null-valued slots, so the YAML and TSV/CSV written from the file are those
+linkml-map writes directly. The command writes that one file, so no other
+output is affected.
+"""
+
+import sys
+
+
+def keep_nulls() -> None:
+    """Make linkml-map's JSON and JSONL writers, in this process, keep null-valued slots."""
+    from linkml_map.writers import output_streams
+
+    output_streams._strip_nulls = lambda obj: obj
+
+
+def main() -> None:
+    """CLI entry point: ``linkml-map`` with null-valued slots kept in JSON Lines."""
+    from linkml_map.cli.cli import main as linkml_map
+
+    keep_nulls()
+    linkml_map(prog_name="linkml-map")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -47,6 +47,43 @@ def _load_repo_manifest(manifest_path: Path) -> dict:
         return {}
 
 
+def _summarize_map_resources(log_dir: Path) -> dict:
+    """Collect the per-entity map resource records in log_dir, with run totals."""
+    from dm_bip.map_data.resources import load_resources
+
+    entities = load_resources(log_dir)
+    if not entities:
+        return {}
+    totals = {}
+    for key in ("wall_seconds", "cpu_user_seconds", "cpu_system_seconds", "rows_read", "rows_written", "output_bytes"):
+        values = [r[key] for r in entities.values() if r.get(key) is not None]
+        if values:
+            totals[key] = round(sum(values), 3)
+    peaks = [r["peak_rss_bytes"] for r in entities.values() if r.get("peak_rss_bytes") is not None]
+    if peaks:
+        totals["max_peak_rss_bytes"] = max(peaks)
+    return {"totals": totals, "entities": entities}
+
+
+def add_map_resources(output_path: Path, map_resources_dir: Path) -> Path:
+    """Replace the map_resources section of an existing provenance YAML, keeping everything else."""
+    try:
+        with open(output_path) as f:
+            provenance = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        provenance = {}
+    provenance.pop("map_resources", None)
+    summary = _summarize_map_resources(map_resources_dir)
+    if summary:
+        provenance["map_resources"] = summary
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w") as f:
+        yaml.safe_dump(provenance, f, default_flow_style=False, sort_keys=False)
+    logger.info("Map resources from %s added to %s", map_resources_dir, output_path)
+    return output_path
+
+
 def generate_provenance(
     output_path: Path,
     schema_name: str = "",
@@ -55,8 +92,9 @@ def generate_provenance(
     target_schema: str = "",
     repo_manifest: Path | None = None,
     no_external_repos: bool = False,
+    map_resources_dir: Path | None = None,
 ) -> Path:
-    """Write provenance YAML to output_path."""
+    """Write provenance YAML to output_path; map_resources_dir adds the per-entity map resource records."""
     provenance = {
         "dm_bip": get_build_info(),
         "python": sys.version.split()[0],
@@ -80,6 +118,11 @@ def generate_provenance(
         if v
     }
 
+    if map_resources_dir:
+        summary = _summarize_map_resources(map_resources_dir)
+        if summary:
+            provenance["map_resources"] = summary
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w") as f:
         yaml.safe_dump(provenance, f, default_flow_style=False, sort_keys=False)
@@ -98,8 +141,20 @@ def main():
     parser.add_argument("--target-schema", default="")
     parser.add_argument("--repo-manifest", type=Path, help="Path to repo-manifest.yaml with pre-captured git info")
     parser.add_argument("--no-external-repos", action="store_true", help="Indicate no external repos are expected")
+    parser.add_argument(
+        "--map-resources-dir", type=Path, help="Mapping log directory holding per-entity <Entity>.resources.json files"
+    )
+    parser.add_argument(
+        "--update", action="store_true", help="Only replace the map_resources section of an existing --output file"
+    )
     args = parser.parse_args()
 
+    if args.update:
+        if not args.map_resources_dir:
+            parser.error("--update requires --map-resources-dir")
+        add_map_resources(args.output, args.map_resources_dir)
+        return
+
     generate_provenance(
         output_path=args.output,
         schema_name=args.schema_name,
@@ -108,6 +163,7 @@ def main():
         target_schema=args.target_schema,
         repo_manifest=args.repo_manifest,
         no_external_repos=args.no_external_repos,
+        map_resources_dir=args.map_resources_dir,
     )
 
 
@@ -0,0 +1 @@
+"""Source schema inference from cached per-file column profiles (a front end to schema-automator's generalizer)."""
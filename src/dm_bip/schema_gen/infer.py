@@ -0,0 +1,209 @@
+"""
+Assemble the source schema from column profiles.
+
+:func:`infer_schema` is a drop-in for ``schemauto generalize-tsvs``: each input
+file becomes one class, the single-class schemas are merged in input order
+(the first definition of a shared slot or enum wins), and the result is
+written with schema-automator's own writer. Ranges, enums,
+identifiers and unique keys are derived from :mod:`dm_bip.schema_gen.profiles`
+by the same rules as ``CsvDataGeneralizer.convert_dicts``, so with an unchanged
+input set the output matches ``generalize-tsvs`` (apart from enum permissible
+values being listed in first-seen order instead of set order).
+
+Classes are named by :func:`~dm_bip.validation.runner.class_name_from_input`,
+the name validation targets; for the usual lowercase file names this is the
+name ``generalize-tsvs`` uses as well.
+
+Profiling is the expensive, per-file part, so with ``workers > 1`` files are
+profiled in parallel worker processes (largest first); the single-class
+schemas are then built and merged in input order in the parent. With a cache
+directory, profiles of unchanged files are reused; only the files that
+changed are read again, and assembling the schema from profiles is cheap.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dm_bip import trace
+from dm_bip.schema_gen.profiles import ProfileCache, TableProfile, profile_table
+from dm_bip.validation.runner import class_name_from_input
+
+# Ranges infer_range returns that are not CURIE identifier types it declares on the fly.
+_BUILTIN_RANGES = frozenset({"string", "integer", "boolean", "float", "date", "datetime", "measurement"})
+
+
+@dataclass
+class InferenceResult:
+    """Outcome of inferring a schema from a set of files."""
+
+    schema: object  # SchemaDefinition
+    profiled: list[Path] = field(default_factory=list)  # files read this run (not served from the cache)
+    skipped: list[Path] = field(default_factory=list)  # files without data rows (no class)
+
+
+def _generalizer(enum_threshold: float, max_enum_size: int):
+    from schema_automator.generalizers.csv_data_generalizer import CsvDataGeneralizer
+
+    return CsvDataGeneralizer(enum_threshold=enum_threshold, max_enum_size=max_enum_size)
+
+
+def table_schema(profile: TableProfile, class_name: str, schema_name: str, generalizer):
+    """
+    Build the single-class schema CsvDataGeneralizer.convert_dicts would build for a profiled file.
+
+    Args:
+        profile: The file's column profile (with at least one row).
+        class_name: Name of the class.
+        schema_name: Schema name, also used for its id and default prefix.
+        generalizer: A CsvDataGeneralizer supplying the enum thresholds.
+
+    Returns:
+        A SchemaDefinition with one class.
+
+    """
+    from linkml_runtime.linkml_model import ClassDefinition, SchemaDefinition
+    from linkml_runtime.linkml_model.meta import UniqueKey
+    from schema_automator.generalizers.csv_data_generalizer import add_missing_to_schema
+
+    slots, types, enums, unique_keys = {}, {}, {}, []
+    for number, column in enumerate(profile.columns, start=1):
+        slot = {"range": None}
+        if column.example is not None:
+            slot["examples"] = [{"value": column.example}]
+        if column.multivalued:
+            slot["multivalued"] = True
+        if column.unique and number == 1:
+            slot["identifier"] = True
+        elif column.unique:
+            unique_keys.append(column.name)
+        slot["annotations"] = {"num_distinct_values": {"tag": "num_distinct_values", "value": str(column.distinct)}}
+        slot["range"] = column.range
+        if slot["range"] not in _BUILTIN_RANGES:
+            types[slot["range"]] = {"typeof": "string"}
+        if (
+            slot["range"] == "string"
+            and column.distinct / (column.non_coerced_values + 1) < generalizer.enum_threshold
+            and 0 < column.distinct <= generalizer.max_enum_size
+            and column.longest < generalizer.enum_strlen_threshold
+        ):
+            enum_name = f"{column.name.replace(' ', '_').replace('(s)', '')}_enum"
+            slot["range"] = enum_name
+            enums[enum_name] = {"permissible_values": {v: {"description": v} for v in column.distinct_values}}
+        slots[column.name] = slot
+
+    schema = SchemaDefinition(
+        id=f"https://w3id.org/{schema_name}",
+        name=schema_name,
+        description=schema_name,
+        imports=["linkml:types"],
+        default_prefix=schema_name,
+        types=types,
+        classes=[
+            ClassDefinition(
+                class_name,
+                slots=list(slots),
+                slot_usage={},
+                unique_keys=[UniqueKey(f"{k}_key", unique_key_slots=[k]) for k in unique_keys],
+            )
+        ],
+        slots=slots,
+        enums=enums,
+    )
+    generalizer.add_default_prefixes(schema)
+    generalizer.add_prefix(schema, schema_name, f"https://w3id.org/{schema_name}")
+    add_missing_to_schema(schema)
+    return schema
+
+
+def merge_schemas(schemas: list):
+    """Merge single-class schemas in order, as CsvDataGeneralizer.convert_multiple does."""
+    from linkml_runtime import SchemaView
+
+    view = SchemaView(schemas[0])
+    for schema in schemas[1:]:
+        view.merge_schema(schema)
+        # convert_multiple lists the classes after each merge, which stamps from_schema on every element.
+        view.all_classes()
+    return view.schema
+
+
+def _load_profile(
+    path: Path, max_enum_size: int, cache_dir: Path | None, column_separator: str
+) -> tuple[TableProfile, bool, str | None]:
+    """Return a file's profile, whether it was computed rather than read from the cache, and its cache key."""
+    with trace.span("profile file", "schema", file=str(path)) as extra:
+        cache = ProfileCache(cache_dir) if cache_dir is not None else None
+        if cache is None:
+            return profile_table(path, max_enum_size, column_separator), True, None
+        key = cache.key(path, column_separator)
+        profile = cache.get(key, max_enum_size)
+        extra["cached"] = profile is not None
+        if profile is not None:
+            return profile, False, key
+        profile = profile_table(path, max_enum_size, column_separator)
+        cache.put(key, profile)
+        return profile, True, key
+
+
+def infer_schema(
+    input_files: list[Path],
+    schema_name: str,
+    enum_threshold: float = 0.1,
+    max_enum_size: int = 50,
+    cache_dir: Path | None = None,
+    column_separator: str = "\t",
+    workers: int = 1,
+) -> InferenceResult:
+    """
+    Infer a multi-class schema from delimited files, one class per file.
+
+    Args:
+        input_files: Data files, in the order generalize-tsvs would be given them.
+        schema_name: Name of the schema.
+        enum_threshold: A string column is an enum if distinct values / values is below this.
+        max_enum_size: ... and it has at most this many distinct values.
+        cache_dir: Reuse and store per-file profiles here; unreferenced profiles are removed.
+        column_separator: Field separator for every file.
+        workers: Profile files in this many worker processes.
+
+    Returns:
+        The merged schema, and which files were profiled or skipped.
+
+    """
+    paths = list(map(Path, input_files))
+    # Imports schema-automator before any worker is forked.
+    generalizer = _generalizer(enum_threshold, max_enum_size)
+    if workers <= 1 or len(paths) <= 1:
+        loaded = [_load_profile(path, max_enum_size, cache_dir, column_separator) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            # Start the largest files first so one big table does not finish last on its own.
+            futures = {
+                path: pool.submit(_load_profile, path, max_enum_size, cache_dir, column_separator)
+                for path in sorted(set(paths), key=lambda path: path.stat().st_size, reverse=True)
+            }
+            loaded = [futures[path].result() for path in paths]
+
+    result = InferenceResult(schema=None)
+    schemas = []
+    for path, (profile, rebuilt, _) in zip(paths, loaded, strict=True):
+        if rebuilt:
+            result.profiled.append(path)
+        if profile.rows == 0:
+            result.skipped.append(path)
+            continue
+        schemas.append(table_schema(profile, class_name_from_input(path), schema_name, generalizer))
+    if cache_dir is not None:
+        ProfileCache(cache_dir).prune({key for _, _, key in loaded})
+    if not schemas:
+        raise ValueError("No input file has any data rows")
+    result.schema = merge_schemas(schemas)
+    return result
+
+
+def write_schema(schema, output: Path) -> None:
+    """Write a schema as generalize-tsvs does."""
+    from schema_automator.utils.schemautils import write_schema as _write
+
+    _write(schema, output)
@@ -0,0 +1,249 @@
+"""
+Per-file column profiles for schema inference.
+
+``schemauto generalize-tsvs`` keeps every value of every column of every input
+in memory and derives each column's range and enum from them, from scratch,
+on every run. A :class:`TableProfile` keeps only what that derivation reads,
+computed once per file:
+
+- per column, a histogram of the kinds of its values (``integer``, ``float``,
+  ``boolean``, ``date``, ... or ``string``) with distinct and total counts,
+- the distinct and total value counts (identifier, unique-key and enum-ratio
+  decisions) and the number of empty cells (the null ratio),
+- the distinct values themselves, but only while there are at most
+  ``max_distinct`` of them (the enum size limit),
+- the last non-empty value (schema-automator's slot example) and whether any
+  value is ``|``-separated (multivalued).
+
+Files are read, and values classified, exactly as ``CsvDataGeneralizer`` does
+it, with its own classification helpers. :class:`ProfileCache` stores profiles
+as JSON keyed by the file's content digest, so a rerun only re-reads the files
+that changed.
+"""
+
+import csv
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from dm_bip.fingerprint import combine_digests, file_digest
+
+PROFILE_VERSION = 1
+COERCED_KINDS = ("integer", "float", "boolean", "date", "datetime")
+
+
+@dataclass
+class ColumnProfile:
+    """What schema inference needs to know about one column's values."""
+
+    name: str
+    nulls: int = 0  # empty cells
+    values: int = 0  # non-empty values, counting each part of a "|"-separated value
+    distinct: int = 0
+    kinds: dict[str, list[int]] = field(default_factory=dict)  # kind -> [distinct values, values]
+    longest: int = 0  # length of the longest distinct value
+    example: str | None = None
+    multivalued: bool = False
+    measurement: bool = False  # all values are quantities (only checked when no coerced range applies)
+    curie_prefixes: list[str] | None = None  # prefixes if every value is a CURIE (at most two are kept)
+    distinct_values: list[str] | None = None  # first-seen order; None when there are too many to keep
+
+    @property
+    def unique(self) -> bool:
+        """True if no value repeats."""
+        return self.distinct == self.values
+
+    @property
+    def range(self) -> str:
+        """Return the range schema-automator infers from these values (before enum detection)."""
+        kinds = [set(kind.split("+")) for kind in self.kinds if kind != "empty"]
+        if not kinds:
+            return "string"
+        for name in ("integer", "boolean", "float", "date"):
+            if all(name in kind for kind in kinds):
+                return name
+        if all(kind & {"date", "datetime"} for kind in kinds):
+            return "datetime"
+        if self.measurement:
+            return "measurement"
+        if self.curie_prefixes is not None:
+            return f"{self.curie_prefixes[0]} identifier" if len(self.curie_prefixes) == 1 else "identifier"
+        return "string"
+
+    @property
+    def non_coerced_values(self) -> int:
+        """Values that are not numbers, booleans or dates (the enum ratio's denominator)."""
+        return sum(total for kind, (_, total) in self.kinds.items() if not set(kind.split("+")) & set(COERCED_KINDS))
+
+    def can_enumerate(self, max_enum_size: int) -> bool:
+        """Return whether the profile holds the distinct values whenever an enum of max_enum_size could use them."""
+        return self.distinct_values is not None or self.distinct > max_enum_size
+
+
+@dataclass
+class TableProfile:
+    """Column profiles of one delimited file, in header order."""
+
+    rows: int
+    columns: list[ColumnProfile]
+    max_distinct: int
+
+    def null_ratio(self, column: ColumnProfile) -> float:
+        """Return the fraction of rows in which column is empty."""
+        return column.nulls / self.rows if self.rows else 0.0
+
+    def can_enumerate(self, max_enum_size: int) -> bool:
+        """Return whether this profile can decide enums of up to max_enum_size values."""
+        return all(column.can_enumerate(max_enum_size) for column in self.columns)
+
+    def to_json(self) -> str:
+        """Serialize the profile."""
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, text: str) -> "TableProfile":
+        """Load a profile serialized with :meth:`to_json`."""
+        data = json.loads(text)
+        return cls(
+            rows=data["rows"],
+            columns=[ColumnProfile(**column) for column in data["columns"]],
+            max_distinct=data["max_distinct"],
+        )
+
+
+def _read_columns(path: Path, column_separator: str) -> tuple[int, dict[str, ColumnProfile], dict[str, dict[str, int]]]:
+    """Read a file as CsvDataGeneralizer.convert does; return row count, partial profiles and value counts."""
+    with open(path, newline="", encoding="utf-8") as f:
+        header = [h.strip() for h in f.readline().split(column_separator)]
+        # Like csv.DictReader: the last of duplicate columns wins, unnamed columns are skipped.
+        positions = {name: index for index, name in enumerate(header) if name}
+        profiles = {name: ColumnProfile(name) for name in positions}
+        counts: dict[str, dict[str, int]] = {name: {} for name in positions}
+        rows = 0
+        for row in csv.reader(f, delimiter=column_separator, skipinitialspace=False):
+            if not row:
+                continue
+            rows += 1
+            width = len(row)
+            for name, index in positions.items():
+                value = row[index].strip() if index < width else ""
+                profile = profiles[name]
+                if not value:
+                    profile.nulls += 1
+                    continue
+                parts = value.split("|")
+                if len(parts) > 1:
+                    profile.multivalued = True
+                if value.startswith("$ref:"):
+                    continue
+                profile.example = value
+                column_counts = counts[name]
+                for part in parts:
+                    column_counts[part] = column_counts.get(part, 0) + 1
+    return rows, profiles, counts
+
+
+def _classify(profile: ColumnProfile, counts: dict[str, int], max_distinct: int) -> None:
+    """Fill in a column's value statistics and kind histogram from its value counts."""
+    from schema_automator.generalizers.csv_data_generalizer import (
+        get_db,
+        is_all_measurement,
+        is_date_or_datetime,
+        isboolean,
+        isfloat,
+        isinteger,
+    )
+
+    profile.values = sum(counts.values())
+    profile.distinct = len(counts)
+    profile.longest = max(map(len, counts), default=0)
+    profile.distinct_values = list(counts) if profile.distinct <= max_distinct else None
+
+    kinds = {}
+    for value in counts:
+        if value == "":
+            kinds[value] = ["empty"]
+            continue
+        kinds[value] = [
+            name for name, test in (("integer", isinteger), ("float", isfloat), ("boolean", isboolean)) if test(value)
+        ]
+    non_empty = [value for value in counts if value != ""]
+    # Dates are only parsed when no numeric or boolean range already covers every value, as in infer_range.
+    if any(all(name in kinds[value] for value in non_empty) for name in ("integer", "float", "boolean")):
+        coerced = True
+    else:
+        for value in non_empty:
+            date_kind = is_date_or_datetime(value)
+            if date_kind:
+                kinds[value].append(date_kind)
+        coerced = bool(non_empty) and all("date" in kinds[value] or "datetime" in kinds[value] for value in non_empty)
+
+    for value, count in counts.items():
+        kind = "+".join(kinds[value]) or "string"
+        entry = profile.kinds.setdefault(kind, [0, 0])
+        entry[0] += 1
+        entry[1] += count
+
+    if non_empty and not coerced:
+        profile.measurement = bool(is_all_measurement(non_empty))
+        prefixes = {get_db(value) for value in non_empty}
+        if None not in prefixes:
+            profile.curie_prefixes = sorted(prefixes)[:2]
+
+
+def profile_table(path: Path, max_distinct: int, column_separator: str = "\t") -> TableProfile:
+    """
+    Profile the columns of a delimited file.
+
+    Args:
+        path: The input file (header row first).
+        max_distinct: Keep a column's distinct values only if it has at most this many.
+        column_separator: Field separator (schema-automator's default is a tab, also for CSV files).
+
+    Returns:
+        The file's profile; ``rows`` is 0 for a file with no data rows.
+
+    """
+    rows, profiles, counts = _read_columns(path, column_separator)
+    for name, profile in profiles.items():
+        _classify(profile, counts[name], max_distinct)
+    return TableProfile(rows=rows, columns=list(profiles.values()), max_distinct=max_distinct)
+
+
+class ProfileCache:
+    """Table profiles stored as ``<key>.json``, keyed by input content digest."""
+
+    def __init__(self, cache_dir: Path):
+        """Use cache_dir (created on the first put) for profiles."""
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def key(path: Path, column_separator: str = "\t") -> str:
+        """Return the cache key of a file's profile."""
+        return combine_digests(file_digest(path), str(PROFILE_VERSION), column_separator)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str, max_enum_size: int) -> TableProfile | None:
+        """Return a cached profile, or None if it is missing or kept too few distinct values for max_enum_size."""
+        try:
+            profile = TableProfile.from_json(self._path(key).read_text())
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            return None
+        return profile if profile.can_enumerate(max_enum_size) else None
+
+    def put(self, key: str, profile: TableProfile) -> None:
+        """Store a profile."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(profile.to_json())
+        os.replace(tmp, path)
+
+    def prune(self, live: set[str]) -> None:
+        """Remove cached profiles whose key is not in live."""
+        for path in self.cache_dir.glob("*.json"):
+            if path.stem not in live:
+                path.unlink(missing_ok=True)
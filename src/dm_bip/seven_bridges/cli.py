@@ -11,16 +11,14 @@ import time
 import urllib.parse
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Annotated, Optional
+from typing import TYPE_CHECKING, Annotated, Optional
 
 import typer
 
-from dm_bip.seven_bridges.client import (
-    Client,
-    SevenBridgesError,
-    TokenMissingError,
-    load_config,
-)
+from dm_bip.seven_bridges.errors import SevenBridgesError, TokenMissingError
+
+if TYPE_CHECKING:
+    from dm_bip.seven_bridges.client import Client
 
 logger = logging.getLogger("dm_bip.seven_bridges")
 
@@ -73,6 +71,9 @@ def _handle_error(exc: SevenBridgesError) -> None:
 
 
 def _make_client() -> Client:
+    # httpx is only needed once a command actually talks to the API.
+    from dm_bip.seven_bridges.client import Client, load_config
+
     return Client(load_config())
 
 
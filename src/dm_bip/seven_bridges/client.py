@@ -11,6 +11,17 @@ from typing import Any
 
 import httpx
 
+from dm_bip.seven_bridges.errors import SevenBridgesError, TokenMissingError
+
+__all__ = [
+    "Client",
+    "Config",
+    "SevenBridgesError",
+    "TokenMissingError",
+    "get_token",
+    "load_config",
+]
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_BASE_URL = "https://api.sb.biodatacatalyst.nhlbi.nih.gov/v2"
@@ -26,14 +37,6 @@ RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
 TOKEN_HELP_URL = "https://sb-biodatacatalyst.readme.io/docs/get-your-authentication-token"  # noqa: S105
 
 
-class SevenBridgesError(Exception):
-    """Raised when the Seven Bridges API returns an unrecoverable error."""
-
-
-class TokenMissingError(SevenBridgesError):
-    """Raised when no auth token is configured (no env var, no token file)."""
-
-
 @dataclass(frozen=True)
 class Config:
     """Resolved configuration: base URL, project/app defaults, token file location."""
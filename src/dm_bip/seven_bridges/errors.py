@@ -0,0 +1,9 @@
+"""Exceptions raised by the Seven Bridges client, importable without loading httpx."""
+
+
+class SevenBridgesError(Exception):
+    """Raised when the Seven Bridges API returns an unrecoverable error."""
+
+
+class TokenMissingError(SevenBridgesError):
+    """Raised when no auth token is configured (no env var, no token file)."""
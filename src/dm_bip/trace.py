@@ -0,0 +1,379 @@
+"""
+Lightweight pipeline tracing to a local JSONL file.
+
+When ``DM_TRACE_FILE`` is set (``pipeline.Makefile`` sets it to
+``$(DM_OUTPUT_DIR)/traces/$(NOW).jsonl``, a file per run), every ``dm-bip`` command, every Makefile
+command run under ``python -m dm_bip.trace run``, and the per-file and
+per-entity work inside them append spans to it. A span is two JSON lines:
+
+    {"event": "start", "id": ..., "parent": ..., "name": ..., "stage": ..., "ts": ..., "pid": ..., "attrs": {...}}
+    {"event": "end", "id": ..., "ts": ..., "status": "ok", "exit_code": 0, "attrs": {...}}
+
+so a process killed mid-span (e.g. out of memory) still leaves its start.
+Each line is appended with a single write, so processes running in parallel
+(``make -j``, forked workers) share the file safely. A span's parent is the
+span open in the same process or, across processes, ``DM_TRACE_PARENT``.
+
+``dm-bip trace report`` reads the file offline: wall time per stage, the
+critical path through the spans, and optionally a Chrome trace-event JSON for
+chrome://tracing or https://ui.perfetto.dev. Nothing here depends on a collector
+or anything beyond the standard library, and without ``DM_TRACE_FILE`` every
+call is a no-op.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+TRACE_ENV = "DM_TRACE_FILE"
+PARENT_ENV = "DM_TRACE_PARENT"
+
+# Two spans closer than this are treated as back to back on the critical path.
+_SLACK_SECONDS = 0.001
+
+# A word after the program that names a subcommand (`linkml validate`) rather than a file.
+_SUBCOMMAND = re.compile(r"^[a-z][a-z0-9-]*$")
+
+_current: ContextVar[str | None] = ContextVar("dm_bip_trace_span", default=None)
+
+
+def _emit(record: dict) -> None:
+    path = os.environ.get(TRACE_ENV)
+    if not path:
+        return
+    line = json.dumps(record, default=str) + "\n"
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError:
+        pass  # tracing never fails the pipeline
+
+
+def enabled() -> bool:
+    """Return whether spans are being recorded."""
+    return bool(os.environ.get(TRACE_ENV))
+
+
+def current_span() -> str | None:
+    """Return the id of the open span in this process, else the parent passed down by ``DM_TRACE_PARENT``."""
+    return _current.get() or os.environ.get(PARENT_ENV) or None
+
+
+def start_span(name: str, stage: str, **attrs) -> str | None:
+    """
+    Record the start of a span.
+
+    Args:
+        name: What runs, e.g. ``dm-bip map`` or ``linkml-lint``.
+        stage: Pipeline stage: schema, lint, validation, map, provenance, ...
+        **attrs: Attributes such as file or entity; None values are dropped.
+
+    Returns:
+        The span's id for :func:`end_span`, or None when tracing is off.
+
+    """
+    if not enabled():
+        return None
+    span_id = os.urandom(8).hex()
+    _emit(
+        {
+            "event": "start",
+            "id": span_id,
+            "parent": current_span(),
+            "name": name,
+            "stage": stage,
+            "ts": time.time(),
+            "pid": os.getpid(),
+            "attrs": {key: value for key, value in attrs.items() if value is not None},
+        }
+    )
+    return span_id
+
+
+def end_span(span_id: str | None, status: str = "ok", exit_code: int | None = None, **attrs) -> None:
+    """Record the end of a span started by :func:`start_span` (nothing if span_id is None)."""
+    if span_id is None:
+        return
+    record = {"event": "end", "id": span_id, "ts": time.time(), "status": status}
+    if exit_code is not None:
+        record["exit_code"] = exit_code
+    if attrs:
+        record["attrs"] = attrs
+    _emit(record)
+
+
+def activate(span_id: str | None) -> None:
+    """Make span_id the parent of the spans opened from here on in this process (and forked children)."""
+    if span_id is not None:
+        _current.set(span_id)
+
+
+@contextmanager
+def span(name: str, stage: str, **attrs) -> Iterator[dict]:
+    """
+    Trace a block as a span; spans opened inside it are its children.
+
+    Yields:
+        A dict of attributes to add when the span ends (e.g. rows written).
+
+    """
+    span_id = start_span(name, stage, **attrs)
+    token = _current.set(span_id) if span_id else None
+    extra: dict = {}
+    try:
+        yield extra
+    except BaseException:
+        end_span(span_id, "error", **extra)
+        raise
+    else:
+        end_span(span_id, extra.pop("status", "ok"), **extra)
+    finally:
+        if token is not None:
+            _current.reset(token)
+
+
+def run_command(command: list[str], name: str, stage: str, **attrs) -> int:
+    """
+    Run a command as a span, passing the span down so its own spans nest under it.
+
+    Returns:
+        The command's exit code, as the shell reports it (128 + N for signal N).
+
+    """
+    span_id = start_span(name, stage, **attrs)
+    env = {**os.environ, PARENT_ENV: span_id} if span_id else None
+    try:
+        returncode = subprocess.run(command, env=env, check=False).returncode  # noqa: S603 - the caller's own command
+    except FileNotFoundError:
+        returncode = 127
+    if returncode < 0:
+        returncode = 128 - returncode
+    end_span(span_id, "ok" if returncode == 0 else "error", exit_code=returncode)
+    return returncode
+
+
+@dataclass
+class Span:
+    """A span read back from a trace file."""
+
+    id: str
+    name: str
+    stage: str
+    start: float
+    end: float
+    pid: int
+    parent: str | None = None
+    status: str = "unfinished"  # "ok", "error", or "unfinished" when no end was recorded
+    exit_code: int | None = None
+    attrs: dict = field(default_factory=dict)
+    children: list["Span"] = field(default_factory=list)
+
+    @property
+    def seconds(self) -> float:
+        """Duration in seconds."""
+        return self.end - self.start
+
+    @property
+    def label(self) -> str:
+        """The span's name with its file or entity."""
+        detail = self.attrs.get("entity") or self.attrs.get("file")
+        return f"{self.name} [{detail}]" if detail else self.name
+
+
+def load_spans(path: Path) -> list[Span]:
+    """
+    Read a trace file into spans, ordered by start time.
+
+    Spans that never ended are kept, ending at the last time in the trace;
+    lines that are not JSON (e.g. cut short by a kill) are skipped.
+    """
+    spans: dict[str, Span] = {}
+    ends: dict[str, dict] = {}
+    last = 0.0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict) or "id" not in record:
+                continue
+            last = max(last, record.get("ts", 0.0))
+            if record.get("event") == "start":
+                spans[record["id"]] = Span(
+                    id=record["id"],
+                    name=record.get("name", "?"),
+                    stage=record.get("stage", "?"),
+                    start=record["ts"],
+                    end=record["ts"],
+                    pid=record.get("pid", 0),
+                    parent=record.get("parent"),
+                    attrs=record.get("attrs") or {},
+                )
+            elif record.get("event") == "end":
+                ends[record["id"]] = record
+
+    for span_id, s in spans.items():
+        end = ends.get(span_id)
+        if end is None:
+            s.end = last
+            continue
+        s.end, s.status, s.exit_code = end["ts"], end.get("status", "ok"), end.get("exit_code")
+        s.attrs.update(end.get("attrs") or {})
+    for s in spans.values():
+        if s.parent in spans:
+            spans[s.parent].children.append(s)
+        else:
+            s.parent = None
+    return sorted(spans.values(), key=lambda s: s.start)
+
+
+def critical_path(spans: list[Span]) -> list[Span]:
+    """
+    Return the chain of spans that determined when the last one finished.
+
+    Starting from the span that ends last, repeatedly step back to the span
+    that finished last before the current one started, as a make or worker
+    pool waiting on it would have. Spans overlapping the chain ran in parallel
+    with it and did not delay the end.
+    """
+    path = []
+    current = max(spans, key=lambda s: s.end, default=None)
+    while current is not None:
+        path.append(current)
+        before = [s for s in spans if s.end <= current.start + _SLACK_SECONDS and s is not current]
+        current = max(before, key=lambda s: s.end, default=None)
+    return path[::-1]
+
+
+def _union_seconds(intervals: list[tuple[float, float]]) -> float:
+    total, reach = 0.0, None
+    for start, end in sorted(intervals):
+        if reach is None or start > reach:
+            total += end - start
+            reach = end
+        elif end > reach:
+            total += end - reach
+            reach = end
+    return total
+
+
+def stage_summary(spans: list[Span]) -> dict[str, dict]:
+    """
+    Return per stage the number of spans, their summed duration, and the wall time any of them ran.
+
+    Only top-level spans count, so time inside a command is not counted twice.
+    """
+    roots = [s for s in spans if s.parent is None]
+    summary: dict[str, dict] = {}
+    for stage in dict.fromkeys(s.stage for s in roots):
+        members = [s for s in roots if s.stage == stage]
+        summary[stage] = {
+            "spans": len(members),
+            "busy_seconds": sum(s.seconds for s in members),
+            "wall_seconds": _union_seconds([(s.start, s.end) for s in members]),
+            "failed": sum(s.status != "ok" for s in members),
+        }
+    return summary
+
+
+def format_report(spans: list[Span]) -> str:
+    """Render a stage summary and the critical path (descending into the spans on it) as text."""
+    if not spans:
+        return "Trace is empty."
+    roots = [s for s in spans if s.parent is None]
+    origin = min(s.start for s in spans)
+    wall = max(s.end for s in spans) - origin
+    lines = [f"{len(spans)} span(s) from {len({s.pid for s in spans})} process(es) over {wall:.1f}s.", ""]
+
+    lines.append(f"{'stage':<20} {'spans':>6} {'busy':>9} {'wall':>9} {'share':>6}")
+    for stage, row in stage_summary(spans).items():
+        share = row["wall_seconds"] / wall if wall else 0.0
+        failed = f"  ({row['failed']} failed)" if row["failed"] else ""
+        lines.append(
+            f"{stage:<20} {row['spans']:>6} {row['busy_seconds']:>8.1f}s {row['wall_seconds']:>8.1f}s "
+            f"{share:>6.0%}{failed}"
+        )
+
+    path = critical_path(roots)
+    lines += ["", f"Critical path ({sum(s.seconds for s in path):.1f}s of {wall:.1f}s):"]
+
+    def walk(chain: list[Span], depth: int) -> None:
+        for s in chain:
+            status = "" if s.status == "ok" else f"  {s.status}" + (f" (exit {s.exit_code})" if s.exit_code else "")
+            indent = "  " * depth
+            lines.append(f"  {s.start - origin:>8.1f}s {s.seconds:>8.1f}s  {indent}{s.stage}: {s.label}{status}")
+            if s.children:
+                walk(critical_path(s.children), depth + 1)
+
+    walk(path, 0)
+    return "\n".join(lines)
+
+
+def chrome_trace(spans: list[Span]) -> dict:
+    """Return the spans as Chrome trace-event JSON (complete events, one row per process)."""
+    origin = min((s.start for s in spans), default=0.0)
+    events = []
+    for s in spans:
+        args = {**s.attrs, "status": s.status}
+        if s.exit_code is not None:
+            args["exit_code"] = s.exit_code
+        events.append(
+            {
+                "name": s.label,
+                "cat": s.stage,
+                "ph": "X",
+                "ts": round((s.start - origin) * 1e6),
+                "dur": round(s.seconds * 1e6),
+                "pid": s.pid,
+                "tid": s.pid,
+                "args": args,
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _command_name(command: list[str]) -> str:
+    """Name a command by its program and subcommand, or by the module or script a Python interpreter runs."""
+    name = Path(command[0]).name
+    if name.startswith("python") and len(command) > 2 and command[1] == "-m":
+        return command[2]
+    if name.startswith("python") and len(command) > 1 and not command[1].startswith("-"):
+        return Path(command[1]).name
+    if len(command) > 1 and _SUBCOMMAND.match(command[1]):
+        return f"{name} {command[1]}"
+    return name
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI entry point: ``run`` a command as a span (used by ``pipeline.Makefile`` recipes)."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] != ["run"] or "--" not in argv:
+        print("usage: python -m dm_bip.trace run --stage STAGE [--file F] [--entity E] -- command ...", file=sys.stderr)
+        return 2
+    split = argv.index("--")
+    parser = argparse.ArgumentParser(prog="python -m dm_bip.trace run", description="Run a command as a trace span.")
+    parser.add_argument("--stage", required=True, help="Pipeline stage")
+    parser.add_argument("--name", help="Span name (default: the command's name)")
+    parser.add_argument("--file", help="Input file the command processes")
+    parser.add_argument("--entity", help="Entity the command maps")
+    args = parser.parse_args(argv[1:split])
+    command = argv[split + 1 :]
+    if not command:
+        parser.error("no command after --")
+    name = args.name or _command_name(command)
+    return run_command(command, name, args.stage, file=args.file, entity=args.entity)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,12 +4,19 @@ Generate YAML transformation specs from metadata CSV using Jinja2 templates.
 Refactored from DMCYAML_07_GenerateYAML_forPy.py (RTIInternational/NHLBI-BDC-DMC-HV).
 """
 
-from collections.abc import Callable
-from dataclasses import dataclass
+import hashlib
+import os
+from collections.abc import Callable, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
+from typing import Any
 
 import pandas as pd
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+from dm_bip.fingerprint import file_digest
 
 TEMPLATES_DIR = Path(__file__).parent / "templates"
 
@@ -19,17 +26,36 @@ DEFAULT_LAYOUT = "{cohort}/{quality}/{varname}.yaml"
 
 @dataclass(frozen=True)
 class EntitySpec:
-    """Binds a BDCHM entity to its template and its row-completeness rule."""
+    """
+    Binds a BDCHM entity to its template and its row-completeness rule.
+
+    ``is_good`` judges one metadata record; ``good_mask``, when given, is the
+    same rule vectorized over a whole frame and is preferred for bulk generation.
+    """
 
     template: str
-    is_good: Callable[[pd.Series], bool]
+    is_good: Callable[[Mapping[str, Any]], bool]
+    good_mask: Callable[[pd.DataFrame], pd.Series] | None = None
 
+    def mask(self, df: pd.DataFrame) -> pd.Series:
+        """Return a boolean Series marking the complete ("good") rows of df."""
+        if self.good_mask is not None:
+            return self.good_mask(df)
+        return pd.Series([self.is_good(record) for record in df.to_dict("records")], index=df.index, dtype=bool)
 
-def _measobs_is_good(row: pd.Series) -> bool:
+
+def _measobs_is_good(row: Mapping[str, Any]) -> bool:
     """MeasurementObservation rows carry a precomputed row_good flag from prepare_metadata."""
     return row.get("row_good") == 1
 
 
+def _measobs_good_mask(df: pd.DataFrame) -> pd.Series:
+    """Vectorized _measobs_is_good."""
+    if "row_good" not in df.columns:
+        return pd.Series(False, index=df.index)
+    return df["row_good"] == 1
+
+
 _CONDITION_REQUIRED = (
     "pht",
     "participantidphv",
@@ -41,29 +67,268 @@ _CONDITION_REQUIRED = (
 )
 
 
-def _condition_is_good(row: pd.Series) -> bool:
+def _condition_is_good(row: Mapping[str, Any]) -> bool:
     """Return True when a Condition row has every slot the template needs to emit a complete spec."""
-    return all(row.get(field) not in (None, "", 0) for field in _CONDITION_REQUIRED)
+    return all(row.get(column) not in (None, "", 0) for column in _CONDITION_REQUIRED)
+
+
+def _condition_good_mask(df: pd.DataFrame) -> pd.Series:
+    """Vectorized _condition_is_good."""
+    mask = pd.Series(True, index=df.index)
+    for column in _CONDITION_REQUIRED:
+        if column not in df.columns:
+            return pd.Series(False, index=df.index)
+        mask &= df[column].notna() & ~df[column].isin(["", 0])
+    return mask
 
 
 ENTITY_REGISTRY: dict[str, EntitySpec] = {
-    "MeasurementObservation": EntitySpec("yaml_measobs.j2", _measobs_is_good),
-    "Condition": EntitySpec("yaml_condition.j2", _condition_is_good),
+    "MeasurementObservation": EntitySpec("yaml_measobs.j2", _measobs_is_good, _measobs_good_mask),
+    "Condition": EntitySpec("yaml_condition.j2", _condition_is_good, _condition_good_mask),
 }
 
 
-def _safe_output_path(output_dir: Path, rel: str) -> Path:
-    """Reject absolute or traversal paths; ensure result stays under output_dir."""
+def _safe_output_path(output_dir: Path, rel: str, base: Path | None = None) -> Path:
+    """Reject absolute or traversal paths; ensure result stays under output_dir (pre-resolved as base, if given)."""
     rel_path = Path(rel)
     if rel_path.is_absolute():
         raise ValueError(f"layout produced absolute path {rel!r}; must be relative to output_dir")
     candidate = (output_dir / rel_path).resolve()
-    base = output_dir.resolve()
+    base = output_dir.resolve() if base is None else base
     if base != candidate and base not in candidate.parents:
         raise ValueError(f"layout {rel!r} resolves outside output_dir {output_dir}")
     return candidate
 
 
+def load_metadata(input_csv: Path) -> pd.DataFrame:
+    """Read a metadata CSV with blank cells filled with 0, as the templates expect."""
+    return pd.read_csv(input_csv).fillna(0)
+
+
+def _get_spec(entity: str) -> EntitySpec:
+    spec = ENTITY_REGISTRY.get(entity)
+    if spec is None:
+        raise ValueError(f"No registered entity spec for {entity!r}; known: {sorted(ENTITY_REGISTRY)}")
+    return spec
+
+
+# An output path and the metadata records rendered into it, in CSV order.
+_PlannedFile = tuple[Path, list[dict[str, Any]]]
+
+
+def _cohorts_for(df: pd.DataFrame, entity: str) -> list[str]:
+    """Return the cohorts with at least one row for entity (blank cohorts, filled as 0, are skipped)."""
+    return sorted({c for c in df.loc[df["bdchm_entity"] == entity, "cohort"] if isinstance(c, str)})
+
+
+def _group_records(df: pd.DataFrame, entity: str, cohort: str) -> list[tuple[str, str, list[dict[str, Any]]]]:
+    """
+    Split one (entity, cohort) slice of the metadata into per-variable record groups.
+
+    Returns:
+        ``(quality, varname, records)`` triples — "good" groups first, then
+        "bad", each sorted by varname with records in CSV order.
+
+    """
+    spec = _get_spec(entity)
+    df_filtered = df[(df["bdchm_entity"] == entity) & (df["cohort"] == cohort)]
+    if df_filtered.empty:
+        return []
+
+    good_mask = spec.mask(df_filtered).to_numpy(dtype=bool)
+
+    groups = []
+    for quality, quality_mask in (("good", good_mask), ("bad", ~good_mask)):
+        subset = df_filtered[quality_mask]
+        if subset.empty:
+            continue
+
+        # One conversion to plain dicts per row, then bucket by (sorted) varname —
+        # no per-row Series objects anywhere on the hot path.
+        codes, varnames = pd.factorize(subset["bdchm_varname"], sort=True)
+        buckets: list[list[dict[str, Any]]] = [[] for _ in varnames]
+        for code, record in zip(codes, subset.to_dict("records"), strict=True):
+            buckets[code].append(record)
+        groups.extend((quality, str(varname), records) for varname, records in zip(varnames, buckets, strict=True))
+    return groups
+
+
+def _plan_files(df: pd.DataFrame, entity: str, cohort: str, output_dir: Path, layout: str) -> list[_PlannedFile]:
+    """Split one (entity, cohort) slice of the metadata into output paths and the records each one renders."""
+    base = output_dir.resolve()
+    planned = []
+    for quality, varname, records in _group_records(df, entity, cohort):
+        safe_name = Path(varname).name
+        rel = layout.format(cohort=cohort, quality=quality, varname=safe_name)
+        planned.append((_safe_output_path(output_dir, rel, base), records))
+    return planned
+
+
+def _write_if_changed(path: Path, text: str) -> bool:
+    """
+    Write text to path unless the file already holds exactly that content.
+
+    Unchanged files keep their mtime, so make targets that depend on them are
+    not invalidated. Changed files are written to a sibling temp file and moved
+    into place atomically.
+
+    Returns:
+        True if the file was created or its content changed.
+
+    """
+    data = text.encode("utf-8")
+    try:
+        if path.stat().st_size == len(data) and file_digest(path) == hashlib.sha256(data).hexdigest():
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return True
+
+
+@lru_cache(maxsize=None)
+def _environment(templates_dir: Path, bytecode_cache_dir: Path | None = None) -> Environment:
+    """
+    Return the process-wide Jinja2 environment for a templates directory.
+
+    The environment keeps compiled templates in memory (reloading any whose
+    source file changes), so repeated calls in one process parse each template
+    once. With ``bytecode_cache_dir`` the compiled code is also persisted on
+    disk and shared by later processes and pool workers.
+    """
+    bytecode_cache = None
+    if bytecode_cache_dir is not None:
+        bytecode_cache_dir.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(bytecode_cache_dir))
+    return Environment(  # noqa: S701 - generating YAML, not HTML
+        loader=FileSystemLoader(str(templates_dir)),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        bytecode_cache=bytecode_cache,
+    )
+
+
+def _get_template(
+    template_name: str, templates_dir: Path = TEMPLATES_DIR, bytecode_cache_dir: Path | None = None
+) -> Template:
+    """Return a compiled trans-spec template from the module-level template cache."""
+    if bytecode_cache_dir is not None:
+        bytecode_cache_dir = bytecode_cache_dir.resolve()
+    return _environment(templates_dir.resolve(), bytecode_cache_dir).get_template(template_name)
+
+
+def _render_files(
+    templates_dir: Path, template_name: str, files: list[_PlannedFile], bytecode_cache_dir: Path | None = None
+) -> list[Path]:
+    """
+    Render and write planned files with a single template; runs in-process or in a pool worker.
+
+    Returns:
+        The paths whose content changed (or that did not exist before).
+
+    """
+    template = _get_template(template_name, templates_dir, bytecode_cache_dir)
+    changed = []
+    for out_path, records in files:
+        if _write_if_changed(out_path, "".join(template.render(**record) for record in records)):
+            changed.append(out_path)
+    return changed
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of a generate_batch run.
+
+    ``files`` holds every generated path keyed by (entity, cohort); requested
+    pairs with no matching rows map to ``[]``. ``changed`` is the subset that
+    was created or rewritten — the rest already had identical content on disk.
+    """
+
+    files: dict[tuple[str, str], list[Path]] = field(default_factory=dict)
+    changed: set[Path] = field(default_factory=set)
+
+
+class GeneratedFiles(list):
+    """The paths generate_yaml generated, in order, with ``changed`` naming those created or rewritten."""
+
+    def __init__(self, paths: list[Path], changed: list[Path]):
+        """Hold paths, and the changed subset of them."""
+        super().__init__(paths)
+        self.changed = changed
+
+
+def generate_batch(
+    input_csv: Path,
+    output_dir: Path,
+    entities: list[str] | None = None,
+    cohorts: list[str] | None = None,
+    templates_dir: Path = TEMPLATES_DIR,
+    layout: str = DEFAULT_LAYOUT,
+    workers: int = 1,
+    bytecode_cache_dir: Path | None = None,
+) -> BatchResult:
+    """
+    Generate YAML files for many (entity, cohort) pairs from a single read of the metadata CSV.
+
+    Args:
+        input_csv: Path to the metadata CSV.
+        output_dir: Directory to write YAML output files.
+        entities: Entities to render. None renders every registered entity present in the CSV.
+        cohorts: Cohorts to render for each entity. None renders every cohort present for that entity.
+        templates_dir: Directory containing Jinja2 templates.
+        layout: Output path template under ``output_dir`` (see ``generate_yaml``).
+        workers: Worker processes for template rendering. 1 renders in-process.
+        bytecode_cache_dir: Optional directory for Jinja2's on-disk bytecode cache, so
+            new processes (pool workers, later invocations) skip template compilation.
+
+    Files whose rendered content matches what is already on disk are not
+    rewritten, so their mtimes (and anything make derives from them) survive a
+    regeneration.
+
+    Returns:
+        Generated paths keyed by (entity, cohort), and which of them changed.
+
+    """
+    for entity in entities or ():
+        _get_spec(entity)
+
+    df = load_metadata(input_csv)
+    if entities is None:
+        entities = [entity for entity in ENTITY_REGISTRY if (df["bdchm_entity"] == entity).any()]
+
+    plans: dict[tuple[str, str], list[_PlannedFile]] = {}
+    for entity in entities:
+        for cohort in cohorts if cohorts is not None else _cohorts_for(df, entity):
+            plans[(entity, cohort)] = _plan_files(df, entity, cohort, output_dir, layout)
+
+    changed: set[Path] = set()
+    if workers <= 1:
+        for (entity, _), files in plans.items():
+            changed.update(_render_files(templates_dir, ENTITY_REGISTRY[entity].template, files, bytecode_cache_dir))
+    else:
+        by_template: dict[str, list[_PlannedFile]] = {}
+        for (entity, _), files in plans.items():
+            by_template.setdefault(ENTITY_REGISTRY[entity].template, []).extend(files)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_render_files, templates_dir, template_name, files[i::workers], bytecode_cache_dir)
+                for template_name, files in by_template.items()
+                for i in range(workers)
+                if files[i::workers]
+            ]
+            for future in futures:
+                changed.update(future.result())
+
+    return BatchResult(files={key: [path for path, _ in files] for key, files in plans.items()}, changed=changed)
+
+
 def generate_yaml(
     input_csv: Path,
     output_dir: Path,
@@ -71,7 +336,7 @@ def generate_yaml(
     cohort: str,
     templates_dir: Path = TEMPLATES_DIR,
     layout: str = DEFAULT_LAYOUT,
-) -> list[Path]:
+) -> GeneratedFiles:
     """
     Generate YAML files from a metadata CSV for a given entity and cohort.
 
@@ -87,37 +352,17 @@ def generate_yaml(
             ``{cohort}/{quality}/{varname}.yaml``.
 
     Returns:
-        List of paths to generated YAML files.
+        List of paths to generated YAML files; its ``changed`` attribute lists
+        those whose content changed (or that did not exist before).
 
     """
-    spec = ENTITY_REGISTRY.get(entity)
-    if spec is None:
-        raise ValueError(f"No registered entity spec for {entity!r}; known: {sorted(ENTITY_REGISTRY)}")
-
-    df = pd.read_csv(input_csv)
-    df = df.fillna(0)
-
-    df_filtered = df[(df["bdchm_entity"] == entity) & (df["cohort"] == cohort)].copy()
-    if df_filtered.empty:
-        return []
-
-    env = Environment(loader=FileSystemLoader(str(templates_dir)), trim_blocks=True, lstrip_blocks=True)  # noqa: S701 - generating YAML, not HTML
-    template = env.get_template(spec.template)
-
-    good_mask = df_filtered.apply(spec.is_good, axis=1)
-
-    written = []
-    for quality in ("good", "bad"):
-        subset = df_filtered[good_mask] if quality == "good" else df_filtered[~good_mask]
-
-        for varname, group in subset.groupby("bdchm_varname"):
-            safe_name = Path(varname).name
-            rel = layout.format(cohort=cohort, quality=quality, varname=safe_name)
-            out_path = _safe_output_path(output_dir, rel)
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(out_path, "w") as f:
-                for _, row in group.iterrows():
-                    f.write(template.render(**row.to_dict()))
-            written.append(out_path)
-
-    return written
+    results = generate_batch(
+        input_csv=input_csv,
+        output_dir=output_dir,
+        entities=[entity],
+        cohorts=[cohort],
+        templates_dir=templates_dir,
+        layout=layout,
+    )
+    paths = results.files[(entity, cohort)]
+    return GeneratedFiles(paths, [path for path in paths if path in results.changed])
@@ -0,0 +1,292 @@
+"""
+Incremental prepare-metadata.
+
+Curators typically edit one raw workbook or one cleanup rule and rerun
+``prepare-metadata`` across every cohort. This module runs the same mechanical
+pipeline, but treats each raw workbook as a partition and caches the
+partition's intermediate frames under a cache directory:
+
+    standardized   load_raw_workbook + standardize_raw_data
+                   keyed on (workbook bytes, sheet candidates, raw column union)
+    cleaned        apply_cleanup_rules + finalize_cleaned_data
+                   keyed on (standardized frame digest, cleanup rules bytes)
+    merged         merge_data_docs
+                   keyed on (cleaned frame digest, reference data bytes, entity filter)
+
+Each stage key folds in the *content digest* of the frame it was computed
+from, recorded in ``manifest.json``. Editing a cleanup rule therefore re-runs
+the (vectorized, cheap) cleanup step for every partition, but the merge only
+for partitions whose cleaned frame actually changed; an unchanged workbook is
+never re-read from Excel.
+
+``load_raw_workbook`` drops a workbook's all-empty columns, which
+``prepare_metadata`` gets back when it concatenates the workbooks. Each
+partition is therefore reindexed to the union of the raw columns of all
+workbooks, in file order, before it is standardized; each workbook's columns
+are recorded in the manifest, so the union needs no unchanged workbook
+re-read. From there every step is row-local, so concatenating the merged
+partitions and de-duplicating yields the same rows, in the same order, as
+``prepare_metadata`` over the full file list.
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+
+import pandas as pd
+
+from dm_bip.fingerprint import combine_digests, file_digest
+from dm_bip.trans_spec_gen.cleanup_rules import apply_cleanup_rules, load_cleanup_rules
+from dm_bip.trans_spec_gen.prepare_metadata import (
+    DEFAULT_CONVERSION_OVERRIDES,
+    DEFAULT_EQUIVALENCY_OVERRIDES,
+    DEFAULT_KNOWN_SHEETS,
+    OUTPUT_COLUMNS,
+    finalize_cleaned_data,
+    load_raw_workbook,
+    load_reference_tables,
+    merge_data_docs,
+    standardize_raw_data,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+
+
+@dataclass
+class PartitionStatus:
+    """Stages recomputed for one raw workbook; empty when every stage came from the cache."""
+
+    name: str
+    rebuilt: list[str] = field(default_factory=list)
+
+
+@dataclass
+class IncrementalResult:
+    """Outcome of an incremental prepare-metadata run."""
+
+    output_path: Path | None
+    partitions: list[PartitionStatus] = field(default_factory=list)
+
+    @property
+    def rebuilt(self) -> list[PartitionStatus]:
+        """Partitions with at least one recomputed stage."""
+        return [p for p in self.partitions if p.rebuilt]
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Return a content digest of a DataFrame's columns and values (index ignored)."""
+    h = hashlib.sha256(json.dumps(list(map(str, df.columns))).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class _FrameCache:
+    """Pickled stage frames keyed by stage key, plus the manifest recording each key's frame digest."""
+
+    def __init__(self, cache_dir: Path):
+        self.frames_dir = cache_dir / "frames"
+        self.manifest_path = cache_dir / MANIFEST_NAME
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> dict:
+        try:
+            manifest = json.loads(self.manifest_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            manifest = {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            manifest = {"version": MANIFEST_VERSION, "stages": {}, "columns": {}, "partitions": {}}
+        return manifest
+
+    def _frame_path(self, key: str) -> Path:
+        return self.frames_dir / f"{key}.pkl"
+
+    def digest(self, key: str) -> str | None:
+        """Return the recorded digest for a stage key, or None if the frame is not cached."""
+        digest = self.manifest["stages"].get(key)
+        if digest is None or not self._frame_path(key).exists():
+            return None
+        return digest
+
+    def load(self, key: str) -> pd.DataFrame:
+        """Load a cached stage frame."""
+        return pd.read_pickle(self._frame_path(key))  # noqa: S301 - written by put() into our own cache dir
+
+    def put(self, key: str, df: pd.DataFrame) -> str:
+        """Store a stage frame and return its content digest."""
+        self.frames_dir.mkdir(parents=True, exist_ok=True)
+        df.to_pickle(self._frame_path(key))
+        digest = frame_digest(df)
+        self.manifest["stages"][key] = digest
+        return digest
+
+    def columns(self, key: str) -> list[str] | None:
+        """Return the raw columns recorded for a loaded-workbook key, or None."""
+        return self.manifest["columns"].get(key)
+
+    def put_columns(self, key: str, columns: list[str]) -> list[str]:
+        """Record the raw columns of a loaded workbook and return them."""
+        self.manifest["columns"][key] = columns
+        return columns
+
+    def save(self, partitions: dict[str, dict[str, str]]) -> None:
+        """Record the current partitions, drop frames and columns no partition references, and write the manifest."""
+        live = {key for entry in partitions.values() for stage, key in entry.items() if stage != "workbook"}
+        for key in set(self.manifest["stages"]) - live:
+            del self.manifest["stages"][key]
+            self._frame_path(key).unlink(missing_ok=True)
+        self.manifest["columns"] = {key: cols for key, cols in self.manifest["columns"].items() if key in live}
+        self.manifest["partitions"] = partitions
+
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2, sort_keys=True))
+        os.replace(tmp, self.manifest_path)
+
+
+def _optional_digest(path: Path | None) -> str:
+    return file_digest(path) if path else "none"
+
+
+def _resolve_stage(
+    frames: _FrameCache, status: PartitionStatus, stage: str, key: str, compute: Callable[[], pd.DataFrame]
+) -> str:
+    """Return the digest for a stage key, computing and caching the frame on a miss."""
+    digest = frames.digest(key)
+    if digest is None:
+        digest = frames.put(key, compute())
+        status.rebuilt.append(stage)
+    return digest
+
+
+def prepare_metadata_incremental(
+    raw_files: list[Path],
+    bdchv_defs_path: Path,
+    contextual_vars_path: Path,
+    unit_key_path: Path,
+    output_path: Path,
+    cache_dir: Path,
+    cleanup_rules_path: Path | None = None,
+    conversion_overrides_path: Path | None = DEFAULT_CONVERSION_OVERRIDES,
+    equivalency_overrides_path: Path | None = DEFAULT_EQUIVALENCY_OVERRIDES,
+    known_sheets: list[str] | None = None,
+    entity_filter: str | None = "MeasurementObservation",
+) -> IncrementalResult:
+    """
+    Run prepare_metadata, recomputing only the partitions whose inputs changed.
+
+    Takes the same arguments as ``prepare_metadata`` plus ``cache_dir``, where
+    per-workbook frames and the dependency manifest are kept between runs.
+
+    Returns:
+        The written output path (None if no raw files were given) and, per raw
+        workbook, which stages were recomputed.
+
+    """
+    result = IncrementalResult(output_path=None)
+    if not raw_files:
+        logger.warning("No data loaded from raw files")
+        return result
+
+    frames = _FrameCache(cache_dir)
+    sheets = DEFAULT_KNOWN_SHEETS if known_sheets is None else known_sheets
+    rules_digest = _optional_digest(cleanup_rules_path)
+    reference_digest = combine_digests(
+        file_digest(bdchv_defs_path),
+        file_digest(contextual_vars_path),
+        file_digest(unit_key_path),
+        _optional_digest(conversion_overrides_path),
+        _optional_digest(equivalency_overrides_path),
+        str(entity_filter),
+    )
+
+    # Rules and reference tables are only loaded if some partition needs them.
+    @cache
+    def rules() -> pd.DataFrame | None:
+        return load_cleanup_rules(cleanup_rules_path) if cleanup_rules_path is not None else None
+
+    @cache
+    def reference_tables() -> dict[str, pd.DataFrame | None]:
+        logger.info("Loading documentation files...")
+        return load_reference_tables(
+            bdchv_defs_path,
+            contextual_vars_path,
+            unit_key_path,
+            conversion_overrides_path=conversion_overrides_path,
+            equivalency_overrides_path=equivalency_overrides_path,
+        )
+
+    def clean(df: pd.DataFrame) -> pd.DataFrame:
+        if rules() is not None:
+            df = apply_cleanup_rules(df, rules())
+        return finalize_cleaned_data(df)
+
+    def merge(df: pd.DataFrame) -> pd.DataFrame:
+        return merge_data_docs(df, **reference_tables(), entity_filter=entity_filter)
+
+    # Workbooks read for their columns are kept until their partition is standardized.
+    loaded: dict[str, pd.DataFrame] = {}
+
+    def load(path: Path, key: str) -> pd.DataFrame:
+        return loaded.pop(key) if key in loaded else load_raw_workbook(path, known_sheets=known_sheets)
+
+    workbook_digests = [file_digest(path) for path in raw_files]
+    load_keys = [combine_digests("loaded", digest, *sheets) for digest in workbook_digests]
+    raw_columns: list[str] = []
+    for path, key in zip(raw_files, load_keys, strict=True):
+        columns = frames.columns(key)
+        if columns is None:
+            loaded[key] = load(path, key)
+            columns = frames.put_columns(key, list(map(str, loaded[key].columns)))
+        raw_columns.extend(c for c in columns if c not in raw_columns)
+
+    def standardize(path: Path, key: str) -> pd.DataFrame:
+        df = load(path, key)
+        missing = [c for c in raw_columns if c not in df.columns]
+        return standardize_raw_data(df.reindex(columns=raw_columns).astype(dict.fromkeys(missing, object)))
+
+    partitions: dict[str, dict[str, str]] = {}
+    for path, workbook_digest, load_key in zip(raw_files, workbook_digests, load_keys, strict=True):
+        status = PartitionStatus(name=str(path))
+
+        std_key = combine_digests("standardized", load_key, *raw_columns)
+        std_digest = _resolve_stage(
+            frames, status, "standardized", std_key, lambda path=path, key=load_key: standardize(path, key)
+        )
+        clean_key = combine_digests("cleaned", std_digest, rules_digest)
+        clean_digest = _resolve_stage(frames, status, "cleaned", clean_key, lambda key=std_key: clean(frames.load(key)))
+        merged_key = combine_digests("merged", clean_digest, reference_digest)
+        _resolve_stage(frames, status, "merged", merged_key, lambda key=clean_key: merge(frames.load(key)))
+
+        if status.rebuilt:
+            logger.info("Rebuilt %s: %s", status.name, ", ".join(status.rebuilt))
+        else:
+            logger.info("Reused cached partition %s", status.name)
+        result.partitions.append(status)
+        partitions[status.name] = {
+            "workbook": workbook_digest,
+            "loaded": load_key,
+            "standardized": std_key,
+            "cleaned": clean_key,
+            "merged": merged_key,
+        }
+
+    df = pd.concat([frames.load(entry["merged"]) for entry in partitions.values()], ignore_index=True)
+    df = df[[c for c in OUTPUT_COLUMNS if c in df.columns]].drop_duplicates()
+    frames.save(partitions)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(output_path, index=False, quoting=csv.QUOTE_ALL)
+    logger.info(
+        "Wrote %d rows to %s (%d of %d partitions rebuilt)", len(df), output_path, len(result.rebuilt), len(raw_files)
+    )
+    result.output_path = output_path
+    return result
@@ -255,6 +255,30 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
 DEFAULT_KNOWN_SHEETS = ["right_join_full", "Export_BDCHM_noFHS-noCOPDGene_p"]
 
 
+def load_raw_workbook(path: Path, known_sheets: list[str] | None = None) -> pd.DataFrame:
+    """
+    Load a single raw metadata Excel file with whitespace cleaned and columns normalized.
+
+    Args:
+        path: Path to the raw metadata Excel file.
+        known_sheets: Sheet names to look for, in priority order. Falls back to the
+            first sheet when none is present. Defaults to DEFAULT_KNOWN_SHEETS.
+
+    """
+    sheet_candidates = DEFAULT_KNOWN_SHEETS if known_sheets is None else known_sheets
+    # Try known sheet names first, fall back to first sheet
+    sheet = 0
+    xl = pd.ExcelFile(path)
+    for known in sheet_candidates:
+        if known in xl.sheet_names:
+            sheet = known
+            break
+    df = pd.read_excel(xl, sheet_name=sheet, dtype=str)
+    df = _clean_whitespace(df)
+    df = df.dropna(axis=1, how="all")
+    return _normalize_columns(df)
+
+
 def load_raw_data(raw_files: list[Path], known_sheets: list[str] | None = None) -> pd.DataFrame:
     """
     Load and combine raw metadata from multiple Excel files.
@@ -266,21 +290,7 @@ def load_raw_data(raw_files: list[Path], known_sheets: list[str] | None = None)
             DEFAULT_KNOWN_SHEETS.
 
     """
-    sheet_candidates = DEFAULT_KNOWN_SHEETS if known_sheets is None else known_sheets
-    frames = []
-    for path in raw_files:
-        # Try known sheet names first, fall back to first sheet
-        sheet = 0
-        xl = pd.ExcelFile(path)
-        for known in sheet_candidates:
-            if known in xl.sheet_names:
-                sheet = known
-                break
-        df = pd.read_excel(xl, sheet_name=sheet, dtype=str)
-        df = _clean_whitespace(df)
-        df = df.dropna(axis=1, how="all")
-        df = _normalize_columns(df)
-        frames.append(df)
+    frames = [load_raw_workbook(path, known_sheets=known_sheets) for path in raw_files]
 
     if not frames:
         return pd.DataFrame()
@@ -350,6 +360,45 @@ def finalize_cleaned_data(df: pd.DataFrame) -> pd.DataFrame:
 
 # --- Step 4: Merge data and documentation ---
 
+# Columns of the curated CSV, in output order.
+OUTPUT_COLUMNS = [
+    "row_good",
+    "cohort",
+    "bdchm_entity",
+    "bdchm_label",
+    "bdchm_varname",
+    "has_onto",
+    "onto_id",
+    "bdchm_unit",
+    "phv",
+    "var_desc",
+    "var_units",
+    "has_pht",
+    "pht",
+    "participantidphv",
+    "has_visit",
+    "associatedvisit",
+    "has_visit_expr",
+    "associatedvisit_expr",
+    "xassociatedvisit",
+    "var_desc_exam",
+    "has_age",
+    "ageinyearsphv",
+    "contextvars_notes",
+    "unit_match",
+    "unit_convert",
+    "unit_expr",
+    "conversion_rule",
+    "unit_casestmt",
+    "unit_casestmt_custom",
+    "source_unit",
+    "target_unit",
+    # Internal lookup state surfaced so apply_curator_overrides can
+    # recompute quality flags without re-loading reference data.
+    "equivalent_units",
+    "both_valid_ucums",
+]
+
 
 def merge_data_docs(
     df: pd.DataFrame,
@@ -421,48 +470,11 @@ def merge_data_docs(
     df = compute_quality_flags(df, has_pht_merge=has_pht_merge)
 
     # ----- Output: keep only relevant columns -----
-    output_cols = [
-        "row_good",
-        "cohort",
-        "bdchm_entity",
-        "bdchm_label",
-        "bdchm_varname",
-        "has_onto",
-        "onto_id",
-        "bdchm_unit",
-        "phv",
-        "var_desc",
-        "var_units",
-        "has_pht",
-        "pht",
-        "participantidphv",
-        "has_visit",
-        "associatedvisit",
-        "has_visit_expr",
-        "associatedvisit_expr",
-        "xassociatedvisit",
-        "var_desc_exam",
-        "has_age",
-        "ageinyearsphv",
-        "contextvars_notes",
-        "unit_match",
-        "unit_convert",
-        "unit_expr",
-        "conversion_rule",
-        "unit_casestmt",
-        "unit_casestmt_custom",
-        "source_unit",
-        "target_unit",
-        # Internal lookup state surfaced so apply_curator_overrides can
-        # recompute quality flags without re-loading reference data.
-        "equivalent_units",
-        "both_valid_ucums",
-    ]
     for col in ("equivalent_units", "both_valid_ucums"):
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
 
-    output_cols = [c for c in output_cols if c in df.columns]
+    output_cols = [c for c in OUTPUT_COLUMNS if c in df.columns]
     df = df[output_cols]
     df = df.drop_duplicates()
 
@@ -581,6 +593,35 @@ def compute_quality_flags(df: pd.DataFrame, has_pht_merge: pd.Series | None = No
 # --- Full pipeline ---
 
 
+def load_reference_tables(
+    bdchv_defs_path: Path,
+    contextual_vars_path: Path,
+    unit_key_path: Path,
+    conversion_overrides_path: Path | None = DEFAULT_CONVERSION_OVERRIDES,
+    equivalency_overrides_path: Path | None = DEFAULT_EQUIVALENCY_OVERRIDES,
+) -> dict[str, pd.DataFrame | None]:
+    """
+    Load every reference table merge_data_docs joins against.
+
+    Returns:
+        Keyword arguments for merge_data_docs (bdchv_defs, conversions, equivalencies,
+        contextual_vars, conversion_overrides, equivalency_overrides).
+
+    """
+    return {
+        "bdchv_defs": load_bdchv_defs(bdchv_defs_path),
+        "conversions": load_unit_conversions(unit_key_path),
+        "equivalencies": load_unit_equivalencies(unit_key_path),
+        "contextual_vars": load_contextual_vars(contextual_vars_path),
+        "conversion_overrides": (
+            load_conversion_overrides(conversion_overrides_path) if conversion_overrides_path else None
+        ),
+        "equivalency_overrides": (
+            load_equivalency_overrides(equivalency_overrides_path) if equivalency_overrides_path else None
+        ),
+    }
+
+
 def prepare_metadata(
     raw_files: list[Path],
     bdchv_defs_path: Path,
@@ -619,14 +660,12 @@ def prepare_metadata(
 
     """
     logger.info("Loading documentation files...")
-    bdchv_defs = load_bdchv_defs(bdchv_defs_path)
-    contextual_vars = load_contextual_vars(contextual_vars_path)
-    conversions = load_unit_conversions(unit_key_path)
-    equivalencies = load_unit_equivalencies(unit_key_path)
-
-    conversion_overrides = load_conversion_overrides(conversion_overrides_path) if conversion_overrides_path else None
-    equivalency_overrides = (
-        load_equivalency_overrides(equivalency_overrides_path) if equivalency_overrides_path else None
+    reference_tables = load_reference_tables(
+        bdchv_defs_path,
+        contextual_vars_path,
+        unit_key_path,
+        conversion_overrides_path=conversion_overrides_path,
+        equivalency_overrides_path=equivalency_overrides_path,
     )
 
     logger.info("Loading raw data from %d file(s)...", len(raw_files))
@@ -647,16 +686,7 @@ def prepare_metadata(
     df = finalize_cleaned_data(df)
 
     logger.info("Merging with documentation...")
-    df = merge_data_docs(
-        df,
-        bdchv_defs,
-        conversions,
-        equivalencies,
-        contextual_vars,
-        conversion_overrides=conversion_overrides,
-        equivalency_overrides=equivalency_overrides,
-        entity_filter=entity_filter,
-    )
+    df = merge_data_docs(df, **reference_tables, entity_filter=entity_filter)
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
     df.to_csv(output_path, index=False, quoting=csv.QUOTE_ALL)
@@ -0,0 +1,215 @@
+"""
+Build TransformationSpecification dicts directly from metadata records.
+
+The Jinja2 templates render one YAML fragment per metadata row, which
+``linkml-map`` (and ``list_entities``) then parse back file by file. The
+builders here produce the same class derivations as Python objects, so an
+entity's whole spec can be assembled, validated once, and written as a single
+merged YAML or JSON file:
+
+    class_derivations:
+      - MeasurementObservation: {populated_from: ..., slot_derivations: ...}
+      - MeasurementObservation: ...
+
+Each builder mirrors its template in ``templates/`` (each template names its
+builder): a change to one must be made to the other, and
+``tests/unit/test_spec_builders.py`` renders both for every sample row to
+check they agree. Interpolated values are always emitted as strings, where the
+templates leave unquoted scalars to YAML's type resolution.
+"""
+
+import copy
+import json
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from dm_bip.trans_spec_gen.generate_trans_specs import (
+    ENTITY_REGISTRY,
+    _cohorts_for,
+    _get_spec,
+    _group_records,
+    _write_if_changed,
+    load_metadata,
+)
+
+SPEC_FORMATS = ("yaml", "json")
+
+
+def _slot_ref(value: Any) -> str:
+    """Return a source slot as an expression reference, e.g. ``{phv00000103}``."""
+    return f"{{{value}}}"
+
+
+def _quantity_slots(record: Mapping[str, Any]) -> dict[str, Any]:
+    """Slot derivations for the nested Quantity, following the unit_* flags in precedence order."""
+    unit = {"value": str(record.get("bdchm_unit")), "range": "string"}
+    if record.get("unit_match") == 1:
+        return {"value_decimal": {"populated_from": str(record["phv"])}, "unit": {"value": unit["value"]}}
+    if record.get("unit_convert") == 1:
+        conversion = {"source_unit": str(record.get("source_unit")), "target_unit": str(record.get("target_unit"))}
+        return {"value_decimal": {"populated_from": str(record["phv"]), "unit_conversion": conversion}, "unit": unit}
+    if record.get("unit_expr") == 1:
+        return {"value_decimal": {"expr": f"{_slot_ref(record['phv'])} {record.get('conversion_rule')}"}, "unit": unit}
+    if record.get("unit_casestmt") == 1:
+        return {"value_decimal": {"expr": str(record.get("unit_casestmt_custom"))}, "unit": unit}
+    return {"value_decimal": None}
+
+
+def measobs_derivation(record: Mapping[str, Any]) -> dict[str, Any]:
+    """Return the MeasurementObservation class derivation that ``yaml_measobs.j2`` renders for a record."""
+    slots: dict[str, Any] = {"associated_participant": {"populated_from": str(record["participantidphv"])}}
+    if record.get("has_visit") == 1:
+        slots["associated_visit"] = {"value": str(record["associatedvisit"])}
+    elif record.get("has_visit_expr") == 1:
+        slots["associated_visit"] = {
+            "expr": f'uuid5("https://w3id.org/bdchm/Visit", str({_slot_ref(record["participantidphv"])}) + ":" + '
+            f"{record['associatedvisit_expr']})"
+        }
+    if record.get("has_age") == 1:
+        slots["age_at_observation"] = {"expr": f"{_slot_ref(record['ageinyearsphv'])} * 365"}
+    slots["observation_type"] = {"value": str(record["onto_id"])}
+    quantity = {"populated_from": str(record["pht"]), "slot_derivations": _quantity_slots(record)}
+    slots["value_quantity"] = {"object_derivations": [{"class_derivations": {"Quantity": quantity}}]}
+    return {"MeasurementObservation": {"populated_from": str(record["pht"]), "slot_derivations": slots}}
+
+
+def _value_mappings(raw: Any) -> dict[str, str] | None:
+    """Parse ``code=ENUM;code=ENUM`` pairs; pairs without ``=`` are skipped."""
+    mappings = {}
+    for pair in str(raw).split(";"):
+        if "=" in pair:
+            code, enum = pair.split("=", 1)
+            mappings[code] = enum.strip()
+    return mappings or None
+
+
+def condition_derivation(record: Mapping[str, Any]) -> dict[str, Any]:
+    """Return the Condition class derivation that ``yaml_condition.j2`` renders for a record."""
+    participant = _slot_ref(record["participantidphv"])
+    cohort = str(record["cohort"]).upper()
+    status: dict[str, Any] = {"populated_from": str(record["phv"])}
+    if record.get("value_mappings"):
+        status["value_mappings"] = _value_mappings(record["value_mappings"])
+    slots: dict[str, Any] = {
+        "associated_participant": {
+            "expr": f'uuid5("https://w3id.org/bdchm/Participant", str({participant}) + ":{cohort}")'
+        },
+        "associated_visit": {
+            "expr": f'uuid5("https://w3id.org/bdchm/Visit", str({participant}) + ":{record["associatedvisit"]}")'
+        },
+        "condition_concept": {"value": str(record["onto_id"]), "range": "string"},
+        "condition_status": status,
+        "condition_provenance": {"value": str(record["condition_provenance"]), "range": "string"},
+        "relationship_to_participant": {
+            "value": str(record.get("relationship_to_participant") or "ONESELF"),
+            "range": "string",
+        },
+    }
+    if record.get("associated_evidence"):
+        slots["associated_evidence"] = {"value": str(record["associated_evidence"]), "range": "string"}
+    return {"Condition": {"populated_from": str(record["pht"]), "slot_derivations": slots}}
+
+
+SPEC_BUILDERS: dict[str, Callable[[Mapping[str, Any]], dict[str, Any]]] = {
+    "MeasurementObservation": measobs_derivation,
+    "Condition": condition_derivation,
+}
+
+
+def build_entity_spec(entity: str, records: list[Mapping[str, Any]]) -> dict[str, Any]:
+    """
+    Build one merged TransformationSpecification dict for an entity.
+
+    Args:
+        entity: A registered entity name (see ``SPEC_BUILDERS``).
+        records: Metadata records, one class derivation each, in output order.
+
+    Returns:
+        ``{"class_derivations": [{entity: body}, ...]}`` — the shape
+        ``linkml_map.utils.spec_merge.merge_spec_dicts`` produces.
+
+    """
+    builder = SPEC_BUILDERS.get(entity)
+    if builder is None:
+        raise ValueError(f"No spec builder for {entity!r}; known: {sorted(SPEC_BUILDERS)}")
+    return {"class_derivations": [builder(record) for record in records]}
+
+
+def validate_entity_spec(spec: dict[str, Any]) -> None:
+    """Check a built spec against the linkml-map transformer model; raise ValueError listing any errors."""
+    from linkml_map.validator import validate_spec
+
+    # validate_spec normalizes nested derivations in place; keep the caller's spec in compact form.
+    errors = [message for message in validate_spec(copy.deepcopy(spec)) if message.severity == "error"]
+    if errors:
+        details = "\n".join(f"  {message}" for message in errors)
+        raise ValueError(f"Built spec failed validation:\n{details}")
+
+
+def _dump(spec: dict[str, Any], fmt: str) -> str:
+    if fmt == "json":
+        return json.dumps(spec, indent=2) + "\n"
+    return yaml.safe_dump(spec, sort_keys=False, allow_unicode=True, width=float("inf"))
+
+
+def generate_merged_specs(
+    input_csv: Path,
+    output_dir: Path,
+    entities: list[str] | None = None,
+    cohorts: list[str] | None = None,
+    fmt: str = "yaml",
+    quality: str = "good",
+    validate: bool = True,
+) -> dict[str, Path]:
+    """
+    Write one merged, validated trans-spec per entity, built without rendering templates.
+
+    Class derivations appear in the order ``linkml-map`` would merge the
+    per-variable files from ``generate_batch``: by cohort, then variable name,
+    then CSV row.
+
+    Args:
+        input_csv: Path to the metadata CSV.
+        output_dir: Directory for the ``<Entity>.yaml`` / ``<Entity>.json`` files.
+        entities: Entities to build. None builds every registered entity present in the CSV.
+        cohorts: Cohorts to include. None includes every cohort present for each entity.
+        fmt: "yaml" or "json".
+        quality: "good" (complete rows only, the default), "bad", or "all".
+        validate: Check each spec against the linkml-map transformer model before writing.
+
+    Returns:
+        Written spec paths keyed by entity. Entities with no matching rows are omitted.
+
+    """
+    if fmt not in SPEC_FORMATS:
+        raise ValueError(f"Unknown spec format {fmt!r}; choose from {SPEC_FORMATS}")
+    if quality not in ("good", "bad", "all"):
+        raise ValueError(f"Unknown quality {quality!r}; choose from 'good', 'bad', 'all'")
+    for entity in entities or ():
+        _get_spec(entity)
+
+    df = load_metadata(input_csv)
+    if entities is None:
+        entities = [entity for entity in ENTITY_REGISTRY if (df["bdchm_entity"] == entity).any()]
+
+    written = {}
+    for entity in entities:
+        records = [
+            record
+            for cohort in (cohorts if cohorts is not None else _cohorts_for(df, entity))
+            for group_quality, _, group in _group_records(df, entity, cohort)
+            if quality in ("all", group_quality)
+            for record in group
+        ]
+        if not records:
+            continue
+        spec = build_entity_spec(entity, records)
+        if validate:
+            validate_entity_spec(spec)
+        path = output_dir / f"{entity}.{fmt}"
+        _write_if_changed(path, _dump(spec, fmt))
+        written[entity] = path
+    return written
@@ -0,0 +1 @@
+"""Data validation against the generated LinkML schema, run in-process instead of one `linkml validate` per file."""
@@ -0,0 +1,292 @@
+"""
+Vectorized type-conformance checks compiled from a class's slot ranges.
+
+The schemas ``schemauto generalize-tsvs`` produces mostly assert one range per
+column (integer, float, string, date, an enum), so validating a table row by
+row through JSON Schema spends nearly all its time building and walking one
+object per row. :func:`column_validate` instead compiles the target class into
+one :class:`ColumnCheck` per slot and runs each check over a whole pandas
+column at a time — a numeric parse, a regex, or a set-membership test — over
+chunks of the file.
+
+The checks reproduce what ``linkml validate`` reports for delimited files,
+error for error:
+
+- Empty cells are treated as absent (the TSV loader drops them), so they only
+  matter for required and identifier slots (``required``).
+- Numeric ranges accept what the loader coerces: a value containing a digit
+  that ``int()`` or ``float()`` parses (``type``); integer slots also need an
+  integral value. ``minimum_value``/``maximum_value`` apply to parsed numbers
+  (``minimum``/``maximum``).
+- Boolean values are never coerced by the loader, so any non-empty boolean
+  cell fails (``type``), as it does under ``linkml validate``.
+- ``date`` and ``datetime`` values must be RFC 3339 dates/date-times
+  (``format``); enum values must be permissible values (``enum``); slot
+  patterns must match somewhere in string values (``pattern``).
+- Non-empty cells in columns that are not slots of the class are rejected
+  (``additionalProperties``).
+
+Ranges beyond these (class ranges, multivalued slots, other types) are not
+checked here; use the row validator for schemas that rely on them. Errors are
+reported through the same :class:`~dm_bip.validation.streaming.StreamReport`
+as the row validator, and error caps are applied after each chunk.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from dm_bip.validation.runner import SchemaValidator
+from dm_bip.validation.streaming import StreamOptions, StreamReport
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_DELIMITERS = {".tsv": "\t", ".csv": ","}
+_KINDS = {"integer": "integer", "float": "number", "double": "number", "decimal": "number", "boolean": "boolean"}
+_FORMATS = {"date": "date", "datetime": "date-time"}
+_DATE = r"[0-9]{4}-[0-9]{2}-[0-9]{2}"
+_DATETIME = (
+    rf"{_DATE}[Tt](?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9](?:\.[0-9]+)?(?:[Zz]|[+-](?:[01][0-9]|2[0-3]):[0-5][0-9])"
+)
+
+
+@dataclass(frozen=True)
+class ColumnCheck:
+    """What one column's non-empty values must satisfy."""
+
+    column: str
+    kind: str = "string"  # "integer", "number", "boolean", "date", "date-time" or "string"
+    required: bool = False
+    enum: tuple[str, ...] | None = None  # permissible values, in schema order
+    pattern: str | None = None
+    minimum: float | None = None
+    maximum: float | None = None
+
+
+def compile_class(schema_view, target_class: str) -> dict[str, ColumnCheck]:
+    """
+    Compile the induced slots of target_class into column checks.
+
+    Returns:
+        Checks keyed by column name (the slot's alias, or its name).
+
+    """
+    all_types = schema_view.all_types()
+    all_enums = schema_view.all_enums()
+    checks = {}
+    for slot in schema_view.class_induced_slots(target_class):
+        column = slot.alias or slot.name
+        kind, enum = "string", None
+        if slot.range in all_enums:
+            enum = tuple(schema_view.get_enum(slot.range).permissible_values)
+        elif slot.range in all_types:
+            for ancestor in schema_view.type_ancestors(slot.range):
+                if ancestor in _KINDS or ancestor in _FORMATS:
+                    kind = _KINDS.get(ancestor) or _FORMATS[ancestor]
+                    break
+        checks[column] = ColumnCheck(
+            column=column,
+            kind=kind,
+            required=bool(slot.required or slot.identifier),
+            enum=enum,
+            pattern=slot.pattern,
+            minimum=_number(slot.minimum_value),
+            maximum=_number(slot.maximum_value),
+        )
+    return checks
+
+
+def _number(value) -> float | None:
+    return None if value is None else float(value)
+
+
+def _parse_numbers(values):
+    """Parse values as the TSV loader would coerce them; NaN where a value stays a string."""
+    import numpy as np
+    import pandas as pd
+
+    has_digit = values.str.contains("[0-9]", regex=True)
+    numbers = pd.to_numeric(values.where(has_digit), errors="coerce")
+    retry = has_digit & numbers.isna()
+    if retry.any():
+        # Forms pandas rejects but Python accepts, e.g. "1_000".
+        parsed = {}
+        for value in values[retry].unique():
+            try:
+                parsed[value] = float(value)
+            except (ValueError, OverflowError):
+                parsed[value] = np.nan
+        numbers[retry] = values[retry].map(parsed)
+    return numbers
+
+
+def _valid_dates(values):
+    """Return a mask of values whose leading YYYY-MM-DD is a real calendar date."""
+    import pandas as pd
+
+    return pd.to_datetime(values.str[:10], format="%Y-%m-%d", errors="coerce").notna()
+
+
+def _literal(value: str, kind: str):
+    """Return value as the loader would hand it to JSON Schema (for error messages)."""
+    if kind in ("integer", "number") and any(c.isdigit() for c in value):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return value
+    return value
+
+
+def _unique_checks(check: ColumnCheck, uniques):
+    """Yield (error type, failing mask over uniques, describe) for each check on a column's distinct values."""
+    # Optional slots are nullable in the generated JSON Schema, which shows up in its type errors.
+    types = f"'{check.kind}'" if check.required else f"'{check.kind}', 'null'"
+    if check.kind in ("integer", "number"):
+        numbers = _parse_numbers(uniques)
+        ok = numbers.notna() & (numbers % 1 == 0) if check.kind == "integer" else numbers.notna()
+        yield "type", ~ok, lambda v: f"{v!r} is not of type {types}"
+        if check.minimum is not None:
+            yield (
+                "minimum",
+                ok & (numbers < check.minimum),
+                lambda v: f"{v} is less than the minimum of {_fmt(check.minimum)}",
+            )
+        if check.maximum is not None:
+            yield (
+                "maximum",
+                ok & (numbers > check.maximum),
+                lambda v: f"{v} is greater than the maximum of {_fmt(check.maximum)}",
+            )
+        return
+    if check.kind == "boolean":
+        yield "type", uniques == uniques, lambda v: f"{v!r} is not of type {types}"
+        return
+    if check.kind in ("date", "date-time"):
+        shape = uniques.str.fullmatch(_DATE if check.kind == "date" else _DATETIME)
+        ok = shape & _valid_dates(uniques.where(shape, ""))
+        yield "format", ~ok, lambda v: f"{v!r} is not a '{check.kind}'"
+    if check.enum is not None:
+        yield "enum", ~uniques.isin(check.enum), lambda v: f"{v!r} is not one of {list(check.enum)!r}"
+    if check.pattern is not None:
+        matches = uniques.str.contains(check.pattern, regex=True)
+        yield "pattern", ~matches, lambda v: f"{v!r} does not match {check.pattern!r}"
+
+
+def check_column(check: ColumnCheck, values) -> list[tuple[str, "np.ndarray", str]]:
+    """
+    Run one column's checks over a chunk of its values.
+
+    Each check runs once per distinct non-empty value, and its result is
+    broadcast back to the rows holding that value.
+
+    Args:
+        check: The compiled check.
+        values: A pandas Series of strings ("" for empty cells).
+
+    Returns:
+        (error type, boolean mask of failing rows, example message) for each failing check.
+
+    """
+    import pandas as pd
+
+    failures = []
+    present = (values != "").to_numpy()
+    if check.required and not present.all():
+        failures.append(("required", ~present, f"'{check.column}' is a required property in /"))
+
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object)
+    empty = uniques == ""
+    for error_type, unique_mask, describe in _unique_checks(check, uniques):
+        unique_mask = (unique_mask & ~empty).to_numpy()
+        if unique_mask.any():
+            mask = unique_mask[codes]
+            example = _literal(values.iloc[mask.argmax()], check.kind)
+            failures.append((error_type, mask, f"{describe(example)} in /{check.column}"))
+    return failures
+
+
+def _fmt(bound: float) -> str:
+    return str(int(bound)) if bound.is_integer() else str(bound)
+
+
+@lru_cache(maxsize=None)
+def _class_checks(validator: SchemaValidator, target_class: str) -> dict[str, ColumnCheck]:
+    return compile_class(validator.schema_view, target_class)
+
+
+def column_validate(
+    validator: SchemaValidator,
+    input_file: Path,
+    target_class: str,
+    options: StreamOptions | None = None,
+) -> StreamReport:
+    """
+    Check a delimited file's columns against target_class's slot ranges, chunk by chunk.
+
+    Files that are not TSV/CSV are handed to the row validator.
+
+    Args:
+        validator: The loaded schema.
+        input_file: Data file to check.
+        target_class: Schema class the file's rows should conform to.
+        options: Chunk size, error caps and per-group row sample size (row sampling is ignored).
+
+    Returns:
+        The aggregate report, in the same form as :func:`~dm_bip.validation.streaming.stream_validate`.
+
+    """
+    import pandas as pd
+
+    options = options or StreamOptions()
+    delimiter = _DELIMITERS.get(Path(input_file).suffix.lower())
+    if delimiter is None:
+        from dm_bip.validation.streaming import stream_validate
+
+        return stream_validate(validator, input_file, target_class, options)
+
+    checks = _class_checks(validator, target_class)
+    report = StreamReport(input_file=Path(input_file), target_class=target_class)
+    chunks = pd.read_csv(
+        input_file,
+        sep=delimiter,
+        dtype=str,
+        keep_default_na=False,
+        na_filter=False,
+        skipinitialspace=True,
+        chunksize=options.chunk_size,
+    )
+    with chunks:
+        for chunk in chunks:
+            offset = report.rows_checked
+            report.rows_checked += len(chunk)
+            report.rows_read = report.rows_checked
+            touched = []
+            for column in chunk.columns:
+                values = chunk[column].fillna("").reset_index(drop=True)
+                check = checks.get(column)
+                if check is None:
+                    unexpected = (values != "").to_numpy()
+                    message = f"Additional properties are not allowed ('{column}' was unexpected) in /"
+                    results = [("additionalProperties", unexpected, message)] if unexpected.any() else []
+                else:
+                    results = check_column(check, values)
+                for error_type, mask, message in results:
+                    rows = (mask.nonzero()[0][: options.sample_rows] + offset + 1).tolist()
+                    report.add(column, error_type, "ERROR", message, rows, int(mask.sum()), options.sample_rows)
+                    touched.append(column)
+            for column in [column for column in checks if column not in chunk.columns]:
+                if checks[column].required and len(chunk):
+                    rows = list(range(offset + 1, offset + 1 + min(len(chunk), options.sample_rows)))
+                    message = f"'{column}' is a required property in /"
+                    report.add(column, "required", "ERROR", message, rows, len(chunk), options.sample_rows)
+                    touched.append(column)
+            where = f"by row {report.rows_checked}"
+            if any(report.reached_cap(options, column, where) for column in touched):
+                return report
+    return report
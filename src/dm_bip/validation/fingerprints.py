@@ -0,0 +1,210 @@
+"""
+Per-class schema fingerprints and validation stamps.
+
+Regenerating the source schema rewrites ``SCHEMA_FILE`` even when most (or
+all) classes come out the same, and both the Makefile's per-file rule and the
+dm-bip runner used to treat any newer schema as invalidating every file. This
+module narrows that dependency to what validating one file actually reads:
+
+- :func:`class_fingerprint` digests the induced definition of a class (its
+  slots with ranges, requiredness, patterns, bounds, ...) together with every
+  enum, type and range class it reaches. Documentation-only metadata
+  (descriptions, ``examples`` from schema-automator, ``domain_of``, ...) is
+  left out, so sharing a slot with a new class or re-profiling example values
+  does not change the fingerprint.
+- :func:`write_validation_stamps` writes one stamp per input file,
+  ``<stamp_dir>/<key>.sha256``, holding a digest of (input file content, class
+  fingerprint). A stamp is only rewritten when that digest changes, so a
+  success log that is newer than its stamp is still valid. Input digests are
+  cached by path, size and mtime, so unchanged inputs are not re-read.
+
+A stamp created for the first time gets the mtime of its newest dependency
+(input file or schema), which keeps logs from before stamps existed valid.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from dm_bip.fingerprint import combine_digests, file_digest
+from dm_bip.validation.runner import class_name_from_input, input_key
+
+STAMP_SUFFIX = ".sha256"
+DIGEST_CACHE_NAME = ".input-digests.json"
+
+# Metadata that documents a schema element without affecting what validates against it.
+_IGNORED_KEYS = frozenset(
+    {
+        "aliases",
+        "alt_descriptions",
+        "annotations",
+        "broad_mappings",
+        "close_mappings",
+        "comments",
+        "contributors",
+        "created_by",
+        "created_on",
+        "definition_uri",
+        "deprecated",
+        "description",
+        "domain_of",
+        "exact_mappings",
+        "examples",
+        "from_schema",
+        "imported_from",
+        "in_subset",
+        "keywords",
+        "last_updated_on",
+        "mappings",
+        "modified_by",
+        "narrow_mappings",
+        "notes",
+        "owner",
+        "rank",
+        "related_mappings",
+        "see_also",
+        "source",
+        "status",
+        "structured_aliases",
+        "title",
+        "todos",
+    }
+)
+
+
+def _canonical(element) -> object:
+    """Return an element as plain JSON data without documentation-only keys."""
+    from linkml_runtime.dumpers import json_dumper
+
+    def strip(value):
+        if isinstance(value, dict):
+            return {k: strip(v) for k, v in value.items() if k not in _IGNORED_KEYS and not k.startswith("@")}
+        if isinstance(value, list):
+            return [strip(v) for v in value]
+        return value
+
+    return strip(json_dumper.to_dict(element))
+
+
+def class_fingerprint(schema_view, class_name: str) -> str:
+    """
+    Return a digest of everything validating an instance of class_name depends on.
+
+    Args:
+        schema_view: A SchemaView of the schema.
+        class_name: The target class.
+
+    Returns:
+        A SHA-256 hex digest; equal digests mean the class validates identically.
+
+    """
+    all_classes, all_enums, all_types = schema_view.all_classes(), schema_view.all_enums(), schema_view.all_types()
+    parts = {"default_range": schema_view.schema.default_range}
+    pending = [class_name]
+    while pending:
+        name = pending.pop()
+        if f"class:{name}" in parts:
+            continue
+        induced = schema_view.induced_class(name)
+        parts[f"class:{name}"] = _canonical(induced)
+        for slot in induced.attributes.values():
+            ranges = [slot.range] + [expr.range for expr in (*slot.any_of, *slot.exactly_one_of)]
+            for range_name in filter(None, ranges):
+                if range_name in all_classes:
+                    pending.extend([range_name, *schema_view.class_descendants(range_name, reflexive=False)])
+                elif range_name in all_enums:
+                    parts[f"enum:{range_name}"] = _canonical(schema_view.get_enum(range_name))
+                elif range_name in all_types:
+                    for type_name in schema_view.type_ancestors(range_name):
+                        parts[f"type:{type_name}"] = _canonical(schema_view.get_type(type_name))
+    return combine_digests(json.dumps(parts, sort_keys=True, default=str))
+
+
+def class_fingerprints(schema_view, class_names: list[str] | None = None) -> dict[str, str]:
+    """Return fingerprints for class_names (default: every class in the schema)."""
+    names = list(schema_view.all_classes()) if class_names is None else class_names
+    return {name: class_fingerprint(schema_view, name) for name in names}
+
+
+def _write_if_changed(path: Path, text: str, mtime_ns: int | None) -> bool:
+    """Write text to path unless it already holds it; set mtime_ns on first creation."""
+    try:
+        if path.read_text() == text:
+            return False
+        created = False
+    except FileNotFoundError:
+        created = True
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+    if created and mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return True
+
+
+class _InputDigests:
+    """File digests cached by (path, size, mtime_ns) in a JSON file."""
+
+    def __init__(self, cache_path: Path):
+        self.cache_path = cache_path
+        try:
+            self.entries = json.loads(cache_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+        self.dirty = False
+
+    def digest(self, path: Path) -> str:
+        st = path.stat()
+        cached = self.entries.get(str(path))
+        if cached and cached[:2] == [st.st_size, st.st_mtime_ns]:
+            return cached[2]
+        digest = file_digest(path)
+        self.entries[str(path)] = [st.st_size, st.st_mtime_ns, digest]
+        self.dirty = True
+        return digest
+
+    def save(self) -> None:
+        if self.dirty:
+            _write_if_changed(self.cache_path, json.dumps(self.entries, sort_keys=True), None)
+
+
+def write_validation_stamps(
+    schema_view,
+    schema_path: Path,
+    input_files: list[Path],
+    stamp_dir: Path,
+    input_dir: Path | None = None,
+) -> dict[str, bool]:
+    """
+    Write one stamp per input file, rewriting only stamps whose (input, class) digest changed.
+
+    Args:
+        schema_view: A SchemaView of the schema at schema_path.
+        schema_path: The schema file (its mtime dates newly created stamps).
+        input_files: Data files; each validates against the class named after it.
+        stamp_dir: Directory for ``<key>.sha256`` stamps and the input digest cache.
+        input_dir: Base input directory stripped from keys (as for the validation logs).
+
+    Returns:
+        For each input key, whether its stamp was (re)written.
+
+    """
+    stamp_dir.mkdir(parents=True, exist_ok=True)
+    digests = _InputDigests(stamp_dir / DIGEST_CACHE_NAME)
+    fingerprints: dict[str, str] = {}
+    schema_mtime = Path(schema_path).stat().st_mtime_ns
+    changed = {}
+    for path in map(Path, input_files):
+        target_class = class_name_from_input(path)
+        if target_class not in fingerprints:
+            fingerprints[target_class] = (
+                class_fingerprint(schema_view, target_class)
+                if target_class in schema_view.all_classes()
+                else combine_digests("missing class", target_class)
+            )
+        stamp = combine_digests(digests.digest(path), target_class, fingerprints[target_class])
+        key = input_key(path, input_dir)
+        first_seen = max(path.stat().st_mtime_ns, schema_mtime)
+        changed[key] = _write_if_changed(stamp_dir / f"{key}{STAMP_SUFFIX}", f"{stamp}\n", first_seen)
+    digests.save()
+    return changed
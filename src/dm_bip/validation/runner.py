@@ -0,0 +1,334 @@
+"""
+Validate pipeline input files against the generated schema in one process.
+
+``pipeline.Makefile`` validates each input file with its own ``linkml validate``
+run, paying interpreter start-up and a full schema load (plus a second
+SchemaView build inside the TSV loader) per file. This runner loads the schema
+once, validates every file with the same plugin configuration as the
+``linkml validate`` CLI (closed JSON Schema validation), and can fan files out
+over a worker pool that inherits the loaded schema.
+
+It writes the layout the Makefile rules produce, so the two are
+interchangeable and the summary/sentinel logic reads either::
+
+    <output_dir>/input-files.txt
+    <output_dir>/data-validation/<key>/<key>.<timestamp>.log
+    <output_dir>/data-validation/<key>/success.log       -> <key>.<timestamp>.log   (passed)
+    <output_dir>/data-validation/<key>/success.sample.log -> <key>.<timestamp>.sample.log (passed a sampled run)
+    <output_dir>/data-validation/<key>/latest-error.log  -> <key>.<timestamp>.log   (failed)
+    <output_dir>/data-validation-errors/<key>            -> ../data-validation/<key> (failed)
+    <output_dir>/_data_validation_complete               (or _data_validation_sampled)
+    <output_dir>/validation-stamps/<key>.sha256          (see dm_bip.validation.fingerprints)
+
+where ``<key>`` is the input path relative to the input directory with ``/``
+replaced by ``__``, and the target class is the file's basename without
+extension, lowercased, with ``-`` replaced by ``_``.
+
+Like make, a file is skipped when its success log is newer than its
+dependencies — but the dependency is the file's validation stamp, which only
+changes when the file's content or its class's definition changes, rather
+than the input file and the whole schema.
+"""
+
+import os
+import time
+import traceback
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from dm_bip import trace
+
+if TYPE_CHECKING:
+    from dm_bip.validation.streaming import StreamOptions
+
+DATA_VALIDATION_DIR = "data-validation"
+DATA_VALIDATION_ERRORS_DIR = "data-validation-errors"
+VALIDATED_FILES_LIST = "input-files.txt"
+VALIDATION_STAMPS_DIR = "validation-stamps"
+VALIDATION_SENTINEL = "_data_validation_complete"
+SAMPLED_VALIDATION_SENTINEL = "_data_validation_sampled"
+# A sampled pass links success.sample.log instead of success.log, so neither a
+# later full run nor make's per-file rules mistake it for full validation.
+SUCCESS_LOG = "success.log"
+SAMPLED_SUCCESS_LOG = "success.sample.log"
+
+_NUMERIC_TYPE_NAMES = frozenset({"integer", "float", "double", "decimal"})
+
+
+def input_key(input_file: Path, input_dir: Path | None = None) -> str:
+    """Return the log key for an input file: its path under input_dir with ``/`` replaced by ``__``."""
+    name = str(input_file)
+    if input_dir is not None:
+        prefix = f"{input_dir}/"
+        if name.startswith(prefix):
+            name = name[len(prefix) :]
+    return name.replace("/", "__")
+
+
+def class_name_from_input(input_file: Path) -> str:
+    """Return the class name schema-automator assigned to an input file."""
+    return Path(input_file).stem.replace("-", "_").lower()
+
+
+@dataclass
+class FileResult:
+    """Validation outcome for one input file."""
+
+    key: str
+    input_file: Path
+    target_class: str
+    status: str  # "passed", "failed" or "up-to-date"
+    log_path: Path | None = None
+
+    @property
+    def ok(self) -> bool:
+        """True unless validation ran and failed."""
+        return self.status != "failed"
+
+
+@dataclass
+class ValidationRun:
+    """Outcome of validating a set of input files."""
+
+    output_dir: Path
+    results: list[FileResult] = field(default_factory=list)
+
+    @property
+    def failures(self) -> list[FileResult]:
+        """Files that failed validation, in input order."""
+        return [r for r in self.results if not r.ok]
+
+
+class SchemaValidator:
+    """A LinkML schema loaded once, validating any number of files against its classes."""
+
+    def __init__(self, schema_path: Path):
+        """Load the schema at schema_path and set up the validator."""
+        from linkml.validator import Validator
+        from linkml.validator.plugins import JsonschemaValidationPlugin
+        from linkml_runtime import SchemaView
+        from linkml_runtime.linkml_model import SchemaDefinition
+        from linkml_runtime.loaders import yaml_loader
+
+        self.schema_path = Path(schema_path)
+        self.schema_mtime_ns = self.schema_path.stat().st_mtime_ns
+        schema = yaml_loader.load(str(self.schema_path), SchemaDefinition)
+        schema.source_file = str(self.schema_path)
+        self.schema_view = SchemaView(schema)
+        # Same plugin configuration as the `linkml validate` CLI default.
+        self.validator = Validator(schema, validation_plugins=[JsonschemaValidationPlugin(closed=True)])
+        self._numeric_slots: dict[str, set[str]] = {}
+
+    def numeric_slots(self, target_class: str) -> set[str]:
+        """Return the columns of target_class whose range is a numeric type (what the TSV loader coerces)."""
+        if target_class not in self._numeric_slots:
+            all_types = self.schema_view.all_types()
+            numeric = set()
+            for slot in self.schema_view.class_induced_slots(target_class):
+                if slot.range in all_types and _NUMERIC_TYPE_NAMES & set(self.schema_view.type_ancestors(slot.range)):
+                    numeric.add(slot.name)
+                    if slot.alias:
+                        numeric.add(slot.alias)
+            self._numeric_slots[target_class] = numeric
+        return self._numeric_slots[target_class]
+
+    def loader(self, input_file: Path, target_class: str):
+        """Return the linkml loader ``linkml validate`` would use for input_file, reusing this schema."""
+        from linkml.validator.loaders import default_loader_for_file
+
+        loader = default_loader_for_file(str(input_file))
+        if hasattr(loader, "_numeric_slots"):
+            # The delimited loaders would otherwise build their own SchemaView to find these.
+            loader._numeric_slots = self.numeric_slots(target_class)
+        return loader
+
+    def validate_file(self, input_file: Path, target_class: str, write: Callable[[str], object]) -> bool:
+        """
+        Validate one file, writing ``linkml validate``-style report lines via write.
+
+        Returns:
+            True if no ERROR-severity results were reported.
+
+        """
+        from linkml.validator.report import Severity
+
+        loader = self.loader(input_file, target_class)
+        errors = issues = 0
+        for result in self.validator.iter_results_from_source(loader, target_class):
+            issues += 1
+            errors += result.severity == Severity.ERROR
+            write(f"[{result.severity.value}] [{loader.source}/{result.instance_index}] {result.message}\n")
+        if issues == 0:
+            write("No issues found\n")
+        return errors == 0
+
+
+# Per-process validator: built once in the parent and inherited by forked workers,
+# or built by the pool initializer under other start methods.
+_VALIDATOR: SchemaValidator | None = None
+
+
+def _get_validator(schema_path: Path) -> SchemaValidator:
+    global _VALIDATOR
+    if (
+        _VALIDATOR is None
+        or _VALIDATOR.schema_path != schema_path
+        or _VALIDATOR.schema_mtime_ns != Path(schema_path).stat().st_mtime_ns
+    ):
+        _VALIDATOR = SchemaValidator(schema_path)
+    return _VALIDATOR
+
+
+@dataclass(frozen=True)
+class _Job:
+    schema_path: Path
+    input_file: Path
+    key: str
+    target_class: str
+    files_dir: Path
+    errors_dir: Path
+    timestamp: int
+    stream: "StreamOptions | None" = None
+
+
+def _run_job(job: _Job) -> FileResult:
+    """Validate one file and publish its log with the success/failure symlinks."""
+    span_id = trace.start_span("validate file", "validation", file=str(job.input_file))
+    log_dir = job.files_dir / job.key
+    sampled = job.stream is not None and job.stream.sample is not None
+    success_link = log_dir / (SAMPLED_SUCCESS_LOG if sampled else SUCCESS_LOG)
+    failure_link = log_dir / "latest-error.log"
+    failure_dir_link = job.errors_dir / job.key
+    for link in (log_dir / SUCCESS_LOG, log_dir / SAMPLED_SUCCESS_LOG, failure_link, failure_dir_link):
+        link.unlink(missing_ok=True)
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    log_name = f"{job.key}.{job.timestamp}{'.sample' if sampled else ''}.log"
+    log_path = log_dir / log_name
+    with open(log_path, "w") as log:
+        try:
+            validator = _get_validator(job.schema_path)
+            if job.stream is None:
+                ok = validator.validate_file(job.input_file, job.target_class, log.write)
+            else:
+                if job.stream.columns:
+                    from dm_bip.validation.columns import column_validate
+
+                    report = column_validate(validator, job.input_file, job.target_class, job.stream)
+                else:
+                    from dm_bip.validation.streaming import stream_validate
+
+                    report = stream_validate(validator, job.input_file, job.target_class, job.stream)
+                log.write(report.format())
+                ok = report.ok
+        except Exception:
+            log.write(traceback.format_exc())
+            ok = False
+
+    if ok:
+        success_link.symlink_to(log_name)
+    else:
+        failure_link.symlink_to(log_name)
+        failure_dir_link.symlink_to(os.path.relpath(log_dir, job.errors_dir), target_is_directory=True)
+    trace.end_span(span_id, "ok" if ok else "error")
+    return FileResult(job.key, job.input_file, job.target_class, "passed" if ok else "failed", log_path)
+
+
+def _is_up_to_date(success_log: Path, *dependencies: Path) -> bool:
+    """Apply make's rule: success_log exists and is no older than any dependency."""
+    try:
+        built = success_log.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    return all(dep.stat().st_mtime <= built for dep in dependencies)
+
+
+def validate_inputs(
+    schema_path: Path,
+    input_files: list[Path],
+    output_dir: Path,
+    input_dir: Path | None = None,
+    workers: int = 1,
+    strict: bool = False,
+    force: bool = False,
+    stream: "StreamOptions | None" = None,
+    on_result: Callable[[FileResult], None] | None = None,
+) -> ValidationRun:
+    """
+    Validate input files against their schema classes, writing the pipeline's validation-log layout.
+
+    Args:
+        schema_path: The generated LinkML schema.
+        input_files: Data files to validate (TSV/CSV, or JSON/YAML).
+        output_dir: Validation output directory (``VALIDATE_OUTPUT_DIR`` in the Makefile).
+        input_dir: Base input directory stripped from log keys (``DM_INPUT_DIR``).
+        workers: Worker processes. 1 validates in-process.
+        strict: Leave the completion sentinel unwritten if any file fails.
+        force: Revalidate files even if their content and class definition are unchanged since they passed.
+        stream: Validate in chunks and log an aggregate error summary (see
+            :mod:`dm_bip.validation.streaming`) instead of one line per error.
+        on_result: Called with each file's result as it completes.
+
+    Returns:
+        Per-file results, in input order.
+
+    """
+    files_dir = output_dir / DATA_VALIDATION_DIR
+    errors_dir = output_dir / DATA_VALIDATION_ERRORS_DIR
+    files_dir.mkdir(parents=True, exist_ok=True)
+    errors_dir.mkdir(parents=True, exist_ok=True)
+
+    keys = [input_key(path, input_dir) for path in input_files]
+    (output_dir / VALIDATED_FILES_LIST).write_text("".join(f"{key}\n" for key in keys))
+
+    from dm_bip.validation.fingerprints import STAMP_SUFFIX, write_validation_stamps
+
+    stamps_dir = output_dir / VALIDATION_STAMPS_DIR
+    validator = _get_validator(schema_path)
+    write_validation_stamps(validator.schema_view, schema_path, input_files, stamps_dir, input_dir)
+
+    timestamp = int(time.time())
+    sampled = stream is not None and stream.sample is not None
+    results: dict[str, FileResult] = {}
+    jobs = []
+    for path, key in zip(input_files, keys, strict=True):
+        target_class = class_name_from_input(path)
+        # A full pass also satisfies a sampled run; a sampled pass only satisfies another sampled run.
+        candidates = [files_dir / key / SUCCESS_LOG]
+        if sampled:
+            candidates.append(files_dir / key / SAMPLED_SUCCESS_LOG)
+        stamp = stamps_dir / f"{key}{STAMP_SUFFIX}"
+        success_log = next((log for log in candidates if _is_up_to_date(log, stamp)), None)
+        if not force and success_log is not None:
+            results[key] = FileResult(key, path, target_class, "up-to-date", success_log)
+            if on_result:
+                on_result(results[key])
+            continue
+        jobs.append(_Job(schema_path, path, key, target_class, files_dir, errors_dir, timestamp, stream))
+
+    def record(result: FileResult) -> None:
+        results[result.key] = result
+        if on_result:
+            on_result(result)
+
+    if jobs:
+        if workers <= 1 or len(jobs) == 1:
+            for job in jobs:
+                record(_run_job(job))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(jobs)), initializer=_get_validator, initargs=(schema_path,)
+            ) as pool:
+                for result in pool.map(_run_job, jobs):
+                    record(result)
+
+    run = ValidationRun(output_dir=output_dir, results=[results[key] for key in keys])
+    sentinel = output_dir / (SAMPLED_VALIDATION_SENTINEL if sampled else VALIDATION_SENTINEL)
+    if run.failures and strict:
+        sentinel.unlink(missing_ok=True)
+    else:
+        sentinel.touch()
+    return run
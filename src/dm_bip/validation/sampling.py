@@ -0,0 +1,123 @@
+"""
+Deterministic row sampling and header checks for sampled validation runs.
+
+A sample is either a rate (``"0.05"`` or ``"5%"``: each row is kept with that
+probability) or a count (``"1000"``: a uniform sample of that many rows,
+drawn by reservoir sampling). Both are driven by a ``random.Random`` seeded
+from the sample seed and the file name, so the same file and seed always
+select the same rows, while different files get independent samples.
+
+Sampling only thins the rows that go through full row validation; the header
+is always checked in full, since a column that is unexpected or missing
+affects every row, sampled or not.
+"""
+
+import csv
+import heapq
+import random
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from dm_bip.validation.runner import SchemaValidator
+
+
+@dataclass(frozen=True)
+class RowSample:
+    """Which rows of each file to validate: a rate or a count, plus a seed."""
+
+    rate: float | None = None
+    count: int | None = None
+    seed: int = 0
+
+    def __post_init__(self):
+        """Check that exactly one of rate and count is set and in range."""
+        if (self.rate is None) == (self.count is None):
+            raise ValueError("Set exactly one of rate and count")
+        if self.rate is not None and not 0 < self.rate <= 1:
+            raise ValueError(f"Sample rate must be in (0, 1], got {self.rate}")
+        if self.count is not None and self.count < 1:
+            raise ValueError(f"Sample count must be at least 1, got {self.count}")
+
+    @classmethod
+    def parse(cls, value: str, seed: int = 0) -> "RowSample":
+        """
+        Parse a sample size as written in ``DM_VALIDATE_SAMPLE``.
+
+        Args:
+            value: ``"5%"`` or ``"0.05"`` for a rate, ``"1000"`` for a row count.
+            seed: Seed for row selection.
+
+        Returns:
+            The sample specification.
+
+        """
+        value = value.strip()
+        if value.endswith("%"):
+            return cls(rate=float(value[:-1]) / 100, seed=seed)
+        if value.isdigit():
+            return cls(count=int(value), seed=seed)
+        return cls(rate=float(value), seed=seed)
+
+    def describe(self) -> str:
+        """Return a short description, e.g. ``5% of rows, seed 0``."""
+        size = f"{self.rate * 100:.4g}% of rows" if self.rate is not None else f"{self.count} rows"
+        return f"{size}, seed {self.seed}"
+
+    def select(self, rows: Iterable[tuple[int, dict]], input_file: Path) -> Iterator[tuple[int, dict]]:
+        """
+        Yield the sampled (row number, row) pairs, in file order.
+
+        Rate samples stream; count samples hold at most ``count`` rows.
+        """
+        rng = random.Random(f"{self.seed}:{Path(input_file).name}")  # noqa: S311 - reproducible, not secret
+        if self.rate is not None:
+            yield from (item for item in rows if rng.random() < self.rate)
+            return
+        # Reservoir sampling with random keys: keep the count rows with the largest keys.
+        reservoir: list[tuple[float, int, dict]] = []
+        for row_number, row in rows:
+            key = rng.random()
+            if len(reservoir) < self.count:
+                heapq.heappush(reservoir, (key, row_number, row))
+            elif key > reservoir[0][0]:
+                heapq.heapreplace(reservoir, (key, row_number, row))
+        for _, row_number, row in sorted(reservoir, key=lambda item: item[1]):
+            yield row_number, row
+
+
+def read_header(input_file: Path) -> list[str] | None:
+    """Return the column names of a TSV/CSV file, or None for other formats."""
+    delimiter = {".tsv": "\t", ".csv": ","}.get(Path(input_file).suffix.lower())
+    if delimiter is None:
+        return None
+    with open(input_file, newline="") as f:
+        return next(csv.reader(f, delimiter=delimiter, skipinitialspace=True), [])
+
+
+def header_errors(validator: SchemaValidator, input_file: Path, target_class: str) -> list[tuple[str, str, str]]:
+    """
+    Compare a delimited file's header with the target class's slots.
+
+    Returns:
+        (column, error type, message) for each unexpected column and each
+        missing required column; empty for a matching header or a non-delimited file.
+
+    """
+    header = read_header(input_file)
+    if header is None:
+        return []
+    required = {}
+    for slot in validator.schema_view.class_induced_slots(target_class):
+        required[slot.alias or slot.name] = bool(slot.required or slot.identifier)
+    errors = [
+        (column, "unexpected column", f"Column '{column}' is not a slot of {target_class}")
+        for column in header
+        if column not in required
+    ]
+    errors += [
+        (column, "missing column", f"Required column '{column}' is not in the header")
+        for column, is_required in required.items()
+        if is_required and column not in header
+    ]
+    return errors
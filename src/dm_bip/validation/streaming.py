@@ -0,0 +1,190 @@
+"""
+Stream a data file through schema validation and summarize errors instead of listing them.
+
+``linkml validate`` prints one line per error, so a column that is wrong in
+every row produces a log as long as the file and keeps validating to the last
+row. :func:`stream_validate` reads rows in fixed-size chunks, validates each
+chunk with the same plugin configuration, and folds the results into one
+:class:`ErrorGroup` per (column, error type): a count, the first few row
+numbers (1-based data rows, header not counted) and one example message. Optional caps stop validation as soon as the
+file, or any single column, has accumulated that many errors.
+
+Memory is bounded by the chunk size and the number of groups (columns × error
+types), not by the number of rows or errors.
+"""
+
+import re
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+
+from dm_bip.validation.runner import SchemaValidator
+from dm_bip.validation.sampling import RowSample, header_errors
+
+ROW_LEVEL = "<row>"
+
+_REQUIRED_MESSAGE = re.compile(r"^'(.*)' is a required property$")
+
+
+@dataclass(frozen=True)
+class StreamOptions:
+    """Chunking and early-exit settings for :func:`stream_validate`."""
+
+    chunk_size: int = 10_000
+    max_errors: int | None = None  # stop once the file has this many errors
+    max_column_errors: int | None = None  # stop once any one column has this many errors
+    sample_rows: int = 5  # row numbers kept per error group
+    sample: RowSample | None = None  # validate only these rows (plus a header check)
+    columns: bool = False  # vectorized column checks (dm_bip.validation.columns) instead of row validation
+
+
+@dataclass
+class ErrorGroup:
+    """All errors of one type in one column."""
+
+    column: str
+    error_type: str
+    severity: str
+    example: str
+    count: int = 0
+    rows: list[int] = field(default_factory=list)
+
+
+@dataclass
+class StreamReport:
+    """Aggregate validation outcome for one file."""
+
+    input_file: Path
+    target_class: str
+    rows_checked: int = 0
+    rows_read: int = 0
+    sample: RowSample | None = None
+    error_count: int = 0
+    groups: dict[tuple[str, str], ErrorGroup] = field(default_factory=dict)
+    column_counts: dict[str, int] = field(default_factory=dict)
+    stop_reason: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        """True if no ERROR-severity results were found."""
+        return not any(group.severity == "ERROR" for group in self.groups.values())
+
+    def add(self, column, error_type, severity, message, rows, count, sample_rows) -> None:
+        """Count errors against (column, error_type), keeping at most sample_rows row numbers."""
+        group = self.groups.get((column, error_type))
+        if group is None:
+            group = ErrorGroup(column, error_type, severity, message)
+            self.groups[(column, error_type)] = group
+        group.count += count
+        group.rows.extend(rows[: max(sample_rows - len(group.rows), 0)])
+        self.error_count += count
+        self.column_counts[column] = self.column_counts.get(column, 0) + count
+
+    def reached_cap(self, options: StreamOptions, column: str, where: str) -> bool:
+        """Return True (and set the stop reason) if column or the file has reached its error cap."""
+        if options.max_column_errors is not None and self.column_counts.get(column, 0) >= options.max_column_errors:
+            self.stop_reason = f"column {column} reached {options.max_column_errors} error(s) {where}"
+        elif options.max_errors is not None and self.error_count >= options.max_errors:
+            self.stop_reason = f"file reached {options.max_errors} error(s) {where}"
+        return self.stop_reason is not None
+
+    def format(self) -> str:
+        """Render the report as log text: one line per error group, most frequent first."""
+        sampled = ""
+        if self.sample is not None:
+            sampled = f" (sampled {self.rows_checked} of {self.rows_read} row(s): {self.sample.describe()})"
+        if not self.groups:
+            return f"No issues found{sampled}\n"
+        lines = [
+            f"{self.input_file}: {self.error_count} issue(s) in {self.rows_checked} row(s) checked "
+            f"against {self.target_class}{sampled}"
+        ]
+        for group in sorted(self.groups.values(), key=lambda g: (-g.count, g.column, g.error_type)):
+            where = "header"
+            if group.rows:
+                more = ", ..." if group.count > len(group.rows) else ""
+                where = f"rows {', '.join(map(str, group.rows))}{more}"
+            lines.append(
+                f"[{group.severity}] {group.column}: {group.error_type} x{group.count} ({where}) e.g. {group.example}"
+            )
+        if self.stop_reason:
+            lines.append(f"Stopped early: {self.stop_reason}")
+        return "\n".join(lines) + "\n"
+
+
+def _classify(result) -> tuple[list[str], str]:
+    """Return the columns a validation result concerns and its error type."""
+    error = result.source
+    error_type = getattr(error, "validator", None)
+    if error_type is None:
+        return [ROW_LEVEL], result.type
+    if error_type == "additionalProperties" and isinstance(error.instance, dict):
+        allowed = error.schema.get("properties", {})
+        columns = [name for name in error.instance if name not in allowed]
+        return columns or [ROW_LEVEL], error_type
+    if error_type == "required":
+        match = _REQUIRED_MESSAGE.match(error.message)
+        return [match.group(1) if match else ROW_LEVEL], error_type
+    path = list(error.absolute_path)
+    return [str(path[0]) if path else ROW_LEVEL], error_type
+
+
+def _record(report: StreamReport, options: StreamOptions, column, error_type, severity, message, row) -> bool:
+    """Add one error to report; return True if it reaches a cap (and set the stop reason)."""
+    report.add(column, error_type, severity, message, [] if row is None else [row], 1, options.sample_rows)
+    return report.reached_cap(options, column, "in the header" if row is None else f"at row {row}")
+
+
+def stream_validate(
+    validator: SchemaValidator,
+    input_file: Path,
+    target_class: str,
+    options: StreamOptions | None = None,
+) -> StreamReport:
+    """
+    Validate input_file chunk by chunk, aggregating errors by column and type.
+
+    With ``options.sample`` set, only the sampled rows are validated, and the
+    file's header is checked against the class's slots first.
+
+    Args:
+        validator: The loaded schema.
+        input_file: Data file to validate (TSV/CSV, or JSON/YAML).
+        target_class: Schema class every row should conform to.
+        options: Chunk size, error caps, row sampling and per-group row sample size.
+
+    Returns:
+        The aggregate report. Rows after an early stop are not counted in ``rows_checked``.
+
+    """
+    from linkml.validator.loaders.passthrough_loader import PassthroughLoader
+
+    options = options or StreamOptions()
+    report = StreamReport(input_file=Path(input_file), target_class=target_class, sample=options.sample)
+
+    if options.sample is not None:
+        for column, error_type, message in header_errors(validator, input_file, target_class):
+            if _record(report, options, column, error_type, "ERROR", message, None):
+                return report
+
+    def numbered_rows():
+        for number, row in enumerate(validator.loader(input_file, target_class).iter_instances(), 1):
+            report.rows_read = number
+            yield number, row
+
+    rows = numbered_rows()
+    if options.sample is not None:
+        rows = options.sample.select(rows, input_file)
+
+    while chunk := list(islice(rows, options.chunk_size)):
+        checked = report.rows_checked
+        report.rows_checked += len(chunk)
+        instances = (row for _, row in chunk)
+        for result in validator.validator.iter_results_from_source(PassthroughLoader(instances), target_class):
+            row = chunk[result.instance_index][0]
+            columns, error_type = _classify(result)
+            for column in columns:
+                if _record(report, options, column, error_type, result.severity.value, result.message, row):
+                    report.rows_checked = checked + result.instance_index + 1
+                    return report
+    return report
@@ -76,6 +76,8 @@ def _run_recipe(tmp: Path, stub_rc: int, strict: str) -> subprocess.CompletedPro
             f"DM_MAP_STRICT={strict}",
             "DM_MAP_OUTPUT_TYPE=tsv",
             "DM_MAP_CHUNK_SIZE=10000",
+            "DM_MAP_PRUNE_INPUTS=false",
+            "DM_MAP_STREAM=false",
             # Treat the prereqs as up-to-date so make never tries to rebuild them,
             # isolating the recipe under test.
             "-o",
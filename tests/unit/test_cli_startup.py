@@ -0,0 +1,40 @@
+"""Import-time regression tests: `dm-bip --version` / `--help` must not load heavy dependencies."""
+
+# ruff: noqa: S603
+
+import subprocess
+import sys
+
+import pytest
+
+# Loaded only once a command that needs them runs.
+HEAVY_MODULES = {"httpx", "pandas", "numpy", "jinja2", "yaml", "linkml_map", "linkml_runtime", "openpyxl"}
+
+# Cumulative import time allowed for dm_bip.cli, in microseconds. Generous enough
+# for slow CI runners; eagerly importing httpx or pandas alone blows well past it.
+IMPORT_BUDGET_US = 400_000
+
+
+def _importtime(args: list[str]) -> dict[str, int]:
+    """Run the CLI in a fresh interpreter under -X importtime; return cumulative microseconds per module."""
+    code = f"from dm_bip.cli import app; app({args!r})"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=False, timeout=60
+    )
+    assert proc.returncode == 0, proc.stderr
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+@pytest.mark.parametrize("args", [["--version"], ["--help"]])
+def test_startup_skips_heavy_imports(args):
+    """Top-level options load neither subcommand dependencies nor the Seven Bridges HTTP client."""
+    timings = _importtime(args)
+    assert "dm_bip.cli" in timings
+    assert not HEAVY_MODULES & {name.split(".")[0] for name in timings}
+    assert timings["dm_bip.cli"] < IMPORT_BUDGET_US
@@ -2,12 +2,24 @@
 
 from pathlib import Path
 
+import pandas as pd
 import pytest
 import yaml
-
-from dm_bip.trans_spec_gen.generate_trans_specs import _safe_output_path, generate_yaml
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.trans_spec_gen.generate_trans_specs import (
+    ENTITY_REGISTRY,
+    TEMPLATES_DIR,
+    _get_template,
+    _safe_output_path,
+    generate_batch,
+    generate_yaml,
+    load_metadata,
+)
 
 SAMPLE_CSV = Path(__file__).parents[1] / "input" / "make_yaml" / "shortdata_sample.csv"
+CONDITION_CSV = Path(__file__).parents[1] / "input" / "make_yaml" / "condition_sample.csv"
 
 
 def _run(tmp_path, cohort="aric"):
@@ -53,6 +65,15 @@ class TestFileOutput:
         """Returns empty list when cohort has no matching rows."""
         assert _run(tmp_path, cohort="nonexistent") == []
 
+    def test_reports_changed_files(self, tmp_path):
+        """Every file is changed on the first run; a rerun changes only the file edited in between."""
+        first = _run(tmp_path)
+        assert first.changed == list(first)
+        edited = tmp_path / "aric" / "good" / "bp_systolic.yaml"
+        edited.write_text("stale\n")
+        second = _run(tmp_path)
+        assert list(second) == list(first) and second.changed == [edited]
+
     def test_good_files_are_valid_yaml(self, tmp_path):
         """All good output files parse as valid YAML."""
         _run(tmp_path)
@@ -193,3 +214,131 @@ class TestSafeOutputPath:
         """Plain relative paths under output_dir are accepted."""
         result = _safe_output_path(tmp_path, "aric/good/albumin.yaml")
         assert result == (tmp_path / "aric/good/albumin.yaml").resolve()
+
+
+def _tree(root):
+    return {p.relative_to(root): p.read_text() for p in sorted(root.rglob("*.yaml"))}
+
+
+class TestBatch:
+    """Multi-cohort, multi-entity generation from a single CSV read."""
+
+    def test_all_cohorts_matches_per_cohort_runs(self, tmp_path):
+        """cohorts=None renders every cohort, identical to one generate_yaml call per cohort."""
+        results = generate_batch(SAMPLE_CSV, tmp_path / "batch", entities=["MeasurementObservation"])
+        assert sorted(results.files) == [("MeasurementObservation", "aric"), ("MeasurementObservation", "jhs")]
+        for cohort in ("aric", "jhs"):
+            _run(tmp_path / "single", cohort=cohort)
+        assert _tree(tmp_path / "batch") == _tree(tmp_path / "single")
+
+    def test_worker_pool_matches_serial(self, tmp_path):
+        """Rendering in worker processes produces the same files as rendering in-process."""
+        serial = generate_batch(SAMPLE_CSV, tmp_path / "serial")
+        pooled = generate_batch(SAMPLE_CSV, tmp_path / "pooled", workers=3)
+        assert [len(paths) for paths in serial.files.values()] == [len(paths) for paths in pooled.files.values()]
+        assert len(serial.changed) == len(pooled.changed) == sum(map(len, serial.files.values()))
+        assert _tree(tmp_path / "serial") == _tree(tmp_path / "pooled")
+
+    def test_requested_cohort_without_rows_maps_to_empty(self, tmp_path):
+        """An explicitly requested pair with no rows is reported with an empty list."""
+        results = generate_batch(SAMPLE_CSV, tmp_path, cohorts=["aric", "nonexistent"])
+        assert results.files[("MeasurementObservation", "nonexistent")] == []
+        assert results.files[("MeasurementObservation", "aric")]
+
+    def test_rejects_unknown_entity(self, tmp_path):
+        """An unregistered entity raises before the CSV is read."""
+        with pytest.raises(ValueError, match="No registered entity spec"):
+            generate_batch(SAMPLE_CSV, tmp_path, entities=["Nonexistent"])
+
+    def test_cli_accepts_cohort_lists(self, tmp_path):
+        """The CLI takes comma-separated cohorts and renders both in one invocation."""
+        result = CliRunner().invoke(
+            app, ["generate-trans-specs", "-i", str(SAMPLE_CSV), "-o", str(tmp_path), "-c", "aric,jhs", "-j", "2"]
+        )
+        assert result.exit_code == 0, result.output
+        assert (tmp_path / "aric" / "good" / "bp_systolic.yaml").exists()
+        assert (tmp_path / "jhs" / "good" / "bp_systolic.yaml").exists()
+
+
+class TestGoodMasks:
+    """Vectorized completeness masks agree with the per-record predicates."""
+
+    @pytest.mark.parametrize(
+        ("entity", "csv_path"),
+        [("MeasurementObservation", SAMPLE_CSV), ("Condition", CONDITION_CSV)],
+    )
+    def test_mask_matches_predicate(self, entity, csv_path):
+        """good_mask marks exactly the rows is_good accepts."""
+        spec = ENTITY_REGISTRY[entity]
+        df = load_metadata(csv_path)
+        expected = [spec.is_good(record) for record in df.to_dict("records")]
+        assert spec.good_mask(df).tolist() == expected
+
+    def test_condition_mask_rejects_blank_and_zero(self):
+        """Empty strings and fillna(0) placeholders both count as missing."""
+        spec = ENTITY_REGISTRY["Condition"]
+        df = load_metadata(CONDITION_CSV).head(3).copy()
+        df.loc[df.index[1], "onto_id"] = ""
+        df.loc[df.index[2], "value_mappings"] = 0
+        assert spec.good_mask(df).tolist() == [True, False, False]
+
+    def test_missing_column_marks_everything_bad(self):
+        """A frame without a required column has no good rows."""
+        df = load_metadata(SAMPLE_CSV).drop(columns=["row_good"])
+        assert not ENTITY_REGISTRY["MeasurementObservation"].good_mask(df).any()
+
+
+class TestSkipUnchanged:
+    """Regeneration leaves files with identical content untouched."""
+
+    def test_rerun_rewrites_nothing(self, tmp_path):
+        """A second run over the same metadata reports no changes and keeps every mtime."""
+        first = generate_batch(SAMPLE_CSV, tmp_path)
+        assert first.changed == {p for paths in first.files.values() for p in paths}
+        mtimes = {p: p.stat().st_mtime_ns for p in first.changed}
+
+        second = generate_batch(SAMPLE_CSV, tmp_path)
+        assert second.changed == set()
+        assert {p: p.stat().st_mtime_ns for p in mtimes} == mtimes
+
+    def test_only_edited_variable_is_rewritten(self, tmp_path):
+        """Editing one variable's metadata rewrites only that variable's file."""
+        first = generate_batch(SAMPLE_CSV, tmp_path / "out", cohorts=["aric"])
+        target = first.files[("MeasurementObservation", "aric")][0]
+
+        df = pd.read_csv(SAMPLE_CSV)
+        rows = (df["cohort"] == "aric") & (df["bdchm_varname"] == target.stem)
+        df.loc[rows, "onto_id"] = "LOINC:0000-0"
+        edited = tmp_path / "edited.csv"
+        df.to_csv(edited, index=False)
+
+        second = generate_batch(edited, tmp_path / "out", cohorts=["aric"])
+        assert second.changed == {target}
+        assert not list((tmp_path / "out").rglob("*.tmp"))
+
+    def test_cli_lists_only_changed_files(self, tmp_path):
+        """The CLI reports how many files changed and lists just those."""
+        args = ["generate-trans-specs", "-i", str(SAMPLE_CSV), "-o", str(tmp_path), "-c", "aric"]
+        first = CliRunner().invoke(app, args)
+        assert first.exit_code == 0, first.output
+        second = CliRunner().invoke(app, args)
+        assert second.exit_code == 0, second.output
+        assert "(0 changed)" in second.output
+        assert ".yaml" not in second.output
+
+
+class TestTemplateCache:
+    """Compiled templates are reused within a process and optionally persisted on disk."""
+
+    def test_template_compiled_once_per_process(self):
+        """Repeated lookups, including via a relative path, return the same compiled template."""
+        first = _get_template("yaml_measobs.j2")
+        assert _get_template("yaml_measobs.j2", TEMPLATES_DIR / ".." / "templates") is first
+
+    def test_bytecode_cache_dir_is_populated(self, tmp_path):
+        """With a bytecode cache directory, compiled templates are written there and output is unchanged."""
+        cache_dir = tmp_path / "jinja"
+        generate_batch(SAMPLE_CSV, tmp_path / "cached", cohorts=["aric"], bytecode_cache_dir=cache_dir)
+        generate_batch(SAMPLE_CSV, tmp_path / "plain", cohorts=["aric"])
+        assert list(cache_dir.glob("__jinja2_*.cache"))
+        assert _tree(tmp_path / "cached") == _tree(tmp_path / "plain")
@@ -0,0 +1,133 @@
+"""Tests for incremental prepare-metadata (per-workbook partition caching)."""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.trans_spec_gen.incremental import prepare_metadata_incremental
+from dm_bip.trans_spec_gen.prepare_metadata import prepare_metadata
+
+TEST_DATA = Path(__file__).parent.parent / "input" / "prepare_metadata"
+RAW = TEST_DATA / "raw_metadata.xlsx"
+
+
+@pytest.fixture
+def workbooks(tmp_path):
+    """Split the fixture workbook into two partitions: aric rows and jhs rows."""
+    raw = pd.read_excel(RAW, dtype=str)
+    paths = []
+    for cohort in ("aric", "jhs"):
+        path = tmp_path / f"{cohort}.xlsx"
+        raw[raw["cohort"] == cohort].to_excel(path, index=False)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def rules(tmp_path):
+    """Copy the fixture cleanup rules somewhere writable."""
+    path = tmp_path / "cleanup_rules.csv"
+    path.write_text((TEST_DATA / "cleanup_rules.csv").read_text())
+    return path
+
+
+def _kwargs(raw_files, output, rules):
+    return {
+        "raw_files": raw_files,
+        "bdchv_defs_path": TEST_DATA / "bdchv_defs.csv",
+        "contextual_vars_path": TEST_DATA / "contextual_variables_key.csv",
+        "unit_key_path": TEST_DATA / "unit_key.xlsx",
+        "output_path": output,
+        "cleanup_rules_path": rules,
+    }
+
+
+def _incremental(tmp_path, raw_files, rules):
+    return prepare_metadata_incremental(
+        **_kwargs(raw_files, tmp_path / "incremental.csv", rules), cache_dir=tmp_path / "cache"
+    )
+
+
+def _assert_matches_full_run(tmp_path, raw_files, rules):
+    full = prepare_metadata(**_kwargs(raw_files, tmp_path / "full.csv", rules))
+    assert (tmp_path / "incremental.csv").read_text() == full.read_text()
+
+
+def test_first_run_matches_full_pipeline(tmp_path, workbooks, rules):
+    """A cold incremental run builds every partition and writes the same CSV as prepare_metadata."""
+    result = _incremental(tmp_path, workbooks, rules)
+    assert [p.rebuilt for p in result.partitions] == [["standardized", "cleaned", "merged"]] * 2
+    _assert_matches_full_run(tmp_path, workbooks, rules)
+
+
+def test_unchanged_rerun_rebuilds_nothing(tmp_path, workbooks, rules):
+    """With no input changes, every partition is served from the cache."""
+    _incremental(tmp_path, workbooks, rules)
+    result = _incremental(tmp_path, workbooks, rules)
+    assert result.rebuilt == []
+    _assert_matches_full_run(tmp_path, workbooks, rules)
+
+
+def test_edited_workbook_rebuilds_only_its_partition(tmp_path, workbooks, rules):
+    """Changing one workbook re-reads only that workbook."""
+    _incremental(tmp_path, workbooks, rules)
+    jhs = pd.read_excel(workbooks[1], dtype=str)
+    jhs["var_desc"] = jhs["var_desc"] + " (revised)"
+    jhs.to_excel(workbooks[1], index=False)
+
+    result = _incremental(tmp_path, workbooks, rules)
+    assert [p.name for p in result.rebuilt] == [str(workbooks[1])]
+    _assert_matches_full_run(tmp_path, workbooks, rules)
+
+
+@pytest.mark.parametrize("column", ["var_units", "bdchm_label", "data_table_id", "cohort", "bdchm_entity"])
+def test_workbooks_with_different_columns(tmp_path, workbooks, rules, column):
+    """A column empty in one workbook, so dropped when it is loaded, still matches the full run."""
+    jhs = pd.read_excel(workbooks[1], dtype=str)
+    jhs[column] = None
+    jhs.to_excel(workbooks[1], index=False)
+
+    _incremental(tmp_path, workbooks, rules)
+    _assert_matches_full_run(tmp_path, workbooks, rules)
+    assert _incremental(tmp_path, workbooks, rules).rebuilt == []
+
+
+def test_rule_edit_merges_only_affected_partitions(tmp_path, workbooks, rules):
+    """A cleanup rule edit re-cleans every partition but re-merges only those whose rows changed."""
+    _incremental(tmp_path, workbooks, rules)
+    rules.write_text(rules.read_text() + "set_units,var_desc,never matches anything,,,,,mg\n")
+
+    result = _incremental(tmp_path, workbooks, rules)
+    assert [p.rebuilt for p in result.partitions] == [["cleaned"], ["cleaned"]]
+
+    rules.write_text(rules.read_text() + "drop,cohort,jhs,,,,,\n")
+    result = _incremental(tmp_path, workbooks, rules)
+    assert [p.rebuilt for p in result.partitions] == [["cleaned"], ["cleaned", "merged"]]
+    _assert_matches_full_run(tmp_path, workbooks, rules)
+
+
+def test_manifest_drops_stale_frames(tmp_path, workbooks, rules):
+    """Frames no current partition references are pruned from the cache."""
+    _incremental(tmp_path, workbooks, rules)
+    _incremental(tmp_path, workbooks[:1], rules)
+    assert len(list((tmp_path / "cache" / "frames").glob("*.pkl"))) == 3
+
+
+def test_cli_reports_rebuilt_partitions(tmp_path, workbooks, rules):
+    """`dm-bip prepare-metadata --cache-dir` lists the partitions it rebuilt."""
+    args = ["prepare-metadata", "--raw", str(workbooks[0]), "--raw", str(workbooks[1])]
+    args += ["--bdchv-defs", str(TEST_DATA / "bdchv_defs.csv")]
+    args += ["--contextual-vars", str(TEST_DATA / "contextual_variables_key.csv")]
+    args += ["--unit-key", str(TEST_DATA / "unit_key.xlsx"), "--cleanup-rules", str(rules)]
+    args += ["--output", str(tmp_path / "out.csv"), "--cache-dir", str(tmp_path / "cache")]
+
+    first = CliRunner().invoke(app, args)
+    assert first.exit_code == 0, first.output
+    assert "Rebuilt 2 of 2 partition(s)" in first.output
+    assert f"{workbooks[1]}: standardized, cleaned, merged" in first.output
+
+    second = CliRunner().invoke(app, args)
+    assert "Rebuilt 0 of 2 partition(s)" in second.output
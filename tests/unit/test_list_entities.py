@@ -1,6 +1,10 @@
 """Unit tests for the list_entities helper."""
 
-from dm_bip.map_data.list_entities import list_entities
+import pytest
+from linkml_map.utils.spec_merge import class_derivation_names, load_and_merge_specs
+
+from dm_bip.map_data import list_entities as list_entities_module
+from dm_bip.map_data.list_entities import _scan_class_derivation_names, class_derivations, list_entities
 
 
 def test_extracts_entity_names_from_compact_list_specs(tmp_path):
@@ -57,3 +61,92 @@ def test_yml_extension(tmp_path):
     spec_dir.mkdir()
     (spec_dir / "v.yml").write_text("- class_derivations:\n    Visit:\n      populated_from: t1\n")
     assert list_entities([spec_dir]) == ["Visit"]
+
+
+SPEC_VARIANTS = {
+    "expanded_list.yaml": "class_derivations:\n- name: Person\n  populated_from: t1\n- name: Visit\n",
+    "flow.yaml": "{class_derivations: {Person: {populated_from: t1}}}\n",
+    "quoted.yaml": "class_derivations:\n  'Demography':\n    populated_from: t1\n",
+    "nested.yaml": (
+        "- class_derivations:\n"
+        "    MeasurementObservation:\n"
+        "      populated_from: t1\n"
+        "      slot_derivations:\n"
+        "        value_quantity:\n"
+        "          object_derivations:\n"
+        "          - class_derivations:\n"
+        "              Quantity:\n"
+        "                populated_from: t1\n"
+        "- class_derivations:\n"
+        "    Condition:\n"
+        "      populated_from: t2\n"
+    ),
+    "block_scalar.yaml": (
+        "class_derivations:\n  Participant:\n    slot_derivations:\n      id:\n        expr: |\n"
+        "          Nested:\n          value\n  Exposure: {}\n"
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(SPEC_VARIANTS))
+def test_matches_linkml_map_merge(tmp_path, name):
+    """Names match what linkml-map's own loader merges, for every layout the scanner or its fallback sees."""
+    spec = tmp_path / name
+    spec.write_text(SPEC_VARIANTS[name])
+    assert list_entities([spec]) == sorted(set(class_derivation_names(load_and_merge_specs((spec,)))))
+
+
+@pytest.mark.parametrize("name", sorted(SPEC_VARIANTS))
+def test_class_derivations_of_merged_specs(tmp_path, name):
+    """Derivations are normalized to ``{"name": ..., **body}`` whatever shape linkml-map's merge leaves them in."""
+    spec = tmp_path / name
+    spec.write_text(SPEC_VARIANTS[name])
+    merged = load_and_merge_specs((spec,))
+    derivations = class_derivations(merged)
+    assert [cd["name"] for cd in derivations] == class_derivation_names(merged)
+    if name == "nested.yaml":
+        assert [cd.get("populated_from") for cd in derivations] == ["t1", "t2"]
+
+
+def test_scanner_defers_to_yaml_for_unfamiliar_layouts():
+    """The line scanner handles compact block specs and bails out (None) on anything else."""
+    assert _scan_class_derivation_names(SPEC_VARIANTS["nested.yaml"]) == ["MeasurementObservation", "Condition"]
+    assert _scan_class_derivation_names(SPEC_VARIANTS["block_scalar.yaml"]) == ["Participant", "Exposure"]
+    for name in ("expanded_list.yaml", "flow.yaml", "quoted.yaml"):
+        assert _scan_class_derivation_names(SPEC_VARIANTS[name]) is None, name
+
+
+def test_cache_reused_until_specs_change(tmp_path, monkeypatch):
+    """A cache hit reads no spec; touching a spec invalidates the cache."""
+    spec_dir = tmp_path / "specs"
+    spec_dir.mkdir()
+    spec = spec_dir / "a.yaml"
+    spec.write_text("- class_derivations:\n    Person:\n      populated_from: t1\n")
+    cache = tmp_path / "entities.json"
+    assert list_entities([spec_dir], cache_path=cache) == ["Person"]
+
+    def fail(path):
+        raise AssertionError(f"read {path} despite a valid cache")
+
+    with monkeypatch.context() as m:
+        m.setattr(list_entities_module, "_spec_names", fail)
+        assert list_entities([spec_dir], cache_path=cache) == ["Person"]
+
+    spec.write_text("- class_derivations:\n    Visit:\n      populated_from: t1\n")
+    assert list_entities([spec_dir], cache_path=cache) == ["Visit"]
+
+
+def test_main_with_cache(tmp_path, capsys):
+    """The module CLI accepts --cache and prints one name per line."""
+    spec = tmp_path / "a.yaml"
+    spec.write_text("class_derivations:\n  Person: {}\n  Visit: {}\n")
+    assert list_entities_module.main(["--cache", str(tmp_path / "cache.json"), str(spec)]) == 0
+    assert capsys.readouterr().out == "Person\nVisit\n"
+    assert (tmp_path / "cache.json").exists()
+
+
+def test_main_without_paths(capsys):
+    """The module CLI prints a usage line and exits 1 when given no spec paths."""
+    assert list_entities_module.main([]) == 1
+    assert list_entities_module.main(["--cache", "cache.json"]) == 1
+    assert "Usage:" in capsys.readouterr().err
@@ -0,0 +1,86 @@
+"""Tests for dm_bip.map_data.chunking (automatic per-entity chunk sizes)."""
+
+import pytest
+
+from dm_bip.map_data.chunking import (
+    CHUNK_MEMORY,
+    DEFAULT_CHUNK_SIZE,
+    MAX_CHUNK_SIZE,
+    MIN_CHUNK_SIZE,
+    TableShape,
+    auto_chunk_size,
+    entity_chunk_size,
+    main,
+    parse_chunk_size,
+    table_shape,
+)
+
+
+def _table(path, columns, rows, width=8):
+    path.write_text(
+        "\t".join(f"c{i}" for i in range(columns))
+        + "\n"
+        + "".join("\t".join("x" * width for _ in range(columns)) + "\n" for _ in range(rows))
+    )
+    return path
+
+
+class TestAutoChunkSize:
+    """Wider records get smaller chunks, within the budget and the bounds."""
+
+    def test_table_shape(self, tmp_path):
+        """Columns come from the header and row bytes from the data rows."""
+        shape = table_shape(_table(tmp_path / "t.tsv", columns=3, rows=5))
+        assert shape == TableShape(columns=3, row_bytes=len("xxxxxxxx\txxxxxxxx\txxxxxxxx"))
+        assert table_shape(_table(tmp_path / "empty.tsv", columns=3, rows=0)) is None
+
+    def test_narrow_and_wide(self):
+        """A narrow table gets a large chunk, a wide one a small chunk, both rounded and bounded."""
+        narrow = auto_chunk_size([TableShape(columns=4, row_bytes=40)])
+        wide = auto_chunk_size([TableShape(columns=10_000, row_bytes=100_000)])
+        assert narrow == 49_000  # 32 MiB / (200 + 4 * 80 + 4 * 40) bytes, to two significant digits
+        assert wide == MIN_CHUNK_SIZE
+        assert auto_chunk_size([TableShape(columns=1, row_bytes=1)]) == MAX_CHUNK_SIZE
+        assert auto_chunk_size([]) == DEFAULT_CHUNK_SIZE
+
+    def test_widest_table_and_budget_decide(self):
+        """The widest input table sets the record size; a small budget shrinks the chunk."""
+        small, large = TableShape(columns=4, row_bytes=40), TableShape(columns=40, row_bytes=400)
+        assert auto_chunk_size([small, large]) == auto_chunk_size([large])
+        assert auto_chunk_size([small], memory=4 * CHUNK_MEMORY) == auto_chunk_size([small])
+        assert auto_chunk_size([small], memory=CHUNK_MEMORY) == 12_000  # a quarter of the budget
+
+    def test_entity_from_specs(self, tmp_path, capsys):
+        """The Makefile asks for an entity's chunk size from its spec and input tables."""
+        _table(tmp_path / "wide.tsv", columns=500, rows=3, width=20)
+        specs = tmp_path / "specs"
+        specs.mkdir()
+        (specs / "w.yaml").write_text("- class_derivations:\n    Wide:\n      populated_from: wide\n")
+        expected = entity_chunk_size(tmp_path, ["wide"])
+        assert main(["--entity", "Wide", "-T", str(specs), "--input-dir", str(tmp_path)]) == 0
+        assert int(capsys.readouterr().out) == expected < 1000
+        (specs / "w.yaml").write_text("class_derivations:\n  - Wide:\n      populated_from: wide\n")  # merged form
+        assert main(["--entity", "Wide", "-T", str(specs), "--input-dir", str(tmp_path)]) == 0
+        assert int(capsys.readouterr().out) == expected
+
+    def test_entity_without_tables_logs_default(self, tmp_path, capsys):
+        """An entity with no measurable input table gets the default chunk size, and says so on stderr."""
+        specs = tmp_path / "specs"
+        specs.mkdir()
+        (specs / "m.yaml").write_text("class_derivations:\n  - Missing:\n      populated_from: missing\n")
+        assert main(["--entity", "Missing", "-T", str(specs), "--input-dir", str(tmp_path)]) == 0
+        captured = capsys.readouterr()
+        assert int(captured.out) == DEFAULT_CHUNK_SIZE
+        assert "missing" in captured.err and str(DEFAULT_CHUNK_SIZE) in captured.err
+
+
+class TestParseChunkSize:
+    """Chunk sizes are positive counts or auto."""
+
+    def test_values(self):
+        """``auto`` means per-entity; anything but a positive integer is rejected."""
+        assert parse_chunk_size("auto") is None and parse_chunk_size("AUTO") is None
+        assert parse_chunk_size("500") == 500
+        for bad in ("0", "-3", "lots"):
+            with pytest.raises(ValueError, match="Not a chunk size"):
+                parse_chunk_size(bad)
@@ -0,0 +1,99 @@
+"""Tests for dm_bip.map_data.convert (writing output formats from a mapped JSON Lines file)."""
+
+import subprocess
+import sys
+
+import click.testing
+import pytest
+from linkml_map.cli.cli import main as linkml_map
+from linkml_map.writers import MultiStreamWriter, OutputFormat, make_stream_writer
+
+from dm_bip.map_data.convert import convert, convert_in_parallel, main, stream_path, stream_writer
+from dm_bip.schema_gen.infer import infer_schema, write_schema
+
+RECORDS = [
+    {"id": "p1", "age": 41, "value_quantity": {"value_decimal": 1.5, "unit": "cm"}, "tags": ["a", "b"], "x": None},
+    {"id": "p2", "name": 'Zoë, "Z"\ttab', "value_quantity": {"unit": "kg", "value_decimal": None}},  # new column
+    {"id": "p3", "age": 7, "flag": True, "note": "x" * 120},  # long enough for YAML to fold
+]
+FORMATS = ("yaml", "json", "jsonl", "tsv", "csv")
+
+
+@pytest.fixture
+def mapped(tmp_path):
+    """Write RECORDS as entities are mapped for conversion, null-valued slots included, returning the file."""
+    path = tmp_path / ".stream" / "E.jsonl"
+    path.parent.mkdir()
+    MultiStreamWriter([(stream_writer(), path)]).write_all(iter([RECORDS]))
+    return path
+
+
+class TestConvert:
+    """Converted files are what linkml-map's writers produce from the same records."""
+
+    def test_matches_linkml_map(self, tmp_path, mapped):
+        """Every format matches, null-valued slots and columns included, across chunks and a widened TSV header."""
+        (tmp_path / "expected").mkdir()
+        expected = [(make_stream_writer(OutputFormat(f)), tmp_path / "expected" / f"E.{f}") for f in FORMATS]
+        MultiStreamWriter(expected).write_all(iter([RECORDS[:1], RECORDS[1:]]))
+        outputs = [tmp_path / f"E.{f}" for f in FORMATS]
+        assert convert(mapped, [mapped, *outputs], chunk_size=1) == 3
+        for path, (_, want) in zip(outputs, expected, strict=True):
+            assert path.read_text() == want.read_text(), path.name
+        assert "value_decimal: null" in (tmp_path / "E.yaml").read_text()
+        assert (tmp_path / "E.tsv").read_text().splitlines()[0].split("\t")[:5] == [
+            "id",
+            "age",
+            "value_quantity__value_decimal",
+            "value_quantity__unit",
+            "tags",
+        ]
+        assert mapped.read_text().count("\n") == 3 and "null" not in (tmp_path / "E.jsonl").read_text()
+
+    def test_stream_path(self, tmp_path):
+        """Entities are mapped to a file in the stream dir, even when jsonl is one of their outputs."""
+        stream_dir = tmp_path / ".stream"
+        assert stream_path([tmp_path / "E.yaml", tmp_path / "E.tsv"], stream_dir) == stream_dir / "E.jsonl"
+        assert stream_path([tmp_path / "E.yaml", tmp_path / "E.jsonl"], stream_dir) == stream_dir / "E.jsonl"
+
+    def test_linkml_map_stream(self, tmp_path):
+        """``python -m dm_bip.map_data.stream`` is linkml-map with null-valued slots kept in its JSON Lines."""
+        inputs = tmp_path / "input"
+        inputs.mkdir()
+        (inputs / "t.tsv").write_text("id\tx\n1\ta\n2\t\n")
+        schema = tmp_path / "schema.yaml"
+        write_schema(infer_schema([inputs / "t.tsv"], "S", enum_threshold=1.0, max_enum_size=0).schema, schema)
+        spec = tmp_path / "spec.yaml"
+        spec.write_text(
+            "class_derivations:\n  P:\n    populated_from: t\n    slot_derivations:\n"
+            "      name:\n        populated_from: x\n"
+        )
+        args = ["map-data", "-T", str(spec), "-s", str(schema), "--entity", "P"]
+        stream = tmp_path / ".stream" / "P.jsonl"
+        stream.parent.mkdir()
+        command = [sys.executable, "-m", "dm_bip.map_data.stream", *args, "-o", str(stream), "-f", "jsonl"]
+        subprocess.run([*command, str(inputs)], check=True, capture_output=True)  # noqa: S603 - the module under test
+        assert stream.read_text() == '{"name": "a"}\n{"name": null}\n'
+        result = click.testing.CliRunner().invoke(linkml_map, [*args, "-o", str(tmp_path / "want.yaml"), str(inputs)])
+        assert result.exit_code == 0, result.output
+        convert(stream, [tmp_path / "P.yaml"])
+        assert (tmp_path / "P.yaml").read_text() == (tmp_path / "want.yaml").read_text()
+
+    def test_cli(self, tmp_path, mapped, capsys):
+        """The Makefile converts an entity to one format per command; unknown formats are usage errors."""
+        assert main([str(mapped), "--output", str(tmp_path / "E.yaml")]) == 0
+        assert "Converted 3 record(s)" in capsys.readouterr().out
+        assert (tmp_path / "E.yaml").read_text().count("---\n") == 3
+        with pytest.raises(SystemExit) as exc:
+            main([str(mapped), "--output", str(tmp_path / "E.xml")])
+        assert exc.value.code == 2
+
+    def test_in_parallel(self, tmp_path, mapped):
+        """Each format is written by its own process, as by convert; any failure is raised with its error."""
+        convert_in_parallel(mapped, [tmp_path / "E.yaml", tmp_path / "E.tsv"])
+        (tmp_path / "serial").mkdir()
+        convert(mapped, [tmp_path / "serial" / "E.yaml", tmp_path / "serial" / "E.tsv"])
+        for name in ("E.yaml", "E.tsv"):
+            assert (tmp_path / name).read_text() == (tmp_path / "serial" / name).read_text()
+        with pytest.raises(RuntimeError, match="E.xml: .*unknown output format"):
+            convert_in_parallel(mapped, [tmp_path / "E.yaml", tmp_path / "E.xml"])
@@ -0,0 +1,91 @@
+"""Tests for dm_bip.map_data.inputs (per-entity input table pruning)."""
+
+from pathlib import Path
+
+import pytest
+import yaml
+from linkml_map.utils.spec_merge import load_and_merge_specs
+
+from dm_bip.map_data.inputs import entity_input_dir, link_inputs, main, needed_tables
+
+FROM_RAW_SPECS = Path(__file__).parents[2] / "toy_data" / "from_raw" / "specs"
+TABLES = {f"pht00000{i}" for i in range(1, 7)}
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    """Write an input directory with the toy study's six pht tables."""
+    path = tmp_path / "input"
+    path.mkdir()
+    for table in TABLES:
+        (path / f"{table}.tsv").write_text("id\n1\n")
+    (path / "notes.txt").write_text("not a table\n")
+    return path
+
+
+class TestNeededTables:
+    """An entity needs its populated_from tables, joins and dotted table references."""
+
+    def test_references(self):
+        """Joins, nested derivations and {table.column} expressions are followed; columns are not tables."""
+        derivations = [
+            {
+                "name": "Measurement",
+                "populated_from": "a",
+                "joins": {"alias": {"class_named": "b", "join_on": "id"}, "c": None},
+                "slot_derivations": {
+                    "age": {"expr": "{d.age} * 365 + {unknown.x}"},
+                    "site": {"populated_from": "e.site"},
+                    "value": {"object_derivations": [{"class_derivations": {"Q": {"populated_from": "f"}}}]},
+                    "g": {"populated_from": "g"},
+                },
+            },
+            {"name": "Measurement", "populated_from": "h"},
+        ]
+        tables = set("abcdefhz")
+        assert needed_tables(derivations, tables) == set("abcdefh")
+        assert needed_tables([{"name": "z"}], tables) == {"z"}
+
+    def test_foreign_key_path(self):
+        """A dotted populated_from rooted in neither a table nor a join alias keeps every table."""
+        derivation = {"name": "P", "populated_from": "a", "slot_derivations": {"x": {"populated_from": "fk.col"}}}
+        assert needed_tables([derivation], {"a", "b"}) is None
+        derivation["joins"] = {"fk": {"class_named": "b"}}
+        assert needed_tables([derivation], {"a", "b"}) == {"a", "b"}
+
+    def test_toy_specs(self, tmp_path, input_dir):
+        """The toy MeasurementObservation specs read four tables, across their spec blocks."""
+        linked = entity_input_dir([FROM_RAW_SPECS], "MeasurementObservation", input_dir, tmp_path / "links")
+        assert linked == tmp_path / "links" / "MeasurementObservation"
+        assert sorted(p.name for p in linked.iterdir()) == [f"pht00000{i}.tsv" for i in (1, 2, 3, 5)]
+
+    def test_merged_spec(self, tmp_path, input_dir):
+        """A merged spec, whose class_derivations are compact ``{Entity: body}`` entries, reads the same tables."""
+        spec = tmp_path / "merged.yaml"
+        spec.write_text(yaml.safe_dump(load_and_merge_specs((FROM_RAW_SPECS,)), sort_keys=False))
+        assert "- MeasurementObservation:" in spec.read_text()
+        linked = entity_input_dir([spec], "MeasurementObservation", input_dir, tmp_path / "links")
+        assert sorted(p.name for p in linked.iterdir()) == [f"pht00000{i}.tsv" for i in (1, 2, 3, 5)]
+
+
+class TestLinkInputs:
+    """The link directory holds exactly the current tables."""
+
+    def test_relink(self, tmp_path, input_dir):
+        """Links no longer needed are removed; the links resolve to the input files."""
+        links = tmp_path / "links" / "E"
+        link_inputs(input_dir, {"pht000001", "pht000002"}, links)
+        link_inputs(input_dir, {"pht000002", "pht000003"}, links)
+        assert sorted(p.name for p in links.iterdir()) == ["pht000002.tsv", "pht000003.tsv"]
+        assert (links / "pht000002.tsv").resolve() == (input_dir / "pht000002.tsv").resolve()
+
+    def test_cli_unprunable(self, tmp_path, input_dir, capsys):
+        """The Makefile gets the input directory back when the tables cannot be known from the specs."""
+        (tmp_path / "spec.yaml").write_text(
+            "class_derivations:\n  P:\n    populated_from: pht000001\n"
+            "    slot_derivations:\n      x:\n        populated_from: study.name\n"
+        )
+        args = ["--entity", "P", "-T", str(tmp_path / "spec.yaml"), "--input-dir", str(input_dir)]
+        assert main([*args, "--link-dir", str(tmp_path / "links")]) == 0
+        assert capsys.readouterr().out.strip() == str(input_dir)
+        assert not (tmp_path / "links").exists()
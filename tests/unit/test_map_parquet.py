@@ -0,0 +1,171 @@
+"""Tests for dm_bip.map_data.parquet (typed Parquet output for mapped entities)."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.map_data.convert import convert
+
+pa = pytest.importorskip("pyarrow")
+
+from dm_bip.map_data.parquet import (  # noqa: E402 - only with pyarrow
+    Column,
+    ParquetWriter,
+    parquet_columns,
+    read_parquet,
+    round_trip_differences,
+)
+
+TARGET_SCHEMA = Path(__file__).parents[2] / "toy_data" / "target-schema.yaml"
+
+SCHEMA = """\
+id: https://example.org/parquet-test
+name: parquet_test
+prefixes:
+  linkml: https://w3id.org/linkml/
+imports:
+  - linkml:types
+default_range: string
+enums:
+  Unit:
+    permissible_values:
+      cm: {}
+      kg: {}
+classes:
+  Quantity:
+    attributes:
+      value_decimal: {range: decimal}
+      unit: {range: Unit}
+  Node:
+    attributes:
+      label: {}
+      child: {range: Node, inlined: true}
+  Measurement:
+    attributes:
+      id: {}
+      age: {range: integer}
+      flag: {range: boolean}
+      tags: {multivalued: true}
+      quantity: {range: Quantity, inlined: true}
+      quantities: {range: Quantity, multivalued: true, inlined_as_list: true}
+      node: {range: Node, inlined: true}
+"""
+
+RECORDS = [
+    {"id": 1, "age": 41, "flag": True, "tags": ["a", "b"], "quantity": {"value_decimal": 1.5, "unit": "cm"}},
+    {"id": "m2", "age": "7", "quantities": [{"value_decimal": 2, "unit": "kg"}], "node": {"label": "x"}},
+    {"id": "m3", "node": {"label": "y", "child": {"label": "z"}}},
+]
+
+
+@pytest.fixture
+def schema(tmp_path):
+    """Write the test target schema, returning its path."""
+    path = tmp_path / "schema.yaml"
+    path.write_text(SCHEMA)
+    return path
+
+
+class TestColumns:
+    """Columns are typed from the target class; single inlined objects are flattened."""
+
+    def test_layout(self, schema):
+        """Types follow slot ranges; multivalued or recursive objects are JSON text."""
+        columns = {column.name: column for column in parquet_columns(schema, "Measurement")}
+        assert list(columns) == [
+            "id",
+            "age",
+            "flag",
+            "tags",
+            "quantity__value_decimal",
+            "quantity__unit",
+            "quantities",
+            "node__label",
+            "node__child",
+        ]
+        assert columns["age"] == Column(("age",), "int64")
+        assert columns["flag"].value_type == "bool_" and columns["quantity__value_decimal"].value_type == "float64"
+        assert columns["tags"].multivalued and columns["quantity__unit"].value_type == "string"
+        assert columns["quantities"].as_json and columns["node__child"].as_json
+        with pytest.raises(ValueError, match="no class 'Nothing'"):
+            parquet_columns(schema, "Nothing")
+
+    def test_toy_target(self):
+        """The toy MeasurementObservation flattens value_quantity."""
+        names = [column.name for column in parquet_columns(TARGET_SCHEMA, "MeasurementObservation")]
+        assert names[-3:] == ["value_quantity__value_decimal", "value_quantity__value_concept", "value_quantity__unit"]
+
+
+class TestWriteAndRead:
+    """Records written a batch per chunk read back as written, converted to their columns' types."""
+
+    def test_round_trip(self, tmp_path, schema):
+        """Each chunk is a row group; values come back typed and nested, without nulls."""
+        columns = parquet_columns(schema, "Measurement")
+        path = tmp_path / "m.parquet"
+        with ParquetWriter(path, columns) as writer:
+            writer.write_chunk(RECORDS[:2])
+            writer.write_chunk(RECORDS[2:])
+        assert pa.parquet.ParquetFile(path).metadata.num_row_groups == 2
+        records = list(read_parquet(path))
+        assert records[0] == {
+            "id": "1",
+            "age": 41,
+            "flag": True,
+            "tags": ["a", "b"],
+            "quantity": {"value_decimal": 1.5, "unit": "cm"},
+        }
+        assert records[1]["age"] == 7 and records[1]["quantities"] == [{"value_decimal": 2, "unit": "kg"}]
+        assert records[2] == {"id": "m3", "node": {"label": "y", "child": {"label": "z"}}}
+        assert round_trip_differences(path, iter(RECORDS)) == (3, [])
+        count, differences = round_trip_differences(path, iter([{**RECORDS[0], "age": 42}]))
+        assert count == 1 and differences[0].startswith("record 1:") and "2 record(s)" in differences[1]
+
+    def test_errors(self, tmp_path, schema):
+        """A slot the class lacks, or a value its column cannot hold, fails the write."""
+        columns = parquet_columns(schema, "Measurement")
+        with ParquetWriter(tmp_path / "m.parquet", columns) as writer:
+            with pytest.raises(ValueError, match="no slot 'quantity.weight'"):
+                writer.write_chunk([{"id": "m", "quantity": {"weight": 1}}])
+            with pytest.raises(ValueError, match="column age"):
+                writer.write_chunk([{"id": "m", "age": "old"}])
+            with pytest.raises(ValueError, match="column age: not a whole number: 2.7"):
+                writer.write_chunk([{"id": "m", "age": 2.7}])
+            with pytest.raises(ValueError, match="quantity is not an object: '12 mg'"):
+                writer.write_chunk([{"id": "m", "quantity": "12 mg"}])
+        assert Column(("age",), "int64").value({"age": 2.0}) == 2
+
+    def test_compare_is_lossless(self, tmp_path, schema):
+        """Round trips compare with the JSON Lines values, not with them converted as the writer would."""
+        path = tmp_path / "m.parquet"
+        with ParquetWriter(path, parquet_columns(schema, "Measurement")) as writer:
+            writer.write_chunk([{"id": "m", "age": 2, "flag": True, "tags": ["a"], "node": {"label": None}}])
+        same = {"id": "m", "age": 2.0, "flag": "true", "tags": "a", "quantity": None, "node": {"label": None}}
+        assert round_trip_differences(path, iter([same])) == (1, [])
+        for changed in ({"age": 2.7}, {"flag": "no"}, {"tags": ["a", "b"]}, {"quantity": "12 mg"}):
+            assert round_trip_differences(path, iter([{**same, **changed}]))[1]
+
+    def test_without_pyarrow(self, tmp_path, schema, monkeypatch):
+        """Without pyarrow, writing names the extra that provides it."""
+        monkeypatch.setitem(sys.modules, "pyarrow", None)
+        with pytest.raises(ImportError, match=r"dm-bip\[parquet\]"):
+            ParquetWriter(tmp_path / "m.parquet", parquet_columns(schema, "Measurement"))
+
+    def test_convert_and_cli(self, tmp_path, schema):
+        """The converter writes Parquet from JSON Lines, and dm-bip read-parquet checks it round-trips."""
+        source = tmp_path / "Measurement.jsonl"
+        source.write_text("".join(json.dumps(record) + "\n" for record in RECORDS))
+        path = tmp_path / "Measurement.parquet"
+        with pytest.raises(ValueError, match="needs the target schema"):
+            convert(source, [path])
+        assert convert(source, [path], chunk_size=2, target_schema=schema, entity="Measurement") == 3
+        result = CliRunner().invoke(app, ["read-parquet", str(path), "--compare", str(source)])
+        assert result.exit_code == 0 and "3 record(s)" in result.output
+        result = CliRunner().invoke(app, ["read-parquet", str(path), "-n", "1"])
+        assert json.loads(result.output)["id"] == "1"
+        source.write_text(json.dumps(RECORDS[1]) + "\n")
+        assert CliRunner().invoke(app, ["read-parquet", str(path), "--compare", str(source)]).exit_code == 1
@@ -0,0 +1,78 @@
+"""Tests for dm_bip.map_data.resources (per-entity resource records of the map step)."""
+
+import json
+import sys
+from pathlib import Path
+
+from dm_bip.map_data.resources import (
+    count_records,
+    entity_tables,
+    load_resources,
+    main,
+    resources_path,
+    rows_read,
+)
+
+TOY = Path(__file__).parents[2] / "toy_data"
+
+# Writes a two-row TSV to argv[1] and exits with argv[2].
+WRITER = "import sys; open(sys.argv[1], 'w').write('id\\n1\\n2\\n'); sys.exit(int(sys.argv[2]))"
+
+
+class TestCounts:
+    """Records are counted from the files without parsing them."""
+
+    def test_count_records(self, tmp_path):
+        """TSV rows, JSONL lines and YAML stream documents are counted; JSON is not."""
+        (tmp_path / "a.tsv").write_text("id\tname\n1\tx\n2\ty")
+        (tmp_path / "a.jsonl").write_text('{"id": 1}\n{"id": 2}\n{"id": 3}\n')
+        (tmp_path / "a.yaml").write_text("id: 1\nname: |\n  x\n  ---\n---\nid: 2\n---\n")
+        (tmp_path / "a.json").write_text("[]")
+        counts = {suffix: count_records(tmp_path / f"a.{suffix}") for suffix in ("tsv", "jsonl", "yaml", "json")}
+        assert counts == {"tsv": 2, "jsonl": 3, "yaml": 2, "json": None}
+        assert count_records(tmp_path / "missing.tsv") is None
+
+    def test_rows_read_from_spec_tables(self):
+        """An entity reads the tables its class derivations are populated from."""
+        specs = [TOY / "pre_cleaned" / "specs"]
+        assert entity_tables(specs, "Participant") == ["subject"]
+        input_dir = TOY / "data" / "pre_cleaned"
+        assert rows_read(input_dir, ["subject"]) == 110
+        assert rows_read(input_dir, ["missing"]) is None
+
+    def test_tables_from_compact_spec(self, tmp_path):
+        """Compact ``- Entity: body`` class derivations, as merged specs have them, name their tables too."""
+        spec = tmp_path / "spec.yaml"
+        spec.write_text(
+            "class_derivations:\n"
+            "  - MeasurementObservation:\n      populated_from: pht1\n"
+            "  - MeasurementObservation:\n      populated_from: pht2\n"
+            "  - Condition:\n      populated_from: pht3\n"
+            "  - name: MeasurementObservation\n    populated_from: pht1\n"
+        )
+        assert entity_tables([spec], "MeasurementObservation") == ["pht1", "pht2"]
+        assert entity_tables([spec], "Condition") == ["pht3"]
+
+
+class TestMeasureCommand:
+    """The wrapper passes the command's exit code through and always writes the record."""
+
+    def _run(self, tmp_path, code):
+        output = tmp_path / "Person.tsv"
+        args = ["--entity", "Person", "--log-dir", str(tmp_path / "logs"), "--output", str(output)]
+        return main([*args, "--", sys.executable, "-c", WRITER, str(output), str(code)])
+
+    def test_exit_code_and_record(self, tmp_path):
+        """A failed command's exit code is returned and its outputs are still measured."""
+        assert self._run(tmp_path, 3) == 3
+        record = json.loads(resources_path(tmp_path / "logs", "Person").read_text())
+        assert record["runner"] == "linkml-map" and record["exit_code"] == 3
+        assert record["rows_written"] == 2 and record["output_bytes"] == len("id\n1\n2\n")
+        assert record["cpu_user_seconds"] >= 0 and record["peak_rss_bytes"] > 0
+        assert load_resources(tmp_path / "logs")["Person"]["exit_code"] == 3
+
+    def test_signal_reported_as_shell_exit_code(self, tmp_path):
+        """A command killed by a signal exits 128 + N, as the Makefile's kill check expects."""
+        code = main(["--entity", "X", "--log-dir", str(tmp_path), "--", "sh", "-c", "kill -9 $$"])
+        assert code == 137
+        assert load_resources(tmp_path)["X"]["exit_code"] == 137
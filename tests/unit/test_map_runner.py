@@ -0,0 +1,181 @@
+"""Tests for dm_bip.map_data.runner (mapping many entities in one process)."""
+
+import shutil
+from pathlib import Path
+
+import click.testing
+import pytest
+from linkml_map.cli.cli import main as linkml_map
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.map_data.convert import STREAM_DIR
+from dm_bip.map_data.resources import load_resources
+from dm_bip.map_data.runner import MapOptions, MapSession, map_entities, sentinel_path
+from dm_bip.map_data.scheduler import HISTORY_NAME, MemoryHistory
+from dm_bip.schema_gen.infer import infer_schema, write_schema
+
+REPO = Path(__file__).parents[2]
+TOY = REPO / "toy_data"
+TARGET_SCHEMA = TOY / "target-schema.yaml"
+
+# A second entity streamed from subject.tsv, so the table is shared with Participant.
+CONDITION_SPEC = """\
+- class_derivations:
+    Condition:
+      populated_from: subject
+      slot_derivations:
+        associated_participant:
+          populated_from: subject_id
+        condition_concept:
+          populated_from: participant_external_id
+"""
+
+
+@pytest.fixture(scope="module")
+def toy(tmp_path_factory):
+    """Return (source schema, spec dir, input dir) for the pre-cleaned toy study plus a Condition spec."""
+    root = tmp_path_factory.mktemp("toy")
+    input_dir = TOY / "data" / "pre_cleaned"
+    schema = root / "ToyPreCleaned.yaml"
+    # No enums, as with the pipeline's defaults (DM_ENUM_THRESHOLD=1.0, DM_MAX_ENUM_SIZE=0).
+    inferred = infer_schema(sorted(input_dir.glob("*.tsv")), "ToyPreCleaned", enum_threshold=1.0, max_enum_size=0)
+    write_schema(inferred.schema, schema)
+    specs = root / "specs"
+    shutil.copytree(TOY / "pre_cleaned" / "specs", specs)
+    (specs / "condition-spec.yaml").write_text(CONDITION_SPEC)
+    return schema, specs, input_dir
+
+
+def _options(tmp_path, **kwargs):
+    return MapOptions(output_dir=tmp_path / "mapped", formats=["yaml", "tsv"], prefix="TOY", **kwargs)
+
+
+class TestMatchesMapData:
+    """Each entity's output is what `linkml-map map-data --entity` writes."""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_outputs(self, tmp_path, toy, workers):
+        """Every format of every entity is byte-identical, serially and from forked workers."""
+        schema, specs, input_dir = toy
+        options = _options(tmp_path)
+        run = map_entities(schema, [specs], input_dir, options, target_schema=TARGET_SCHEMA, workers=workers)
+        assert [(r.entity, r.status) for r in run.results] == [
+            ("Condition", "mapped"),
+            ("Participant", "mapped"),
+            ("Person", "mapped"),
+        ]
+        (tmp_path / "expected").mkdir()
+        for result in run.results:
+            expected = tmp_path / "expected" / result.entity
+            args = ["map-data", "-T", f"{specs}/", "--entity", result.entity, "-s", str(schema)]
+            args += ["--target-schema", str(TARGET_SCHEMA), "-o", f"{expected}.yaml", "-O", f"{expected}.tsv"]
+            invoked = click.testing.CliRunner().invoke(linkml_map, [*args, "-f", "yaml", str(input_dir)])
+            assert invoked.exit_code == 0, invoked.output
+            for path in options.outputs(result.entity):
+                assert path.read_text() == Path(f"{expected}{path.suffix}").read_text()
+            assert sentinel_path(options.output_dir, result.entity).exists()
+            assert result.log_path.read_text().endswith(f"map-data '{result.entity}' exited with code 0\n")
+            # Each entity records what it used, as the linkml-map rule's wrapper does.
+            resources = load_resources(options.logs)[result.entity]
+            assert resources["rows_written"] == result.rows and resources["rows_read"] == 110
+            assert resources["output_bytes"] == sum(path.stat().st_size for path in options.outputs(result.entity))
+        # Forked runs record each entity's memory for the scheduler.
+        history = MemoryHistory(options.output_dir / HISTORY_NAME).memory
+        assert set(history) == (set() if workers == 1 else {"Condition", "Participant", "Person"})
+
+
+class TestStream:
+    """With stream, entities are mapped to JSON Lines and their formats written from it."""
+
+    def test_stream(self, tmp_path, toy):
+        """The files are those written directly, byte for byte, and no stream file is left."""
+        schema, specs, input_dir = toy
+        direct, streamed = _options(tmp_path / "direct"), _options(tmp_path / "streamed", stream=True)
+        for options in (direct, streamed):
+            map_entities(schema, [specs], input_dir, options, target_schema=TARGET_SCHEMA, entities=["Participant"])
+        for path, want in zip(streamed.outputs("Participant"), direct.outputs("Participant"), strict=True):
+            assert path.read_text() == want.read_text(), path.name
+        assert list((streamed.output_dir / STREAM_DIR).iterdir()) == []
+        assert load_resources(streamed.logs)["Participant"]["rows_written"] == 110
+
+
+class TestSharedTables:
+    """Tables several entities stream are parsed once."""
+
+    def test_subject_shared(self, toy):
+        """subject.tsv feeds Participant and Condition, so it is held in memory; demographics.tsv is not."""
+        schema, specs, input_dir = toy
+        session = MapSession(schema, [specs], input_dir, TARGET_SCHEMA)
+        session.warm_up(["Condition", "Participant", "Person"])
+        assert set(session.loader.tables) == {"subject"}
+        session.done_with("Participant")
+        assert set(session.loader.tables) == {"subject"}
+        session.done_with("Condition")
+        assert session.loader.tables == {}
+
+
+class TestIncremental:
+    """Entities are remapped only when their specs or schemas change, as with the per-entity make rule."""
+
+    def test_skip_until_spec_changes(self, tmp_path, toy):
+        """A rerun skips the entity; --force maps it again."""
+        schema, specs, input_dir = toy
+        options = _options(tmp_path)
+        map_entities(schema, [specs], input_dir, options, entities=["Person"])
+        rerun = map_entities(schema, [specs], input_dir, options, entities=["Person"])
+        assert [r.status for r in rerun.results] == ["up-to-date"]
+        forced = map_entities(schema, [specs], input_dir, options, entities=["Person"], force=True)
+        assert [r.status for r in forced.results] == ["mapped"]
+
+
+class TestErrors:
+    """Failures are logged per entity and only fail the run in strict mode."""
+
+    @pytest.fixture
+    def broken(self, tmp_path, toy):
+        """Add an entity whose spec references a missing source slot."""
+        schema, specs, input_dir = toy
+        broken = tmp_path / "specs"
+        shutil.copytree(specs, broken)
+        spec = CONDITION_SPEC.replace("Condition", "Observation").replace("participant_external_id", "missing")
+        (broken / "broken.yaml").write_text(spec)
+        return schema, broken, input_dir
+
+    @pytest.mark.parametrize(("continue_on_error", "complete"), [(False, False), (True, True)])
+    def test_failed_entity(self, tmp_path, broken, continue_on_error, complete):
+        """The failure is logged with its exit line; other entities still map."""
+        schema, specs, input_dir = broken
+        options = _options(tmp_path, continue_on_error=continue_on_error)
+        run = map_entities(schema, [specs], input_dir, options, entities=["Observation", "Person"])
+        observation, person = run.results
+        assert observation.status == "failed" and person.status == "mapped"
+        assert "exited with code 1" in observation.log_path.read_text()
+        assert sentinel_path(options.output_dir, "Observation").exists() is complete
+        assert [r.entity for r in run.failures] == ([] if complete else ["Observation"])
+
+    def test_cli(self, tmp_path, broken):
+        """`dm-bip map` reports each entity and exits 1 when one did not complete."""
+        schema, specs, input_dir = broken
+        args = ["map", "-T", str(specs), "-s", str(schema), "-o", str(tmp_path / "out"), "--postfix=-data"]
+        result = CliRunner().invoke(app, [*args, "-e", "Person", "-e", "Observation", str(input_dir)])
+        assert result.exit_code == 1, result.output
+        assert "✓ Person: 110 record(s)" in result.output
+        assert "1 entity(ies) did not complete: Observation" in result.output
+        assert (tmp_path / "out" / "Person--data.yaml").exists()
+
+
+class TestChunkSize:
+    """`--chunk-size auto` sizes each entity's chunks from its input tables."""
+
+    def test_auto(self, tmp_path, toy):
+        """Each entity records the chunk size it was mapped with; a bad value is a usage error."""
+        schema, specs, input_dir = toy
+        args = ["map", "-T", str(specs), "-s", str(schema), "-o", str(tmp_path / "out"), "-e", "Person"]
+        result = CliRunner().invoke(app, [*args, "--chunk-size", "auto", str(input_dir)])
+        assert result.exit_code == 0, result.output
+        session = MapSession(schema, [specs], input_dir)
+        expected = session.chunk_size("Person")
+        assert load_resources(tmp_path / "out" / "logs")["Person"]["chunk_size"] == expected > 1000
+        bad = CliRunner().invoke(app, [*args, "--chunk-size", "0", str(input_dir)])
+        assert bad.exit_code == 2 and "Not a chunk size" in bad.output
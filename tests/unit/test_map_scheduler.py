@@ -0,0 +1,108 @@
+"""Tests for dm_bip.map_data.scheduler (memory-aware admission of map entities)."""
+
+import json
+import os
+import signal
+from pathlib import Path
+
+import pytest
+
+from dm_bip.map_data.runner import EntityResult
+from dm_bip.map_data.scheduler import MemoryHistory, next_entity, parse_memory, run_scheduled
+
+G = 1024**3
+
+
+class TestNextEntity:
+    """Entities start largest first while they fit, and small ones fill the gaps."""
+
+    ESTIMATES = {"Measurement": 6 * G, "Observation": 4 * G, "Condition": 1 * G, "Person": 1 * G}
+
+    def _order(self, budget, workers=4):
+        """Simulate admission with nothing finishing; return the waves of entities started together."""
+        pending = sorted(self.ESTIMATES, key=self.ESTIMATES.get, reverse=True)
+        waves = []
+        while pending:
+            wave, in_use = [], 0
+            while len(wave) < workers:
+                entity = next_entity(pending, self.ESTIMATES, in_use, budget, idle=not wave)
+                if entity is None:
+                    break
+                wave.append(entity)
+                in_use += self.ESTIMATES[entity]
+            waves.append(wave)
+        return waves
+
+    def test_budget_separates_heavy_entities(self):
+        """With an 8G budget the two heavy entities never overlap; the small ones join the first."""
+        assert self._order(8 * G) == [["Measurement", "Condition", "Person"], ["Observation"]]
+
+    def test_no_budget(self):
+        """Without a budget only the worker count limits admission."""
+        assert self._order(None, workers=2) == [["Measurement", "Observation"], ["Condition", "Person"]]
+
+    def test_oversized_entity_runs_alone(self):
+        """An entity larger than the whole budget still runs once nothing else is running."""
+        assert self._order(2 * G) == [["Condition", "Person"], ["Measurement"], ["Observation"]]
+
+
+class TestMemoryHistory:
+    """Recorded peaks predict the next run; unknown entities are assumed to be as large as the largest."""
+
+    def test_estimates_and_round_trip(self, tmp_path):
+        """Known entities use their recorded memory, new ones the largest recorded value."""
+        history = MemoryHistory(tmp_path / "history.json")
+        assert history.estimates(["A"]) == {"A": 0}
+        history.memory.update({"A": 5, "B": 9})
+        history.save()
+        assert MemoryHistory(tmp_path / "history.json").estimates(["A", "C"]) == {"A": 5, "C": 9}
+        (tmp_path / "history.json").write_text("not json")
+        assert MemoryHistory(tmp_path / "history.json").memory == {}
+
+
+class TestParseMemory:
+    """Budgets are bytes or sizes with binary suffixes."""
+
+    @pytest.mark.parametrize(
+        ("text", "expected"), [("1024", 1024), ("512M", 512 * 1024**2), ("1.5G", int(1.5 * G)), ("8GiB", 8 * G)]
+    )
+    def test_sizes(self, text, expected):
+        """Suffixes are case-insensitive powers of 1024."""
+        assert parse_memory(text) == expected
+        assert parse_memory(text.lower()) == expected
+
+    def test_empty_and_invalid(self):
+        """Empty means no budget; anything else unparseable is an error."""
+        assert parse_memory("") is None and parse_memory(None) is None
+        with pytest.raises(ValueError, match="Not a memory size"):
+            parse_memory("lots")
+
+
+class TestRunScheduled:
+    """Each entity runs in its own forked process that reports its memory."""
+
+    def test_memory_recorded_and_kill_reported(self, tmp_path):
+        """Mapped entities record their memory; a killed process is reported with the shell's exit code."""
+
+        def map_one(entity):
+            if entity == "Killed":
+                os.kill(os.getpid(), signal.SIGKILL)
+            block = b"x" * 64 * 1024**2  # fill 64M so the peak clearly rises
+            return EntityResult(entity, "mapped", rows=len(block) // 1024**2)
+
+        results = []
+        history = MemoryHistory(tmp_path / "history.json")
+        run_scheduled(
+            ["Big", "Killed"],
+            map_one=map_one,
+            on_killed=lambda entity, code: EntityResult(entity, "killed", returncode=code),
+            record=results.append,
+            workers=2,
+            budget=None,
+            history=history,
+        )
+        by_entity = {result.entity: result for result in results}
+        assert by_entity["Big"].rows == 64
+        assert by_entity["Big"].memory >= 60 * 1024**2
+        assert by_entity["Killed"].status == "killed" and by_entity["Killed"].returncode == 137
+        assert set(json.loads(Path(tmp_path / "history.json").read_text())["memory"]) == {"Big"}
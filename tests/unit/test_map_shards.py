@@ -0,0 +1,201 @@
+"""Tests for dm_bip.map_data.shards (mapping one entity in parallel shards)."""
+
+import json
+from pathlib import Path
+
+import click.testing
+import pytest
+from linkml_map.cli.cli import main as linkml_map
+
+from dm_bip.map_data.resources import EntityResources, entity_derivations, load_resources
+from dm_bip.map_data.shards import ShardError, assign_groups, main, merge, merge_outputs, split, table_groups
+from dm_bip.schema_gen.infer import infer_schema, write_schema
+
+TOY = Path(__file__).parents[2] / "toy_data"
+
+# Two blocks stream "a" and "b" and both join "lookup"; a third streams "c" and joins "a".
+FIRST_BLOCK = """\
+- class_derivations:
+    E:
+      populated_from: a
+      joins:
+        lookup:
+          join_on: id
+      slot_derivations:
+        x:
+          expr: "{lookup.name}"
+"""
+SPEC = (
+    FIRST_BLOCK
+    + """\
+- class_derivations:
+    E:
+      populated_from: b
+      joins:
+        lookup:
+          join_on: id
+- class_derivations:
+    E:
+      populated_from: c
+      slot_derivations:
+        y:
+          populated_from: a.id
+"""
+)
+
+
+@pytest.fixture
+def study(tmp_path):
+    """Write the spec above and input tables a, b, c and lookup, returning (spec, input dir)."""
+    inputs = tmp_path / "input"
+    inputs.mkdir()
+    for table, rows in (("a", 40), ("b", 20), ("c", 10), ("lookup", 5)):
+        (inputs / f"{table}.tsv").write_text("id\tname\n" + "".join(f"{i}\t{table}{i}\n" for i in range(rows)))
+    spec = tmp_path / "spec.yaml"
+    spec.write_text(SPEC)
+    return spec, inputs
+
+
+def _rows(path):
+    return path.read_text().splitlines()[1:]
+
+
+class TestSplit:
+    """Each shard gets a cut of the streamed tables, or whole groups of blocks."""
+
+    def test_hash(self, tmp_path, study):
+        """Streamed tables are cut by key so each row is in one shard; joined tables are whole."""
+        spec, inputs = study
+        spec.write_text(FIRST_BLOCK)
+        dirs = [split([spec], "E", inputs, tmp_path / f"s{k}", k, 3) for k in (1, 2, 3)]
+        cut = [row for d in dirs for row in _rows(d / "a.tsv")]
+        assert sorted(cut) == sorted(_rows(inputs / "a.tsv")) and all(_rows(d / "a.tsv") for d in dirs)
+        assert all((d / "lookup.tsv").is_symlink() and not (d / "b.tsv").exists() for d in dirs)
+        assert _rows(split([spec], "E", inputs, tmp_path / "again", 2, 3) / "a.tsv") == _rows(dirs[1] / "a.tsv")
+
+    def test_hash_refuses_streamed_join(self, tmp_path, study):
+        """A table that one block streams and another joins cannot be cut by hash."""
+        spec, inputs = study
+        with pytest.raises(ShardError, match="a is both streamed and joined"):
+            split([spec], "E", inputs, tmp_path / "s", 1, 2)
+        spec.write_text(FIRST_BLOCK)
+        with pytest.raises(ShardError, match="no shard key column 'subject'"):
+            split([spec], "E", inputs, tmp_path / "s", 1, 2, key="subject")
+
+    def test_table(self, tmp_path, study):
+        """Blocks streaming or joining the same table share a shard; joined-only tables go to every shard."""
+        spec, inputs = study
+        groups = table_groups(entity_derivations([spec], "E"), {"a", "b", "c", "lookup"})
+        assert [(blocks, sorted(read)) for blocks, read in groups] == [
+            ([0, 2], ["a", "c", "lookup"]),
+            ([1], ["b", "lookup"]),
+        ]
+        assert assign_groups(groups, 3, inputs) == [{"a", "c", "lookup"}, {"b", "lookup"}, set()]
+        dirs = [split([spec], "E", inputs, tmp_path / f"s{k}", k, 3, by="table") for k in (1, 2, 3)]
+        assert [sorted(p.name for p in d.iterdir()) for d in dirs] == [
+            ["a.tsv", "c.tsv", "lookup.tsv"],
+            ["b.tsv", "lookup.tsv"],
+            [],
+        ]
+
+    def test_refuses_entity_without_tables(self, tmp_path, study):
+        """An entity the specs do not derive, or whose tables are not in the input directory, cannot be split."""
+        spec, inputs = study
+        with pytest.raises(ShardError, match="no class derivation of Missing"):
+            split([spec], "Missing", inputs, tmp_path / "s", 1, 2)
+        spec.write_text("class_derivations:\n  - E:\n      populated_from: absent\n")
+        for by in ("hash", "table"):
+            with pytest.raises(ShardError, match=r"No input table of E \(absent\)"):
+                split([spec], "E", inputs, tmp_path / "s", 1, 2, by=by)
+
+    def test_compact_spec(self, tmp_path, study):
+        """Merged specs list class derivations as compact ``{E: body}`` entries; they are split the same way."""
+        spec, inputs = study
+        spec.write_text("class_derivations:\n  - E:\n      populated_from: a\n  - E:\n      populated_from: b\n")
+        dirs = [split([spec], "E", inputs, tmp_path / f"s{k}", k, 2) for k in (1, 2)]
+        assert sorted(row for d in dirs for row in _rows(d / "a.tsv")) == sorted(_rows(inputs / "a.tsv"))
+        assert all((d / "b.tsv").exists() for d in dirs)
+
+
+class TestMerge:
+    """Shard outputs, logs and resource records merge into the entity's."""
+
+    def test_formats(self, tmp_path):
+        """TSV parts merge under the union of their headers; JSON arrays, JSONL and YAML concatenate."""
+        parts = [tmp_path / "1", tmp_path / "2", tmp_path / "3"]
+        for part in parts:
+            part.mkdir()
+        (parts[0] / "o.tsv").write_text("id\tx\n1\ta\n")
+        (parts[1] / "o.tsv").write_text("id\ty\tx\n2\tb\tc\n")
+        (parts[2] / "o.tsv").write_text("")
+        (parts[0] / "o.json").write_text('[\n{\n  "id": 1\n}\n]\n')
+        (parts[1] / "o.json").write_text("[\n\n]\n")
+        (parts[2] / "o.json").write_text('[\n{\n  "id": 3\n}\n]\n')
+        for i, part in enumerate(parts):
+            (part / "o.yaml").write_text(f"id: {i}\n---\n")
+        for name in ("o.tsv", "o.json", "o.yaml"):
+            merge_outputs([p / name for p in parts], tmp_path / name)
+        assert (tmp_path / "o.tsv").read_text() == "id\tx\ty\n1\ta\t\n2\tc\tb\n"
+        assert json.loads((tmp_path / "o.json").read_text()) == [{"id": 1}, {"id": 3}]
+        assert (tmp_path / "o.yaml").read_text() == "id: 0\n---\nid: 1\n---\nid: 2\n---\n"
+
+    def test_logs_and_resources(self, tmp_path):
+        """The entity log holds every shard's and the worst exit code; CPU adds up and peaks take the max."""
+        shard_dirs = []
+        for k, (code, cpu) in enumerate([(0, 1.5), (1, 2.0)], 1):
+            shard_dir = tmp_path / str(k)
+            shard_dir.mkdir()
+            (shard_dir / "map.log").write_text(f"  - row error\nmap-data 'E' shard {k} exited with code {code}\n")
+            (shard_dir / "o.jsonl").write_text("{}\n" * k)
+            EntityResources("E", "linkml-map", code, wall_seconds=k, cpu_user_seconds=cpu, peak_rss_bytes=k).write(
+                shard_dir
+            )
+            shard_dirs.append(shard_dir)
+        logs = tmp_path / "logs"
+        assert merge("E", shard_dirs, [tmp_path / "o.jsonl"], logs) == 1
+        log = (logs / "E.log").read_text()
+        assert log.count("row error") == 2 and log.endswith("map-data 'E' exited with code 1\n")
+        record = load_resources(logs)["E"]
+        assert record["shards"] == 2 and record["cpu_user_seconds"] == 3.5
+        assert (record["wall_seconds"], record["peak_rss_bytes"], record["rows_written"]) == (2, 2, 3)
+
+    def test_missing_shard_output(self, tmp_path, capsys):
+        """A shard that wrote no file of an output fails the merge, and the CLI exits non-zero."""
+        shard_dirs = [tmp_path / "1", tmp_path / "2"]
+        for shard_dir in shard_dirs:
+            shard_dir.mkdir()
+        (shard_dirs[0] / "o.jsonl").write_text("{}\n")
+        with pytest.raises(ShardError, match="shard 2 wrote no o.jsonl"):
+            merge("E", shard_dirs, [tmp_path / "o.jsonl"], tmp_path / "logs")
+        assert not (tmp_path / "o.jsonl").exists()
+        args = ["merge", "--entity", "E", "-T", str(tmp_path), "--input-dir", str(tmp_path), "--log-dir", "logs"]
+        args += [f"--shard-dir={d}" for d in shard_dirs] + ["--output", str(tmp_path / "o.jsonl")]
+        assert main(args) == 1
+        assert "shard 2 wrote no o.jsonl" in capsys.readouterr().err
+
+
+def test_matches_unsharded(tmp_path):
+    """Toy Person records mapped in three hash shards are those of an unsharded linkml-map run."""
+    input_dir = TOY / "data" / "pre_cleaned"
+    schema = tmp_path / "schema.yaml"
+    inferred = infer_schema(sorted(input_dir.glob("*.tsv")), "Toy", enum_threshold=1.0, max_enum_size=0)
+    write_schema(inferred.schema, schema)
+    specs = TOY / "pre_cleaned" / "specs"
+
+    def map_person(inputs, out):
+        args = ["map-data", "-T", f"{specs}/", "--entity", "Person", "-s", str(schema), "-o", str(out / "p.tsv")]
+        result = click.testing.CliRunner().invoke(linkml_map, [*args, "-O", str(out / "p.jsonl"), str(inputs)])
+        assert result.exit_code == 0, result.output
+
+    (tmp_path / "whole").mkdir()
+    map_person(input_dir, tmp_path / "whole")
+    shard_dirs = []
+    for k in (1, 2, 3):
+        shard_dir = tmp_path / "shards" / str(k)
+        map_person(split([specs], "Person", input_dir, shard_dir / "input", k, 3), shard_dir)
+        (shard_dir / "map.log").write_text(f"map-data 'Person' shard {k} exited with code 0\n")
+        shard_dirs.append(shard_dir)
+    assert merge("Person", shard_dirs, [tmp_path / "p.tsv", tmp_path / "p.jsonl"], tmp_path / "logs") == 0
+    for name in ("p.tsv", "p.jsonl"):
+        merged, whole = (tmp_path / name).read_text(), (tmp_path / "whole" / name).read_text()
+        assert merged != whole and sorted(merged.splitlines()) == sorted(whole.splitlines())
@@ -7,7 +7,8 @@ from unittest.mock import patch
 
 import yaml
 
-from dm_bip.provenance import generate_provenance, get_build_info
+from dm_bip.map_data.resources import EntityResources
+from dm_bip.provenance import add_map_resources, generate_provenance, get_build_info
 
 
 def test_get_build_info_from_env():
@@ -95,6 +96,31 @@ def test_generate_provenance_empty_params_omitted(tmp_path):
     assert "timestamp" in data["pipeline"]
 
 
+def test_generate_provenance_map_resources(tmp_path):
+    """Per-entity map resource records are rolled up with run totals."""
+    logs = tmp_path / "logs"
+    EntityResources("Person", "dm-bip", wall_seconds=1.5, rows_read=10, rows_written=10, peak_rss_bytes=100).write(logs)
+    EntityResources("Killed", "dm-bip", exit_code=137).write(logs)
+    output = tmp_path / "provenance.yaml"
+    generate_provenance(output_path=output, no_external_repos=True, map_resources_dir=logs)
+    resources = yaml.safe_load(output.read_text())["map_resources"]
+    assert resources["entities"]["Person"]["rows_written"] == 10
+    assert resources["entities"]["Killed"]["exit_code"] == 137
+    assert resources["totals"] == {"wall_seconds": 1.5, "rows_read": 10, "rows_written": 10, "max_peak_rss_bytes": 100}
+
+
+def test_add_map_resources_keeps_other_sections(tmp_path):
+    """Updating after the map step replaces only the map_resources section."""
+    output = tmp_path / "provenance.yaml"
+    generate_provenance(output_path=output, schema_name="Toy", no_external_repos=True, map_resources_dir=tmp_path)
+    assert "map_resources" not in yaml.safe_load(output.read_text())
+    EntityResources("Person", "linkml-map", output_bytes=42).write(tmp_path / "logs")
+    add_map_resources(output, tmp_path / "logs")
+    data = yaml.safe_load(output.read_text())
+    assert data["pipeline"]["schema_name"] == "Toy"
+    assert data["map_resources"]["totals"] == {"output_bytes": 42}
+
+
 def test_version_env_fallback():
     """__version__ falls back to DM_BIP_VERSION when package version is 0.0.0."""
     import importlib
@@ -0,0 +1,137 @@
+"""Tests for dm_bip.schema_gen (schema inference from cached column profiles)."""
+
+from pathlib import Path
+
+import pytest
+from linkml_runtime.utils.schema_as_dict import schema_as_dict
+from schema_automator.generalizers.csv_data_generalizer import CsvDataGeneralizer
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.schema_gen.infer import infer_schema
+from dm_bip.schema_gen.profiles import ProfileCache, profile_table
+
+REPO = Path(__file__).parents[2]
+TOY_FILES = sorted((REPO / "toy_data" / "data" / "pre_cleaned").glob("*.tsv"))
+
+MIXED = (
+    "row_id\tcode\ttags\twhen\tflag\tcurie\tnote\tcode\tempty\n"
+    "1\ta\tx|y\t2020-01-01\ttrue\tHP:1\t12 kg\tA\t\n"
+    "2\tb\tx\t2020-01-02T10:30:00\tfalse\tHP:2\t3 cm\tB\n"
+    "\n"
+    "3\tc\ty|\t2020-02-03\ttrue\tHP:3\t5 kg\tA\t\n"
+    "4\n"
+)
+
+
+def _as_dict(schema):
+    """Return a schema as plain data, with enum permissible values in a fixed order."""
+    data = schema_as_dict(schema)
+    for enum in data.get("enums", {}).values():
+        enum["permissible_values"] = dict(sorted(enum["permissible_values"].items()))
+    return data
+
+
+def _generalize_tsvs(files, enum_threshold, max_enum_size):
+    generalizer = CsvDataGeneralizer(enum_threshold=enum_threshold, max_enum_size=max_enum_size)
+    return generalizer.convert_multiple([str(f) for f in files], schema_name="Toy")
+
+
+@pytest.fixture
+def mixed(tmp_path):
+    """Write a table exercising duplicate headers, short rows, multivalued values, dates, booleans and CURIEs."""
+    path = tmp_path / "mixed.tsv"
+    path.write_text(MIXED)
+    return path
+
+
+class TestProfile:
+    """Profiles record value kinds, counts and (bounded) distinct values per column."""
+
+    def test_column_statistics(self, mixed):
+        """Blank lines are skipped, short rows count as empty cells and the last duplicate column wins."""
+        profile = profile_table(mixed, max_distinct=2)
+        columns = {column.name: column for column in profile.columns}
+        assert profile.rows == 4
+        assert list(columns) == ["row_id", "code", "tags", "when", "flag", "curie", "note", "empty"]
+        assert columns["code"].distinct_values == ["A", "B"]
+        assert columns["tags"].multivalued and columns["tags"].kinds == {"string": [2, 4], "empty": [1, 1]}
+        assert columns["when"].range == "datetime"
+        assert columns["flag"].range == "boolean"
+        assert columns["curie"].range == "HP identifier"
+        assert columns["row_id"].distinct_values is None and columns["row_id"].unique
+        assert profile.null_ratio(columns["empty"]) == 1.0
+
+
+class TestMatchesGeneralizeTsvs:
+    """The assembled schema is the one schema-automator infers from the full tables."""
+
+    @pytest.mark.parametrize(("enum_threshold", "max_enum_size"), [(1.0, 0), (0.5, 20), (0.1, 50)])
+    def test_toy_data(self, enum_threshold, max_enum_size):
+        """Ranges, enums, identifiers, unique keys and examples agree on the toy data."""
+        expected = _generalize_tsvs(TOY_FILES, enum_threshold, max_enum_size)
+        result = infer_schema(TOY_FILES, "Toy", enum_threshold=enum_threshold, max_enum_size=max_enum_size)
+        assert _as_dict(result.schema) == _as_dict(expected)
+
+    def test_edge_cases(self, mixed):
+        """Quirky tables, measurements and CURIE types agree too."""
+        files = [mixed, TOY_FILES[0]]
+        expected = _generalize_tsvs(files, 0.9, 5)
+        assert _as_dict(infer_schema(files, "Toy", enum_threshold=0.9, max_enum_size=5).schema) == _as_dict(expected)
+
+
+class TestParallel:
+    """Profiling across worker processes gives the same schema as a serial run."""
+
+    def test_workers_match_serial(self, tmp_path, mixed):
+        """Classes keep input order, shared slots keep their first definition, and the cache is filled."""
+        files = [*TOY_FILES, mixed]
+        serial = infer_schema(files, "Toy", enum_threshold=0.5, max_enum_size=20)
+        pooled = infer_schema(files, "Toy", enum_threshold=0.5, max_enum_size=20, workers=3, cache_dir=tmp_path)
+        assert _as_dict(pooled.schema) == _as_dict(serial.schema)
+        assert list(pooled.schema.classes) == [path.stem for path in files]
+        assert pooled.profiled == files
+        assert infer_schema(files, "Toy", workers=3, cache_dir=tmp_path, max_enum_size=20).profiled == []
+
+    def test_class_names_match_validation(self, tmp_path):
+        """Classes are named as validation targets them, so capitalized or hyphenated file names still validate."""
+        path = tmp_path / "Blood-Pressure.tsv"
+        path.write_text("id\tsbp\n1\t120\n")
+        assert list(infer_schema([path], "Toy").schema.classes) == ["blood_pressure"]
+
+
+class TestProfileCache:
+    """Only files whose content changed are profiled again."""
+
+    def test_reuse_and_invalidate(self, tmp_path):
+        """A rerun reads nothing; an edited file, or a larger enum limit, is re-profiled; stale profiles go."""
+        files = []
+        for source in TOY_FILES:
+            files.append(tmp_path / source.name)
+            files[-1].write_bytes(source.read_bytes())
+        cache_dir = tmp_path / "profiles"
+        kwargs = {"enum_threshold": 0.5, "max_enum_size": 5, "cache_dir": cache_dir}
+
+        first = infer_schema(files, "Toy", **kwargs)
+        assert first.profiled == files
+        assert infer_schema(files, "Toy", **kwargs).profiled == []
+
+        old_key = ProfileCache.key(files[0])
+        text = files[0].read_text()
+        files[0].write_text(text + text.splitlines()[1] + "\n")
+        rerun = infer_schema(files, "Toy", **kwargs)
+        assert rerun.profiled == [files[0]]
+        assert not (cache_dir / f"{old_key}.json").exists()
+
+        wider = infer_schema(files, "Toy", **{**kwargs, "max_enum_size": 500})
+        assert wider.profiled
+        assert _as_dict(wider.schema) == _as_dict(_generalize_tsvs(files, 0.5, 500))
+
+    def test_cli(self, tmp_path):
+        """`dm-bip infer-schema` writes the schema and reports cache use."""
+        output = tmp_path / "Toy.yaml"
+        args = ["infer-schema", "-n", "Toy", "-o", str(output), "--cache-dir", str(tmp_path / "profiles")]
+        result = CliRunner().invoke(app, [*args, *map(str, TOY_FILES)])
+        assert result.exit_code == 0, result.output
+        assert f"Profiled {len(TOY_FILES)} of {len(TOY_FILES)} file(s)" in result.output
+        assert output.read_text().startswith("name: Toy\n")
@@ -0,0 +1,74 @@
+"""Tests for dm_bip.trans_spec_gen.spec_builders (template-free trans-spec construction)."""
+
+import json
+from pathlib import Path
+
+import pytest
+import yaml
+from linkml_map.utils.spec_merge import load_and_merge_specs
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.trans_spec_gen.generate_trans_specs import ENTITY_REGISTRY, _get_template, generate_batch, load_metadata
+from dm_bip.trans_spec_gen.spec_builders import SPEC_BUILDERS, build_entity_spec, generate_merged_specs
+
+INPUT_DIR = Path(__file__).parents[1] / "input" / "make_yaml"
+SAMPLES = [
+    ("MeasurementObservation", INPUT_DIR / "shortdata_sample.csv"),
+    ("Condition", INPUT_DIR / "condition_sample.csv"),
+]
+
+
+class TestBuildersMatchTemplates:
+    """Each builder produces exactly what parsing its template's output yields."""
+
+    @pytest.mark.parametrize(("entity", "csv_path"), SAMPLES)
+    def test_every_sample_row(self, entity, csv_path):
+        """For every sample record, builder output equals the parsed template render."""
+        template = _get_template(ENTITY_REGISTRY[entity].template)
+        records = [r for r in load_metadata(csv_path).to_dict("records") if r["bdchm_entity"] == entity]
+        assert records
+        for record in records:
+            rendered = yaml.safe_load(template.render(**record))
+            assert rendered == [{"class_derivations": SPEC_BUILDERS[entity](record)}], record["bdchm_varname"]
+
+    def test_unknown_entity(self):
+        """Entities without a builder are rejected."""
+        with pytest.raises(ValueError, match="No spec builder"):
+            build_entity_spec("Nonexistent", [])
+
+
+class TestMergedSpecs:
+    """One merged spec per entity loads the same as the per-variable template files."""
+
+    @pytest.mark.parametrize("fmt", ["yaml", "json"])
+    @pytest.mark.parametrize(("entity", "csv_path"), SAMPLES)
+    def test_matches_merged_template_files(self, tmp_path, entity, csv_path, fmt):
+        """linkml-map's loader sees identical class derivations from either route."""
+        generate_batch(csv_path, tmp_path / "templated", entities=[entity], layout="{quality}/{cohort}/{varname}.yaml")
+        written = generate_merged_specs(csv_path, tmp_path / "merged", entities=[entity], fmt=fmt)
+        assert written == {entity: tmp_path / "merged" / f"{entity}.{fmt}"}
+
+        expected = load_and_merge_specs((tmp_path / "templated" / "good",))
+        assert load_and_merge_specs((written[entity],)) == expected
+
+    def test_json_output_is_plain_json(self, tmp_path):
+        """JSON specs parse with the json module and keep the compact class-derivation form."""
+        path = generate_merged_specs(SAMPLES[0][1], tmp_path, fmt="json")["MeasurementObservation"]
+        spec = json.loads(path.read_text())
+        assert all(list(cd) == ["MeasurementObservation"] for cd in spec["class_derivations"])
+
+    def test_rejects_unknown_format(self, tmp_path):
+        """Only yaml and json are supported."""
+        with pytest.raises(ValueError, match="Unknown spec format"):
+            generate_merged_specs(SAMPLES[0][1], tmp_path, fmt="toml")
+
+    def test_cli_merged_option(self, tmp_path):
+        """`generate-trans-specs --merged json` writes one spec per entity."""
+        result = CliRunner().invoke(
+            app,
+            ["generate-trans-specs", "-i", str(SAMPLES[0][1]), "-o", str(tmp_path), "-c", "all", "--merged", "json"],
+        )
+        assert result.exit_code == 0, result.output
+        assert "Wrote 1 merged spec(s)" in result.output
+        assert (tmp_path / "MeasurementObservation.json").exists()
@@ -0,0 +1,125 @@
+"""Tests for dm_bip.trace (local JSONL pipeline traces)."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from dm_bip import trace
+from dm_bip.cli import app
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    """Turn tracing on for the test, writing to a fresh file."""
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setenv(trace.TRACE_ENV, str(path))
+    monkeypatch.delenv(trace.PARENT_ENV, raising=False)
+    return path
+
+
+def _record(path, event, span_id, ts, **fields):
+    with open(path, "a") as f:
+        f.write(json.dumps({"event": event, "id": span_id, "ts": ts, **fields}) + "\n")
+
+
+class TestSpans:
+    """Spans are start and end lines; nesting follows the open span."""
+
+    def test_nested_and_failed(self, trace_file):
+        """A span opened inside another is its child; an exception marks the span as an error."""
+        with trace.span("dm-bip map", "map") as outer:
+            with trace.span("map entity", "map", entity="Person") as inner:
+                inner["rows"] = 3
+            with pytest.raises(ValueError), trace.span("map entity", "map", entity="Bad"):
+                raise ValueError("boom")
+            outer["status"] = "ok"
+        spans = {s.label: s for s in trace.load_spans(trace_file)}
+        root = spans["dm-bip map"]
+        assert root.parent is None and [c.label for c in root.children] == ["map entity [Person]", "map entity [Bad]"]
+        assert spans["map entity [Person]"].attrs == {"entity": "Person", "rows": 3}
+        assert spans["map entity [Bad]"].status == "error"
+
+    def test_off_without_trace_file(self, tmp_path, monkeypatch):
+        """Without DM_TRACE_FILE nothing is written."""
+        monkeypatch.delenv(trace.TRACE_ENV, raising=False)
+        with trace.span("x", "y"):
+            pass
+        assert trace.start_span("x", "y") is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_run_command(self, trace_file):
+        """A wrapped command's exit code is passed through, and its own spans nest under the wrapper's."""
+        code = "from dm_bip import trace\nwith trace.span('inner', 'lint'):\n    pass\nraise SystemExit(4)"
+        assert trace.main(["run", "--stage", "lint", "--file", "a.tsv", "--", sys.executable, "-c", code]) == 4
+        (outer,) = [s for s in trace.load_spans(trace_file) if s.parent is None]
+        assert outer.name == Path(sys.executable).name
+        assert (outer.stage, outer.exit_code, outer.status) == ("lint", 4, "error")
+        assert outer.attrs == {"file": "a.tsv"} and [c.name for c in outer.children] == ["inner"]
+
+    def test_killed_command(self, trace_file):
+        """A command killed by a signal exits 128 + N; a process killed mid-span leaves it unfinished."""
+        assert trace.run_command(["sh", "-c", "kill -9 $$"], "sh", "map") == 137
+        _record(trace_file, "start", "lost", 1e10, name="linkml-map", stage="map", pid=1)
+        spans = {s.id: s for s in trace.load_spans(trace_file)}
+        assert spans["lost"].status == "unfinished"
+        assert [s.exit_code for s in spans.values() if s.id != "lost"] == [137]
+
+
+class TestReport:
+    """The report finds the critical path and exports Chrome trace events."""
+
+    @pytest.fixture
+    def pipeline_trace(self, tmp_path):
+        """Write a trace: schema, then two parallel validations, then map with one slow entity."""
+        path = tmp_path / "trace.jsonl"
+        steps = [
+            ("schema", "schemauto", None, 0, 2, {}),
+            ("va", "linkml validate", None, 2, 3, {"file": "a.tsv"}),
+            ("vb", "linkml validate", None, 2, 6, {"file": "b.tsv"}),
+            ("map", "dm-bip map", None, 6, 10, {}),
+            ("person", "map entity", "map", 6, 7, {"entity": "Person"}),
+            ("measure", "map entity", "map", 6, 10, {"entity": "Measurement"}),
+        ]
+        for span_id, name, parent, start, end, attrs in steps:
+            stage = {"schema": "schema", "va": "validation", "vb": "validation"}.get(span_id, "map")
+            _record(path, "start", span_id, start, name=name, stage=stage, parent=parent, pid=1, attrs=attrs)
+            _record(path, "end", span_id, end, status="ok", exit_code=0)
+        return path
+
+    def test_critical_path(self, pipeline_trace):
+        """The slower validation and the slowest entity are on the path; the parallel ones are not."""
+        spans = trace.load_spans(pipeline_trace)
+        roots = [s for s in spans if s.parent is None]
+        assert [s.id for s in trace.critical_path(roots)] == ["schema", "vb", "map"]
+        summary = trace.stage_summary(spans)
+        assert summary["validation"] == {"spans": 2, "busy_seconds": 5, "wall_seconds": 4, "failed": 0}
+        report = trace.format_report(spans)
+        assert "Critical path (10.0s of 10.0s)" in report
+        assert "map: map entity [Measurement]" in report and "[Person]" not in report
+
+    def test_cli_chrome_export(self, tmp_path, pipeline_trace):
+        """`dm-bip trace report` reads the newest trace in a directory and writes Chrome trace events."""
+        chrome = tmp_path / "chrome.json"
+        result = CliRunner().invoke(app, ["trace", "report", str(tmp_path), "--chrome", str(chrome)])
+        assert result.exit_code == 0, result.output
+        assert "Critical path" in result.output
+        events = json.loads(chrome.read_text())["traceEvents"]
+        measurement = next(e for e in events if e["name"] == "map entity [Measurement]")
+        assert (measurement["ph"], measurement["ts"], measurement["dur"]) == ("X", 6_000_000, 4_000_000)
+
+
+class TestCommandSpans:
+    """Every dm-bip command records a span with its exit code."""
+
+    def test_command_span(self, trace_file):
+        """A successful command ends ok; a usage error ends with its exit code."""
+        assert CliRunner().invoke(app, ["run"]).exit_code == 0
+        CliRunner().invoke(app, ["map", "-T", "x", "-s", "y", "-o", "z", "--memory-budget", "lots", "in"])
+        spans = trace.load_spans(trace_file)
+        assert [(s.name, s.stage, s.status, s.exit_code) for s in spans] == [
+            ("dm-bip run", "run", "ok", 0),
+            ("dm-bip map", "map", "error", 2),
+        ]
@@ -0,0 +1,86 @@
+"""Tests for dm_bip.validation.columns (vectorized range/enum checks)."""
+
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.validation.columns import ColumnCheck, column_validate, compile_class
+from dm_bip.validation.runner import SchemaValidator
+from dm_bip.validation.streaming import StreamOptions, stream_validate
+
+FIXTURES = Path(__file__).parents[1] / "input" / "validation"
+MEASUREMENTS = FIXTURES / "measurements.tsv"
+
+
+@pytest.fixture(scope="module")
+def validator():
+    """Load the all-ranges fixture schema once."""
+    return SchemaValidator(FIXTURES / "types_schema.yaml")
+
+
+class TestCompile:
+    """Slot ranges compile to one check per column."""
+
+    def test_compiled_checks(self, validator):
+        """Ranges, enums, patterns, bounds and requiredness are all picked up."""
+        checks = compile_class(validator.schema_view, "measurements")
+        assert checks["id"] == ColumnCheck("id", kind="integer", required=True)
+        assert checks["count"] == ColumnCheck("count", kind="integer", minimum=0)
+        assert checks["score"] == ColumnCheck("score", kind="number", maximum=10)
+        assert checks["recorded_at"].kind == "date-time"
+        assert checks["sex"] == ColumnCheck("sex", enum=("M", "F"))
+        assert checks["code"] == ColumnCheck("code", pattern="^[A-Z]+$")
+        assert checks["site"] == ColumnCheck("site", required=True)
+
+
+class TestParityWithRowValidation:
+    """Column checks report exactly what row-by-row JSON Schema validation reports."""
+
+    @pytest.mark.parametrize("chunk_size", [10_000, 2])
+    def test_every_range(self, validator, chunk_size):
+        """Coercion quirks, formats, bounds, enums, patterns, required and extra columns all agree."""
+        options = StreamOptions(chunk_size=chunk_size)
+        columns = column_validate(validator, MEASUREMENTS, "measurements", options)
+        rows = stream_validate(validator, MEASUREMENTS, "measurements", options)
+        assert columns.rows_checked == rows.rows_checked == 5
+        assert columns.groups == rows.groups
+        assert columns.format() == rows.format()
+
+    def test_fixture_schema(self):
+        """The pipeline fixture tables agree too, including a missing required column."""
+        validator = SchemaValidator(FIXTURES / "schema.yaml")
+        for name, target_class in [("blood_pressure.tsv", "blood_pressure"), ("demographics.tsv", "demographics")]:
+            columns = column_validate(validator, FIXTURES / name, target_class)
+            assert columns.groups == stream_validate(validator, FIXTURES / name, target_class).groups
+
+    def test_missing_required_column(self, tmp_path, validator):
+        """A required column absent from the header fails every row."""
+        path = tmp_path / "measurements.tsv"
+        path.write_text("id\tcount\n1\t2\n2\t3\n")
+        report = column_validate(validator, path, "measurements")
+        assert report.groups == stream_validate(validator, path, "measurements").groups
+        assert report.groups[("site", "required")].rows == [1, 2]
+
+
+def test_caps_apply_per_chunk(tmp_path, validator):
+    """Caps stop reading at the end of the chunk in which they are reached."""
+    path = tmp_path / "measurements.tsv"
+    path.write_text("id\tsite\n" + "".join(f"x{n}\ts\n" for n in range(100)))
+    report = column_validate(validator, path, "measurements", StreamOptions(chunk_size=30, max_column_errors=40))
+    assert report.rows_checked == 60
+    assert report.stop_reason == "column id reached 40 error(s) by row 60"
+
+
+def test_cli_columns_option(tmp_path):
+    """`dm-bip validate --columns` logs the grouped report and refuses --sample."""
+    out = tmp_path / "out"
+    args = ["validate", "-s", str(FIXTURES / "types_schema.yaml"), "-o", str(out), "--input-dir", str(FIXTURES)]
+    result = CliRunner().invoke(app, [*args, "--columns", str(MEASUREMENTS)])
+    assert result.exit_code == 0, result.output
+    log = (out / "data-validation-errors" / "measurements.tsv" / "latest-error.log").read_text()
+    assert "[ERROR] sex: enum x1 (rows 2)" in log
+
+    result = CliRunner().invoke(app, [*args, "--columns", "--sample", "5%", str(MEASUREMENTS)])
+    assert result.exit_code == 2
@@ -0,0 +1,116 @@
+"""Tests for dm_bip.validation.fingerprints (per-class schema digests and validation stamps)."""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from linkml_runtime import SchemaView
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.validation.fingerprints import DIGEST_CACHE_NAME, class_fingerprints, write_validation_stamps
+
+FIXTURES = Path(__file__).parents[1] / "input" / "validation"
+SCHEMA = (FIXTURES / "schema.yaml").read_text()
+
+
+def _fingerprints(text):
+    return class_fingerprints(SchemaView(text))
+
+
+class TestClassFingerprint:
+    """A class's fingerprint changes with what validates against it, and nothing else."""
+
+    def test_documentation_is_ignored(self):
+        """Descriptions, examples and sharing slots with a new class leave fingerprints unchanged."""
+        documented = SCHEMA.replace("  age:\n    range: integer", "  age:\n    description: Age\n    range: integer")
+        documented = documented.replace("    range: float", "    range: float\n    examples:\n    - value: '120.5'")
+        documented = documented.replace("enums:", "  visits:\n    slots:\n    - id\n    - visit_date\nenums:")
+        fingerprints = _fingerprints(documented)
+        assert fingerprints.pop("visits")
+        assert fingerprints == _fingerprints(SCHEMA)
+
+    def test_only_affected_classes_change(self):
+        """Changing a slot range or an enum changes the fingerprint of the classes that use it."""
+        base = _fingerprints(SCHEMA)
+        retyped = _fingerprints(SCHEMA.replace("  sbp:\n    range: float", "  sbp:\n    range: integer"))
+        assert retyped["blood_pressure"] != base["blood_pressure"]
+        assert retyped["demographics"] == base["demographics"]
+
+        enum_changed = _fingerprints(SCHEMA + "      U:\n")
+        assert enum_changed["demographics"] != base["demographics"]
+        assert enum_changed["blood_pressure"] == base["blood_pressure"]
+
+    def test_required_slot_changes_fingerprint(self):
+        """Making a slot required changes the fingerprint."""
+        required = SCHEMA.replace("  age:\n    range: integer", "  age:\n    range: integer\n    required: true")
+        assert _fingerprints(required)["demographics"] != _fingerprints(SCHEMA)["demographics"]
+
+
+class TestValidationStamps:
+    """Stamps are only rewritten when a file's content or its class's fingerprint changes."""
+
+    @pytest.fixture
+    def inputs(self, tmp_path):
+        """Copy the fixture schema and data files; return (schema, input_dir, files)."""
+        input_dir = tmp_path / "input"
+        shutil.copytree(FIXTURES, input_dir)
+        return input_dir / "schema.yaml", input_dir, [input_dir / "demographics.tsv", input_dir / "blood_pressure.tsv"]
+
+    def _stamp(self, schema, files, stamp_dir, input_dir):
+        return write_validation_stamps(SchemaView(str(schema)), schema, files, stamp_dir, input_dir)
+
+    def test_rewritten_only_on_change(self, tmp_path, inputs):
+        """New stamps take their dependencies' mtime; unchanged stamps are left alone."""
+        schema, input_dir, files = inputs
+        stamp_dir = tmp_path / "stamps"
+        old = 1_000_000_000 * 10**9
+        for path in [schema, *files]:
+            os.utime(path, ns=(old, old))
+
+        assert self._stamp(schema, files, stamp_dir, input_dir) == {
+            "demographics.tsv": True,
+            "blood_pressure.tsv": True,
+        }
+        assert (stamp_dir / "demographics.tsv.sha256").stat().st_mtime_ns == old
+
+        os.utime(schema)
+        os.utime(files[0])
+        assert self._stamp(schema, files, stamp_dir, input_dir) == {
+            "demographics.tsv": False,
+            "blood_pressure.tsv": False,
+        }
+
+        files[1].write_text(files[1].read_text() + "9\t110.0\t70\n")
+        assert self._stamp(schema, files, stamp_dir, input_dir) == {
+            "demographics.tsv": False,
+            "blood_pressure.tsv": True,
+        }
+
+    def test_input_digests_cached(self, tmp_path, inputs):
+        """Input digests are cached by size and mtime, so unchanged files are not re-read."""
+        schema, input_dir, files = inputs
+        stamp_dir = tmp_path / "stamps"
+        self._stamp(schema, files, stamp_dir, input_dir)
+        cache = json.loads((stamp_dir / DIGEST_CACHE_NAME).read_text())
+        assert set(cache) == {str(path) for path in files}
+
+        cache[str(files[0])][2] = "0" * 64
+        (stamp_dir / DIGEST_CACHE_NAME).write_text(json.dumps(cache))
+        assert self._stamp(schema, files, stamp_dir, input_dir)["demographics.tsv"] is True
+
+    def test_cli_matches_runner_stamps(self, tmp_path, inputs):
+        """`dm-bip validation-stamps` writes the same stamps `dm-bip validate` does."""
+        from dm_bip.validation.runner import VALIDATION_STAMPS_DIR, validate_inputs
+
+        schema, input_dir, files = inputs
+        validate_inputs(schema, files, tmp_path / "out", input_dir=input_dir)
+        args = ["validation-stamps", "-s", str(schema), "--stamp-dir", str(tmp_path / "out" / VALIDATION_STAMPS_DIR)]
+        result = CliRunner().invoke(app, [*args, "--input-dir", str(input_dir), *map(str, files)])
+        assert result.exit_code == 0, result.output
+        assert "0 of 2 validation stamp(s) changed." in result.output
+
+        result = CliRunner().invoke(app, ["schema-fingerprints", str(schema), "-c", "demographics"])
+        assert result.output == f"demographics\t{_fingerprints(SCHEMA)['demographics']}\n"
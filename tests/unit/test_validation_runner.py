@@ -0,0 +1,141 @@
+"""Tests for dm_bip.validation.runner (in-process replacement for per-file `linkml validate`)."""
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner as ClickRunner
+from linkml.validator.cli import cli as linkml_validate
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.validation.runner import class_name_from_input, input_key, validate_inputs
+
+FIXTURES = Path(__file__).parents[1] / "input" / "validation"
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    """Copy the fixture schema and data files; return (schema, input_dir, files)."""
+    input_dir = tmp_path / "input"
+    shutil.copytree(FIXTURES, input_dir)
+    files = [
+        input_dir / "demographics.tsv",
+        input_dir / "blood_pressure.tsv",
+        input_dir / "cohort_a" / "demographics.tsv",
+    ]
+    return input_dir / "schema.yaml", input_dir, files
+
+
+def _validate(inputs, out, **kwargs):
+    schema, input_dir, files = inputs
+    return validate_inputs(schema, files, out, input_dir=input_dir, **kwargs)
+
+
+class TestLayout:
+    """The runner writes the same log/symlink layout as the Makefile's per-file rule."""
+
+    def test_success_and_failure_symlinks(self, tmp_path, inputs):
+        """Passing files get success.log; failing files get latest-error.log and an errors-dir link."""
+        out = tmp_path / "validation-logs"
+        run = _validate(inputs, out)
+
+        assert [r.status for r in run.results] == ["passed", "failed", "passed"]
+        assert (out / "input-files.txt").read_text() == (
+            "demographics.tsv\nblood_pressure.tsv\ncohort_a__demographics.tsv\n"
+        )
+        passed = out / "data-validation" / "cohort_a__demographics.tsv" / "success.log"
+        assert passed.is_symlink() and passed.read_text() == "No issues found\n"
+
+        failed = out / "data-validation" / "blood_pressure.tsv"
+        assert not (failed / "success.log").exists()
+        assert (failed / "latest-error.log").is_symlink()
+        error_dir = out / "data-validation-errors" / "blood_pressure.tsv"
+        assert error_dir.is_symlink() and error_dir.resolve() == failed.resolve()
+        assert (out / "_data_validation_complete").exists()
+
+    def test_log_matches_linkml_validate(self, tmp_path, inputs):
+        """Report lines are exactly what `linkml validate` prints for the same file."""
+        schema, _, files = inputs
+        run = validate_inputs(schema, files[1:2], tmp_path / "out")
+        expected = ClickRunner().invoke(
+            linkml_validate, ["--schema", str(schema), "--target-class", "blood_pressure", str(files[1])]
+        )
+        assert expected.exit_code == 1
+        assert run.results[0].log_path.read_text() == expected.output
+
+    def test_worker_pool_matches_serial(self, tmp_path, inputs):
+        """Validating across worker processes gives the same results and logs."""
+        serial = _validate(inputs, tmp_path / "serial")
+        pooled = _validate(inputs, tmp_path / "pooled", workers=2)
+        assert [r.status for r in pooled.results] == [r.status for r in serial.results]
+        assert [r.log_path.read_text() for r in pooled.results] == [r.log_path.read_text() for r in serial.results]
+
+
+class TestIncremental:
+    """Like make, files that already passed are skipped until their content or their class changes."""
+
+    def test_passed_files_skipped_failed_rerun(self, tmp_path, inputs):
+        """A rerun skips passing files and revalidates the failing one."""
+        out = tmp_path / "out"
+        _validate(inputs, out)
+        run = _validate(inputs, out)
+        assert [r.status for r in run.results] == ["up-to-date", "failed", "up-to-date"]
+
+    def test_schema_changes_revalidate_affected_classes(self, tmp_path, inputs):
+        """A rewritten schema only revalidates files whose class definition changed; force revalidates all."""
+        out = tmp_path / "out"
+        _validate(inputs, out)
+        assert [r.status for r in _validate(inputs, out, force=True).results] == ["passed", "failed", "passed"]
+
+        schema = inputs[0]
+        success = out / "data-validation" / "demographics.tsv" / "success.log"
+        newer = success.stat().st_mtime + 10
+        schema.write_text(schema.read_text().replace("description: Schema\n", "description: Regenerated\n"))
+        os.utime(schema, (newer, newer))
+        assert [r.status for r in _validate(inputs, out).results] == ["up-to-date", "failed", "up-to-date"]
+
+        schema.write_text(schema.read_text().replace("  age:\n    range: integer", "  age:\n    range: float"))
+        assert [r.status for r in _validate(inputs, out).results] == ["passed", "failed", "passed"]
+
+    def test_edited_input_revalidates_only_that_file(self, tmp_path, inputs):
+        """Touching an input without changing it is not enough; editing it is."""
+        out = tmp_path / "out"
+        _validate(inputs, out)
+        first, _, cohort = inputs[2]
+        newer = (out / "data-validation" / "demographics.tsv" / "success.log").stat().st_mtime + 10
+        os.utime(first, (newer, newer))
+        cohort.write_text(cohort.read_text() + "99\t40\tF\t2021-01-01\n")
+        assert [r.status for r in _validate(inputs, out).results] == ["up-to-date", "failed", "passed"]
+
+
+class TestStrictAndCli:
+    """Strict mode withholds the sentinel; the CLI mirrors the Makefile summary."""
+
+    def test_strict_skips_sentinel(self, tmp_path, inputs):
+        """With strict=True and a failure, the completion sentinel is not written."""
+        out = tmp_path / "out"
+        run = _validate(inputs, out, strict=True)
+        assert [r.key for r in run.failures] == ["blood_pressure.tsv"]
+        assert not (out / "_data_validation_complete").exists()
+
+    def test_cli_strict_exit_code(self, tmp_path, inputs):
+        """`dm-bip validate --strict` lists failing files and exits 1."""
+        schema, input_dir, files = inputs
+        args = ["validate", "-s", str(schema), "-o", str(tmp_path / "out"), "--input-dir", str(input_dir)]
+        result = CliRunner().invoke(app, [*args, "-j", "2", "--strict", *map(str, files)])
+        assert result.exit_code == 1, result.output
+        assert "Number of files with validation errors: 1" in result.output
+        assert "    blood_pressure.tsv" in result.output
+
+        lenient = CliRunner().invoke(app, [*args, *map(str, files[:1])])
+        assert lenient.exit_code == 0, lenient.output
+        assert "All files validated successfully." in lenient.output
+
+
+def test_keys_and_class_names():
+    """Keys strip the input directory textually; class names follow schema-automator's naming."""
+    assert input_key(Path("data/sub/study.tsv"), Path("data")) == "sub__study.tsv"
+    assert input_key(Path("other/study.tsv"), Path("data")) == "other__study.tsv"
+    assert class_name_from_input(Path("data/Blood-Pressure.tsv")) == "blood_pressure"
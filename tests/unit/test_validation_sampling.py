@@ -0,0 +1,104 @@
+"""Tests for dm_bip.validation.sampling (seeded row samples and header checks)."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.validation.runner import SchemaValidator, validate_inputs
+from dm_bip.validation.sampling import RowSample, header_errors
+from dm_bip.validation.streaming import StreamOptions, stream_validate
+
+FIXTURES = Path(__file__).parents[1] / "input" / "validation"
+ROWS = [(n, {"id": n}) for n in range(1, 1001)]
+
+
+@pytest.fixture(scope="module")
+def validator():
+    """Load the fixture schema once."""
+    return SchemaValidator(FIXTURES / "schema.yaml")
+
+
+def _selected(sample, name="table.tsv"):
+    return [n for n, _ in sample.select(iter(ROWS), Path(name))]
+
+
+class TestRowSample:
+    """Samples are parsed from DM_VALIDATE_SAMPLE values and are reproducible."""
+
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [("5%", RowSample(rate=0.05)), ("0.05", RowSample(rate=0.05)), ("1000", RowSample(count=1000))],
+    )
+    def test_parse(self, value, expected):
+        """Percentages and fractions are rates; integers are row counts."""
+        assert RowSample.parse(value) == expected
+
+    @pytest.mark.parametrize("value", ["0", "150%", "abc"])
+    def test_parse_rejects(self, value):
+        """Zero, rates above 1 and non-numbers are rejected."""
+        with pytest.raises(ValueError):
+            RowSample.parse(value)
+
+    @pytest.mark.parametrize("sample", [RowSample(rate=0.1), RowSample(count=50)])
+    def test_deterministic_per_seed_and_file(self, sample):
+        """The same seed and file name select the same rows; another seed or file selects others."""
+        rows = _selected(sample)
+        assert rows == _selected(sample) == sorted(rows)
+        assert rows != _selected(RowSample(rate=sample.rate, count=sample.count, seed=1))
+        assert rows != _selected(sample, name="other.tsv")
+
+    def test_count_and_rate_sizes(self):
+        """Count samples are exact (or the whole file); rate samples are close to the rate."""
+        assert len(_selected(RowSample(count=50))) == 50
+        assert len(_selected(RowSample(count=5000))) == 1000
+        assert 60 <= len(_selected(RowSample(rate=0.1))) <= 140
+
+
+class TestSampledValidation:
+    """Sampled runs validate a subset of rows but always check the header."""
+
+    def test_header_checked_in_full(self, tmp_path, validator):
+        """An always-empty unexpected column and a missing identifier column are reported from the header."""
+        path = tmp_path / "blood_pressure.tsv"
+        path.write_text("sbp\tdbp\tnote\n" + "".join(f"120.5\t{n}\t\n" for n in range(200)))
+        assert header_errors(validator, path, "blood_pressure") == [
+            ("note", "unexpected column", "Column 'note' is not a slot of blood_pressure"),
+            ("id", "missing column", "Required column 'id' is not in the header"),
+        ]
+        report = stream_validate(validator, path, "blood_pressure", StreamOptions(sample=RowSample(count=10)))
+        assert (report.rows_checked, report.rows_read) == (10, 200)
+        assert report.groups[("note", "unexpected column")].rows == []
+        assert report.groups[("id", "required")].count == 10
+        assert "(header)" in report.format()
+
+    def test_sampled_success_is_not_a_full_pass(self, tmp_path):
+        """A sampled pass links success.sample.log and its own sentinel, which a later full run does not accept."""
+        shutil.copytree(FIXTURES, tmp_path / "input")
+        schema, files = tmp_path / "input" / "schema.yaml", [tmp_path / "input" / "demographics.tsv"]
+        out = tmp_path / "out"
+        sampled = StreamOptions(sample=RowSample(rate=0.5))
+        kwargs = {"input_dir": tmp_path / "input"}
+        log_dir = out / "data-validation" / "demographics.tsv"
+
+        assert validate_inputs(schema, files, out, stream=sampled, **kwargs).results[0].status == "passed"
+        assert (log_dir / "success.sample.log").is_symlink() and not (log_dir / "success.log").exists()
+        assert (log_dir / "success.sample.log").read_text().startswith("No issues found (sampled ")
+        assert (out / "_data_validation_sampled").exists() and not (out / "_data_validation_complete").exists()
+        assert validate_inputs(schema, files, out, stream=sampled, **kwargs).results[0].status == "up-to-date"
+
+        assert validate_inputs(schema, files, out, **kwargs).results[0].status == "passed"
+        assert (log_dir / "success.log").is_symlink() and not (log_dir / "success.sample.log").exists()
+        assert validate_inputs(schema, files, out, stream=sampled, **kwargs).results[0].status == "up-to-date"
+
+    def test_cli_sample_option(self, tmp_path):
+        """`dm-bip validate --sample` reports the sample and rejects malformed sizes."""
+        args = ["validate", "-s", str(FIXTURES / "schema.yaml"), "-o", str(tmp_path / "out")]
+        result = CliRunner().invoke(app, [*args, "--sample", "2", str(FIXTURES / "demographics.tsv")])
+        assert result.exit_code == 0, result.output
+        assert "(sample: 2 rows, seed 0)" in result.output
+
+        result = CliRunner().invoke(app, [*args, "--sample", "lots", str(FIXTURES / "demographics.tsv")])
+        assert result.exit_code == 2
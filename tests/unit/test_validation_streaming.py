@@ -0,0 +1,98 @@
+"""Tests for dm_bip.validation.streaming (chunked validation with aggregate error reports)."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from dm_bip.cli import app
+from dm_bip.validation.runner import SchemaValidator
+from dm_bip.validation.streaming import StreamOptions, stream_validate
+
+FIXTURES = Path(__file__).parents[1] / "input" / "validation"
+
+
+@pytest.fixture(scope="module")
+def validator():
+    """Load the fixture schema once."""
+    return SchemaValidator(FIXTURES / "schema.yaml")
+
+
+@pytest.fixture
+def broken_tsv(tmp_path):
+    """Write a 300-row blood_pressure table: odd rows have a bad sbp, every row an unexpected column."""
+    path = tmp_path / "blood_pressure.tsv"
+    lines = ["id\tsbp\tdbp\tnote"]
+    lines += [f"{i}\t{'bad' if i % 2 else 120.5}\t80\tx" for i in range(1, 301)]
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+class TestAggregation:
+    """Errors are grouped by column and error type with counts and sample rows."""
+
+    def test_fixture_groups(self, validator):
+        """Each bad cell becomes one group naming the column, type and 1-based row."""
+        report = stream_validate(validator, FIXTURES / "blood_pressure.tsv", "blood_pressure")
+        assert not report.ok
+        assert report.rows_checked == 4
+        groups = {key: (g.count, g.rows) for key, g in report.groups.items()}
+        assert groups == {("dbp", "type"): (1, [2]), ("sbp", "type"): (1, [4])}
+
+    def test_counts_and_row_samples(self, validator, broken_tsv):
+        """Counts cover every error while only the first sample_rows row numbers are kept."""
+        report = stream_validate(validator, broken_tsv, "blood_pressure", StreamOptions(sample_rows=3))
+        assert report.rows_checked == 300
+        sbp = report.groups[("sbp", "type")]
+        assert (sbp.count, sbp.rows) == (150, [1, 3, 5])
+        note = report.groups[("note", "additionalProperties")]
+        assert (note.count, note.rows) == (300, [1, 2, 3])
+        assert report.error_count == 450
+
+        text = report.format()
+        assert "[ERROR] note: additionalProperties x300 (rows 1, 2, 3, ...)" in text
+        assert len(text.splitlines()) == 3
+
+    def test_chunk_size_does_not_change_report(self, validator, broken_tsv):
+        """Row numbers carry across chunk boundaries."""
+        whole = stream_validate(validator, broken_tsv, "blood_pressure")
+        chunked = stream_validate(validator, broken_tsv, "blood_pressure", StreamOptions(chunk_size=7))
+        assert chunked.groups == whole.groups
+
+    def test_clean_file(self, validator):
+        """A valid file reports exactly what `linkml validate` prints."""
+        report = stream_validate(validator, FIXTURES / "demographics.tsv", "demographics")
+        assert report.ok and report.format() == "No issues found\n"
+
+
+class TestErrorCaps:
+    """Caps stop reading a file as soon as it is clearly broken."""
+
+    def test_column_cap(self, validator, broken_tsv):
+        """Validation stops at the row where one column reaches its cap."""
+        options = StreamOptions(chunk_size=50, max_column_errors=10)
+        report = stream_validate(validator, broken_tsv, "blood_pressure", options)
+        assert report.rows_checked == 10
+        assert report.groups[("note", "additionalProperties")].count == 10
+        assert report.stop_reason == "column note reached 10 error(s) at row 10"
+        assert report.format().endswith("Stopped early: column note reached 10 error(s) at row 10\n")
+
+    def test_file_cap(self, validator, broken_tsv):
+        """The per-file cap counts errors across all columns."""
+        report = stream_validate(validator, broken_tsv, "blood_pressure", StreamOptions(max_errors=5))
+        assert report.error_count == 5
+        assert report.rows_checked == 3
+        assert report.stop_reason == "file reached 5 error(s) at row 3"
+
+
+def test_cli_summary_logs(tmp_path, broken_tsv):
+    """`dm-bip validate --max-column-errors` writes the aggregate report to the failing file's log."""
+    shutil.copy(FIXTURES / "schema.yaml", tmp_path / "schema.yaml")
+    out = tmp_path / "out"
+    args = ["validate", "-s", str(tmp_path / "schema.yaml"), "-o", str(out), "--input-dir", str(tmp_path)]
+    result = CliRunner().invoke(app, [*args, "--max-column-errors", "20", str(broken_tsv)])
+    assert result.exit_code == 0, result.output
+    log = (out / "data-validation-errors" / "blood_pressure.tsv" / "latest-error.log").read_text()
+    assert log.startswith(f"{broken_tsv}: 30 issue(s) in 20 row(s) checked against blood_pressure\n")
+    assert "Stopped early: column note reached 20 error(s) at row 20" in log